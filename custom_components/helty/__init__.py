@@ -2,70 +2,441 @@
 
 from __future__ import annotations
 
+import asyncio
+from datetime import datetime, timedelta
 import logging
 
-import aiohttp
+import voluptuous as vol
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import CONF_EMAIL, CONF_PASSWORD, Platform
-from homeassistant.core import HomeAssistant
-from homeassistant.exceptions import ConfigEntryAuthFailed, ConfigEntryNotReady
+from homeassistant.const import ATTR_DEVICE_ID, CONF_EMAIL, CONF_PASSWORD, Platform
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, ServiceCall, callback
+from homeassistant.exceptions import (
+    ConfigEntryAuthFailed,
+    ConfigEntryNotReady,
+    HomeAssistantError,
+    ServiceValidationError,
+)
+from homeassistant.helpers import config_validation as cv, device_registry as dr
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.typing import ConfigType
 
-from .api import HeltyCloudAPI, HeltyAuthError, HeltyConnectionError
-from .const import DOMAIN
-from .coordinator import HeltyDataUpdateCoordinator
+from .aggregate import InstallationAggregate
+from .api import (
+    HeltyAuthError,
+    HeltyCloudAPI,
+    HeltyConnectionError,
+    HeltyParameterError,
+)
+from .const import (
+    ATTR_BLOCK,
+    ATTR_PARAMETER,
+    ATTR_VALUE,
+    CONF_CONTROL,
+    CONF_CONTROL_DWELL,
+    CONF_CUSTOMER_DEVICES,
+    CONF_EVENT_TOPIC_PREFIX,
+    CONF_TRACE,
+    CONTROL_CURVE_OPTIONS,
+    DEFAULT_CONTROL_DWELL,
+    DOMAIN,
+    PARAMETER_BLOCKS,
+    REDISCOVERY_INTERVAL,
+    SERVICE_REFRESH,
+    SERVICE_SET_PARAMETER,
+    SIGNAL_NEW_COORDINATORS,
+)
+from .control import DemandController, parse_curve
+from .coordinator import HeltyDataUpdateCoordinator, async_refresh_batch
+from .models import Device, Reading
+from .registry import async_get_registry
+from .store import HeltyEntryStore
 
 _LOGGER = logging.getLogger(__name__)
 
 PLATFORMS = [Platform.FAN, Platform.SENSOR, Platform.SWITCH]
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+REFRESH_SCHEMA = vol.Schema(
+    {vol.Required(ATTR_DEVICE_ID): vol.All(cv.ensure_list, [cv.string])}
+)
+
+SET_PARAMETER_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_DEVICE_ID): vol.All(cv.ensure_list, [cv.string]),
+        vol.Required(ATTR_BLOCK): vol.In(PARAMETER_BLOCKS),
+        vol.Required(ATTR_PARAMETER): cv.string,
+        vol.Required(ATTR_VALUE): vol.Coerce(int),
+    }
+)
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the Helty VMC services."""
+
+    async def async_handle_refresh(call: ServiceCall) -> None:
+        """Poll the selected devices in one batch."""
+        coordinators = _coordinators_for_devices(hass, call.data[ATTR_DEVICE_ID])
+        if failed := await async_refresh_batch(coordinators):
+            raise HomeAssistantError(
+                "No reading from "
+                + ", ".join(coordinator.product_serial for coordinator in failed)
+            )
+
+    async def async_handle_set_parameter(call: ServiceCall) -> None:
+        """Change one parameter of a block on the selected devices."""
+        command_id = PARAMETER_BLOCKS[call.data[ATTR_BLOCK]]
+        coordinators = _coordinators_for_devices(hass, call.data[ATTR_DEVICE_ID])
+        try:
+            # Check the block of every device before writing to any
+            blocks = [
+                await coordinator.api.prepare_parameter(
+                    coordinator.board_serial,
+                    coordinator.product_serial,
+                    command_id,
+                    call.data[ATTR_PARAMETER],
+                    call.data[ATTR_VALUE],
+                )
+                for coordinator in coordinators
+            ]
+            for coordinator, block in zip(coordinators, blocks):
+                await coordinator.api.write_parameter(coordinator.board_serial, block)
+                coordinator.async_update_listeners()
+        except HeltyParameterError as err:
+            raise ServiceValidationError(str(err)) from err
+        except (HeltyAuthError, HeltyConnectionError) as err:
+            raise HomeAssistantError(str(err)) from err
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_REFRESH, async_handle_refresh, schema=REFRESH_SCHEMA
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SET_PARAMETER,
+        async_handle_set_parameter,
+        schema=SET_PARAMETER_SCHEMA,
+    )
+    return True
+
+
+def _coordinators_for_devices(
+    hass: HomeAssistant, device_ids: list[str]
+) -> list[HeltyDataUpdateCoordinator]:
+    """Resolve device registry ids to the coordinators polling them."""
+    by_serial: dict[str, HeltyDataUpdateCoordinator] = {}
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        if (data := hass.data.get(DOMAIN, {}).get(entry.entry_id)) is None:
+            continue
+        for coordinator in data["coordinators"]:
+            by_serial[coordinator.product_serial] = coordinator
+
+    device_registry = dr.async_get(hass)
+    coordinators: dict[str, HeltyDataUpdateCoordinator] = {}
+    for device_id in device_ids:
+        device = device_registry.async_get(device_id)
+        serial = next(
+            (
+                identifier
+                for domain, identifier in (device.identifiers if device else ())
+                if domain == DOMAIN
+            ),
+            None,
+        )
+        if serial not in by_serial:
+            raise ServiceValidationError(f"Unknown Helty VMC device: {device_id}")
+        coordinators[serial] = by_serial[serial]
+    return list(coordinators.values())
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Helty VMC from a config entry."""
-    session = aiohttp.ClientSession()
-    api = HeltyCloudAPI(session)
+    email = entry.data[CONF_EMAIL]
+    store = HeltyEntryStore(hass, entry.entry_id)
+    devices, readings, commanded_speeds = await store.async_load()
+
+    registry = async_get_registry(hass)
+    api = registry.async_acquire_client(email, entry.data[CONF_PASSWORD])
+
+    # A config flow that just logged in hands over its client and devices
+    if (handed_off := registry.async_take_handoff(email)) is not None:
+        devices = handed_off
+    discovered = handed_off is not None or not devices
+    if not devices:
+        # Nothing to restore yet, so the inventory has to be fetched now
+        try:
+            devices = await _async_discover(api, entry)
+        except (ConfigEntryAuthFailed, ConfigEntryNotReady):
+            await registry.async_release_client(email)
+            raise
+
+    hass.data.setdefault(DOMAIN, {})
+    data = hass.data[DOMAIN][entry.entry_id] = {
+        "api": api,
+        "store": store,
+        "devices": [],
+        # Coordinators of the boards this entry provides entities for
+        "coordinators": [],
+        # Coordinators of all its boards, including those shared with and
+        # owned by another entry, with their store listeners, by serial
+        "claimed": {},
+        # Listener removers of each claimed device, by serial
+        "unsubs": {},
+        # Figures of the owned devices, by installation
+        "aggregates": {},
+    }
+    _async_add_devices(hass, entry, devices, readings, commanded_speeds)
+
+    # The client outlives a reload: its tracer follows the latest options
+    api.tracer.enabled = entry.options.get(CONF_TRACE, False)
+    if not api.tracer.enabled:
+        api.tracer.clear()
+
+    if topic_prefix := entry.options.get(CONF_EVENT_TOPIC_PREFIX):
+        # Only entries receiving push events need the transport
+        from .transport import HeltyMqttTransport
+
+        # Waiting for the MQTT client must not hold up the entry setup
+        entry.async_create_background_task(
+            hass,
+            api.async_attach_transport(HeltyMqttTransport(hass, topic_prefix)),
+            f"{DOMAIN}_push_{entry.entry_id}",
+        )
+
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+
+    # Login and the first poll run in the background: entities start from
+    # their restored state and switch to live data on the first good poll
+    entry.async_create_background_task(
+        hass,
+        _async_start_polling(hass, entry, list(data["coordinators"]), discovered),
+        f"{DOMAIN}_start_{entry.entry_id}",
+    )
+
+    async def _async_rediscover(_now: datetime) -> None:
+        await _async_sync_devices(hass, entry)
+
+    entry.async_on_unload(
+        async_track_time_interval(
+            hass,
+            _async_rediscover,
+            timedelta(seconds=REDISCOVERY_INTERVAL),
+            name=f"{DOMAIN}_rediscover_{entry.entry_id}",
+            cancel_on_shutdown=True,
+        )
+    )
+    return True
+
+
+@callback
+def _async_add_devices(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    devices: list[Device],
+    readings: dict[str, Reading] | None = None,
+    commanded_speeds: dict[str, int] | None = None,
+) -> list[HeltyDataUpdateCoordinator]:
+    """Claim the boards of devices and return the coordinators the entry owns.
+
+    Boards already polled for another account are shared, not polled twice;
+    only the boards this entry owns get its entities.
+    """
+    data = hass.data[DOMAIN][entry.entry_id]
+    registry = async_get_registry(hass)
+    store: HeltyEntryStore = data["store"]
+    push = bool(entry.options.get(CONF_EVENT_TOPIC_PREFIX))
+    control = entry.options.get(CONF_CONTROL, False)
+    owned: list[HeltyDataUpdateCoordinator] = []
+    for device in devices:
+        coordinator, owner = registry.async_claim_board(
+            entry.entry_id, entry.data[CONF_EMAIL], device
+        )
+        if coordinator.data is None and (
+            reading := (readings or {}).get(device.serial)
+        ):
+            coordinator.async_restore(
+                reading, (commanded_speeds or {}).get(device.serial)
+            )
+        unsubs = data["unsubs"][device.serial] = [
+            coordinator.async_add_listener(store.async_schedule_save)
+        ]
+        if push:
+            # Events arrive on this entry's client, whichever client polls
+            unsubs.append(coordinator.async_start_push(data["api"]))
+        data["claimed"][device.serial] = coordinator
+        if owner:
+            owned.append(coordinator)
+            if device.installation != "N/A":
+                unsubs.append(_async_track_aggregate(data, coordinator))
+            if control:
+                unsubs.append(_async_start_control(entry, coordinator))
+    data["devices"].extend(devices)
+    data["coordinators"].extend(owned)
+    store.async_track(data["devices"], list(data["claimed"].values()))
+    return owned
 
+
+@callback
+def _async_track_aggregate(
+    data: dict, coordinator: HeltyDataUpdateCoordinator
+) -> CALLBACK_TYPE:
+    """Feed a coordinator's readings to the aggregate of its installation."""
+    installation = coordinator.device.installation
+    if (aggregate := data["aggregates"].get(installation)) is None:
+        aggregate = data["aggregates"][installation] = InstallationAggregate()
+    serial = coordinator.product_serial
+
+    @callback
+    def _async_update() -> None:
+        # A failed poll keeps its last data: leave it out of the aggregate
+        aggregate.update(
+            serial, coordinator.data if coordinator.last_update_success else None
+        )
+
+    _async_update()
+    unsub = coordinator.async_add_listener(_async_update)
+
+    @callback
+    def _async_untrack() -> None:
+        unsub()
+        aggregate.remove(serial)
+
+    return _async_untrack
+
+
+@callback
+def _async_start_control(
+    entry: ConfigEntry, coordinator: HeltyDataUpdateCoordinator
+) -> CALLBACK_TYPE:
+    """Let a demand controller drive a coordinator's fan from its readings."""
+    coordinator.controller = DemandController(
+        {
+            field: parse_curve(entry.options.get(option, ""))
+            for field, option in CONTROL_CURVE_OPTIONS.items()
+        },
+        entry.options.get(CONF_CONTROL_DWELL, DEFAULT_CONTROL_DWELL),
+    )
+
+    @callback
+    def _async_stop() -> None:
+        coordinator.controller = None
+
+    return _async_stop
+
+
+async def _async_remove_devices(
+    hass: HomeAssistant, entry: ConfigEntry, serials: set[str]
+) -> None:
+    """Retire devices no longer on the account, with their entities."""
+    data = hass.data[DOMAIN][entry.entry_id]
+    registry = async_get_registry(hass)
+    device_registry = dr.async_get(hass)
+    heirs: set[str] = set()
+    for serial in serials:
+        coordinator = data["claimed"].pop(serial)
+        for unsub in data["unsubs"].pop(serial):
+            unsub()
+        if coordinator in data["coordinators"]:
+            data["coordinators"].remove(coordinator)
+            # Removing the device also removes its entities
+            if device := device_registry.async_get_device(
+                identifiers={(DOMAIN, serial)}
+            ):
+                device_registry.async_update_device(
+                    device.id, remove_config_entry_id=entry.entry_id
+                )
+        heirs |= await registry.async_release_board(
+            entry.entry_id, coordinator.board_serial
+        )
+    data["devices"][:] = [d for d in data["devices"] if d.serial not in serials]
+    data["store"].async_track(data["devices"], list(data["claimed"].values()))
+    for heir in heirs:
+        hass.async_create_task(hass.config_entries.async_reload(heir))
+
+
+async def _async_sync_devices(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply changes of the account's device list without reloading."""
+    if (data := hass.data.get(DOMAIN, {}).get(entry.entry_id)) is None:
+        return
     try:
-        await api.authenticate(entry.data[CONF_EMAIL], entry.data[CONF_PASSWORD])
+        current = await data["api"].find_devices(
+            entry.options.get(CONF_CUSTOMER_DEVICES, False)
+        )
     except HeltyAuthError as err:
-        await session.close()
-        raise ConfigEntryAuthFailed(str(err)) from err
+        _LOGGER.error("Authentication failed: %s", err)
+        entry.async_start_reauth(hass)
+        return
     except HeltyConnectionError as err:
-        await session.close()
-        raise ConfigEntryNotReady(str(err)) from err
+        # Keep the known devices; polling retries on its own schedule
+        _LOGGER.warning("Could not check the device list: %s", err)
+        return
+    # The entry may have been unloaded while the search was in flight
+    if hass.data[DOMAIN].get(entry.entry_id) is not data:
+        return
+    if not current:
+        # Never drop a whole fleet on one empty answer
+        _LOGGER.debug("Device search returned nothing, keeping known devices")
+        return
 
+    known = {device.serial for device in data["devices"]}
+    added = [device for device in current if device.serial not in known]
+    removed = known - {device.serial for device in current}
+    if removed:
+        _LOGGER.info("Removing VMC devices no longer on the account: %s", removed)
+        await _async_remove_devices(hass, entry, removed)
+    if added:
+        _LOGGER.info(
+            "Adding new VMC devices: %s", [device.serial for device in added]
+        )
+        if owned := _async_add_devices(hass, entry, added):
+            async_dispatcher_send(
+                hass, SIGNAL_NEW_COORDINATORS.format(entry.entry_id), owned
+            )
+            await asyncio.gather(*(coordinator.async_refresh() for coordinator in owned))
+
+
+async def _async_discover(api: HeltyCloudAPI, entry: ConfigEntry) -> list[Device]:
+    """Log in and return the account's devices, raising setup errors."""
     try:
-        devices = await api.find_devices()
+        devices = await api.find_devices(
+            entry.options.get(CONF_CUSTOMER_DEVICES, False)
+        )
+    except HeltyAuthError as err:
+        raise ConfigEntryAuthFailed(str(err)) from err
     except HeltyConnectionError as err:
-        await session.close()
         raise ConfigEntryNotReady(str(err)) from err
 
     if not devices:
-        await session.close()
         raise ConfigEntryNotReady("No VMC devices found")
+    return devices
 
-    coordinators: list[HeltyDataUpdateCoordinator] = []
-    for device in devices:
-        coordinator = HeltyDataUpdateCoordinator(
-            hass,
-            api,
-            device["board_serial"],
-            device["serial"],
-        )
-        await coordinator.async_config_entry_first_refresh()
-        coordinators.append(coordinator)
 
-    hass.data.setdefault(DOMAIN, {})
-    hass.data[DOMAIN][entry.entry_id] = {
-        "api": api,
-        "session": session,
-        "devices": devices,
-        "coordinators": coordinators,
-    }
+async def _async_start_polling(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    coordinators: list[HeltyDataUpdateCoordinator],
+    discovered: bool,
+) -> None:
+    """Check a restored inventory against the cloud and run the first poll."""
+    if not discovered:
+        await _async_sync_devices(hass, entry)
+
+    await asyncio.gather(*(coordinator.async_refresh() for coordinator in coordinators))
 
-    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
-    return True
+
+async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the entry when its options change."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the persisted data of a deleted config entry."""
+    # Entries still seeing a board of this one take over its entities
+    for heir in async_get_registry(hass).async_forget_owner(entry.entry_id):
+        hass.async_create_task(hass.config_entries.async_reload(heir))
+    await HeltyEntryStore(hass, entry.entry_id).async_remove()
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
@@ -73,5 +444,16 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
     if unload_ok:
         data = hass.data[DOMAIN].pop(entry.entry_id)
-        await data["session"].close()
+        for unsubs in data["unsubs"].values():
+            for unsub in unsubs:
+                unsub()
+        registry = async_get_registry(hass)
+        # A reloading entry keeps its boards; a disabled one hands them on
+        await registry.async_release_boards(entry.entry_id)
+        heirs = (
+            registry.async_forget_owner(entry.entry_id) if entry.disabled_by else set()
+        )
+        await registry.async_release_client(entry.data[CONF_EMAIL])
+        for heir in heirs:
+            hass.async_create_task(hass.config_entries.async_reload(heir))
     return unload_ok
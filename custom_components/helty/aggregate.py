@@ -0,0 +1,129 @@
+"""Per-installation figures maintained incrementally from device readings."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+import heapq
+
+from .const import AGGREGATE_MAX_FIELDS, AGGREGATE_MEAN_FIELDS
+from .models import Reading
+
+
+class _LazyMax:
+    """Maximum of per-device values under replacement.
+
+    A new value is pushed on a heap and the device's previous entry is left
+    in place; stale entries are only popped when they reach the top. The
+    heap is rebuilt once stale entries outnumber the live ones.
+    """
+
+    __slots__ = ("_heap", "_current", "_seq")
+
+    def __init__(self) -> None:
+        """Initialize without values."""
+        # (-value, seq, key); seq tells a device's live entry from stale ones
+        self._heap: list[tuple[float, int, str]] = []
+        self._current: dict[str, tuple[float, int]] = {}
+        self._seq = 0
+
+    def set(self, key: str, value: float | None) -> None:
+        """Replace the value of ``key``; None removes it."""
+        if value is None:
+            self._current.pop(key, None)
+            return
+        if (current := self._current.get(key)) is not None and current[0] == value:
+            return
+        self._seq += 1
+        self._current[key] = (value, self._seq)
+        heapq.heappush(self._heap, (-value, self._seq, key))
+        if len(self._heap) > 2 * len(self._current) + 16:
+            self._heap = [(-v, seq, k) for k, (v, seq) in self._current.items()]
+            heapq.heapify(self._heap)
+
+    def get(self) -> float | None:
+        """Return the maximum, None without values."""
+        heap = self._heap
+        while heap:
+            _value, seq, key = heap[0]
+            if (current := self._current.get(key)) is not None and current[1] == seq:
+                return current[0]
+            heapq.heappop(heap)
+        return None
+
+
+class InstallationAggregate:
+    """Figures of the devices of one installation.
+
+    Each device update subtracts the device's previous contribution and
+    adds the new one: sums and counts are O(1), maxima a heap push.
+    Nothing is recomputed across the installation.
+    """
+
+    def __init__(self) -> None:
+        """Initialize without devices."""
+        self._readings: dict[str, Reading | None] = {}
+        # field -> [sum, number of devices reporting it]
+        self._sums = {field: [0.0, 0] for field in AGGREGATE_MEAN_FIELDS}
+        self._maxima = {field: _LazyMax() for field in AGGREGATE_MAX_FIELDS}
+        self._status_counts: dict[int, int] = {}
+        self._listeners: list[Callable[[], None]] = []
+
+    @property
+    def devices(self) -> int:
+        """Return the number of devices tracked."""
+        return len(self._readings)
+
+    def update(self, serial: str, reading: Reading | None) -> None:
+        """Replace the contribution of a device with ``reading``."""
+        previous = self._readings.get(serial)
+        if serial in self._readings and previous is reading:
+            return
+        self._readings[serial] = reading
+        self._apply(previous, -1)
+        self._apply(reading, 1)
+        for field, maximum in self._maxima.items():
+            maximum.set(serial, getattr(reading, field) if reading else None)
+        self._notify()
+
+    def remove(self, serial: str) -> None:
+        """Drop a device and its contribution."""
+        if serial not in self._readings:
+            return
+        self._apply(self._readings.pop(serial), -1)
+        for maximum in self._maxima.values():
+            maximum.set(serial, None)
+        self._notify()
+
+    def _apply(self, reading: Reading | None, sign: int) -> None:
+        """Add (``sign`` 1) or subtract (-1) a reading's contribution."""
+        if reading is None:
+            return
+        for field, total in self._sums.items():
+            if (value := getattr(reading, field)) is not None:
+                total[0] += sign * value
+                total[1] += sign
+        if (status := reading.vmc_status) is not None:
+            self._status_counts[status] = self._status_counts.get(status, 0) + sign
+
+    def mean(self, field: str) -> float | None:
+        """Return the mean of a field over the devices reporting it."""
+        total, count = self._sums[field]
+        return round(total / count, 1) if count else None
+
+    def max(self, field: str) -> float | None:
+        """Return the maximum of a field."""
+        return self._maxima[field].get()
+
+    def count_status(self, status: int) -> int:
+        """Return the number of devices in a VMC status."""
+        return self._status_counts.get(status, 0)
+
+    def add_listener(self, listener: Callable[[], None]) -> Callable[[], None]:
+        """Call ``listener`` after each change; return a function removing it."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def _notify(self) -> None:
+        """Call the listeners."""
+        for listener in self._listeners:
+            listener()
@@ -3,25 +3,79 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
 import json
 import logging
+import sys
 import time
+from collections.abc import Callable
+from dataclasses import replace
+from typing import TYPE_CHECKING, Any
 
 import aiohttp
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 from .const import (
     API_BASE_URL,
+    CMD_GET_STATUS,
     COGNITO_CLIENT_ID,
     COGNITO_REGION,
+    COMMAND_STATE_TTL,
+    COMMAND_TARGETS,
+    PARAMETER_LAYOUTS,
+    PARAMETER_MAX_AGE,
+    PARAMETER_SET_COMMANDS,
+    READ_SIGNATURES,
     SENSOR_FIELDS,
     STATUS_READ_DELAY,
 )
+from .metrics import ApiStats
+from .models import CommandBlock, Device, Reading
+from .tracing import Tracer
+
+if TYPE_CHECKING:
+    from .transport import HeltyTransport
 
 _LOGGER = logging.getLogger(__name__)
 
 COGNITO_URL = f"https://cognito-idp.{COGNITO_REGION}.amazonaws.com/"
 
 
+def _stdlib_dumps(obj: object) -> bytes:
+    """Serialize ``obj`` to compact JSON bytes with the standard library."""
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+# JSON backend: orjson when available (Home Assistant ships it), else stdlib
+JSON_LOADS = orjson.loads if orjson is not None else json.loads
+JSON_DUMPS = orjson.dumps if orjson is not None else _stdlib_dumps
+
+# Pre-encoded bodies of the constant requests
+_PRODUCT_SEARCH_BODY = _stdlib_dumps({"pageSize": 50, "pageNumber": 0, "status": "OK"})
+_GET_STATUS_BODY = _stdlib_dumps({"commandId": 0, "values": []})
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Reading slot index and divisor for each laststatus field
+_READING_FIELDS = {
+    field: (Reading.__slots__.index(key), divisor)
+    for field, (key, divisor, _unit) in SENSOR_FIELDS.items()
+}
+
+
+def _answers(command_id: int, items: list) -> bool:
+    """Return true if response items are the answer to a read command."""
+    fields = {item.get("field") for item in items if isinstance(item, dict)}
+    signature = READ_SIGNATURES.get(command_id)
+    if signature is not None and signature not in fields:
+        return False
+    return command_id == CMD_GET_STATUS or fields.isdisjoint(SENSOR_FIELDS)
+
+
 class HeltyAuthError(Exception):
     """Authentication error."""
 
@@ -30,39 +84,160 @@ class HeltyConnectionError(Exception):
     """Connection error."""
 
 
+class HeltyParameterError(Exception):
+    """Invalid parameter error."""
+
+
+def _check_layout(set_command: int, block: CommandBlock) -> None:
+    """Raise HeltyParameterError unless a block fits its Set command."""
+    size, fields = PARAMETER_LAYOUTS[set_command]
+    if len(block.values) != size:
+        raise HeltyParameterError(
+            f"Command {block.command_id} returned {len(block.values)} values, "
+            f"command {set_command} takes {size}: not writing a partial block"
+        )
+    if len(set(block.fields)) != size:
+        raise HeltyParameterError(
+            f"Command {block.command_id} returned duplicate fields"
+        )
+    if len(fields) == size:
+        if block.fields != fields:
+            raise HeltyParameterError(
+                f"Command {block.command_id} returned fields "
+                f"{', '.join(block.fields)}, expected {', '.join(fields)}"
+            )
+    elif missing := [field for field in fields if field not in block.fields]:
+        raise HeltyParameterError(
+            f"Command {block.command_id} returned no {', '.join(missing)}"
+        )
+
+
 class HeltyCloudAPI:
     """Async client for the Helty HCloud REST API."""
 
-    def __init__(self, session: aiohttp.ClientSession) -> None:
-        """Initialize the API client."""
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        *,
+        json_loads: Callable[[bytes], Any] = JSON_LOADS,
+        json_dumps: Callable[[Any], bytes] = JSON_DUMPS,
+        tracer: Tracer | None = None,
+    ) -> None:
+        """Initialize the API client.
+
+        Pass the ``tracer`` whose trace config the session was created
+        with, so connection phases nest in the request spans.
+        """
         self._session = session
+        self._loads = json_loads
+        self._dumps = json_dumps
+        # laststatus bodies keyed by product serial, encoded on first use
+        self._laststatus_bodies: dict[str, bytes] = {}
+        self._transport: HeltyTransport | None = None
+        self._event_listeners: dict[str, list[Callable[[Reading], None]]] = {}
+        # Reads waiting for a pushed response: (command ID, future) per board
+        self._event_waiters: dict[str, list[tuple[int, asyncio.Future[list]]]] = {}
+        # Serializes send-and-read exchanges: laststatus only holds the
+        # response to the most recent command of a board
+        self._board_locks: dict[str, asyncio.Lock] = {}
+        self._blocks: dict[tuple[str, int], CommandBlock] = {}
+        # (min, max) of each boardType unit id, per board
+        self._board_units: dict[str, dict[str, tuple[Any, Any]]] = {}
+        # Last known state per (board, state group): (value, timestamp,
+        # whether the device reported it rather than us commanding it)
+        self._states: dict[tuple[str, str], tuple[Any, float, bool]] = {}
         self._access_token: str | None = None
         self._id_token: str | None = None
         self._refresh_token: str | None = None
         self._token_expiry: float = 0
         self._email: str | None = None
         self._password: str | None = None
+        self._auth_lock = asyncio.Lock()
+        # Latency, error and token counters, exported by the CLI daemon
+        self.stats = ApiStats()
+        # Span timings of every request, recorded once enabled
+        self.tracer = tracer if tracer is not None else Tracer()
 
     @property
     def id_token(self) -> str | None:
         """Return the current ID token."""
         return self._id_token
 
+    @property
+    def push_connected(self) -> bool:
+        """Return true if a push transport is currently delivering events."""
+        return self._transport is not None and self._transport.connected
+
+    async def async_attach_transport(self, transport: HeltyTransport) -> None:
+        """Start receiving status events through a push transport."""
+        await self.async_detach_transport()
+        self._transport = transport
+        transport.bind(self._handle_event, self._handle_transport_state)
+        await transport.async_start()
+
+    async def async_detach_transport(self) -> None:
+        """Stop the push transport, falling back to REST polling only."""
+        if (transport := self._transport) is not None:
+            self._transport = None
+            await transport.async_stop()
+
+    def subscribe_events(
+        self, board_serial: str, listener: Callable[[Reading], None]
+    ) -> Callable[[], None]:
+        """Call ``listener`` with each reading pushed for a board."""
+        self._event_listeners.setdefault(board_serial, []).append(listener)
+
+        def _unsubscribe() -> None:
+            self._event_listeners[board_serial].remove(listener)
+
+        return _unsubscribe
+
+    def _handle_event(self, board_serial: str, payload: bytes) -> None:
+        """Parse an event payload and hand the reading to waiters and listeners."""
+        try:
+            decoded = self._loads(payload)
+        except ValueError:
+            _LOGGER.debug("Ignoring malformed event for %s", board_serial)
+            return
+        if isinstance(decoded, dict):
+            decoded = decoded.get("data") or decoded.get("values")
+        if not isinstance(decoded, list):
+            return
+        if waiters := self._event_waiters.get(board_serial):
+            for command_id, waiter in waiters:
+                if not waiter.done() and _answers(command_id, decoded):
+                    waiter.set_result(decoded)
+        # Events answering other commands carry no status fields
+        if (reading := self._parse_sensor_data(decoded)) is None:
+            return
+        for listener in list(self._event_listeners.get(board_serial, ())):
+            listener(reading)
+
+    def _handle_transport_state(self, connected: bool) -> None:
+        """Log push transport availability changes."""
+        if connected:
+            _LOGGER.info("Receiving VMC status events by push")
+        else:
+            _LOGGER.info("Push events unavailable, falling back to polling")
+
     async def _cognito_request(self, action: str, payload: dict) -> dict:
         """Make a direct HTTP request to the Cognito API."""
         headers = {
             "Content-Type": "application/x-amz-json-1.1",
             "X-Amz-Target": f"AWSCognitoIdentityProviderService.{action}",
         }
+        started = time.perf_counter()
         try:
             async with self._session.post(
                 COGNITO_URL,
                 headers=headers,
-                data=json.dumps(payload),
+                data=self._dumps(payload),
                 timeout=aiohttp.ClientTimeout(total=15),
             ) as resp:
-                body = json.loads(await resp.text())
+                raw = await resp.read()
+                body = self._loads(raw) if raw else {}
                 if resp.status != 200:
+                    self.stats.record_error("cognito", f"http_{resp.status}")
                     error_type = body.get("__type", "")
                     error_msg = body.get("message", "Unknown error")
                     if "NotAuthorizedException" in error_type:
@@ -74,15 +249,52 @@ class HeltyCloudAPI:
                     )
                 return body
         except aiohttp.ClientError as err:
+            self.stats.record_error("cognito", "connection")
             raise HeltyConnectionError(
                 f"Failed to connect to Cognito: {err}"
             ) from err
+        except asyncio.TimeoutError as err:
+            self.stats.record_error("cognito", "timeout")
+            raise HeltyConnectionError("Cognito request timed out") from err
+        except ValueError as err:
+            self.stats.record_error("cognito", "invalid_response")
+            raise HeltyConnectionError(f"Invalid Cognito response: {err}") from err
+        finally:
+            ended = time.perf_counter()
+            self.stats.observe("cognito", ended - started)
+            if self.tracer.enabled:
+                self.tracer.record(
+                    "cognito", "auth", started, ended,
+                    {"flow": payload.get("AuthFlow", action)},
+                )
 
-    async def authenticate(self, email: str, password: str) -> dict:
-        """Authenticate with AWS Cognito and return tokens."""
+    @property
+    def tokens(self) -> dict[str, Any]:
+        """Return the current tokens and their expiry, e.g. to cache them."""
+        return {
+            "access_token": self._access_token,
+            "id_token": self._id_token,
+            "refresh_token": self._refresh_token,
+            "expiry": self._token_expiry,
+        }
+
+    def restore_tokens(self, tokens: dict[str, Any]) -> None:
+        """Reuse tokens obtained earlier, as returned by ``tokens``.
+
+        An expired ID token is renewed with the refresh token on first use.
+        """
+        self._access_token = tokens.get("access_token")
+        self._id_token = tokens.get("id_token")
+        self._refresh_token = tokens.get("refresh_token")
+        self._token_expiry = tokens.get("expiry", 0) if self._id_token else 0
+
+    def set_credentials(self, email: str, password: str) -> None:
+        """Store credentials so the first request authenticates on its own."""
         self._email = email
         self._password = password
 
+    async def authenticate(self, email: str, password: str) -> dict:
+        """Authenticate with AWS Cognito and return tokens."""
         response = await self._cognito_request(
             "InitiateAuth",
             {
@@ -99,6 +311,10 @@ class HeltyCloudAPI:
             challenge = response.get("ChallengeName", "unknown")
             raise HeltyAuthError(f"Authentication challenge required: {challenge}")
 
+        self.stats.record_token("login")
+        # Only validated credentials replace the ones used for re-login
+        self._email = email
+        self._password = password
         result = response["AuthenticationResult"]
         self._access_token = result.get("AccessToken")
         self._id_token = result["IdToken"]
@@ -112,6 +328,15 @@ class HeltyCloudAPI:
         if time.time() < self._token_expiry:
             return
 
+        # Concurrent requests share a single refresh or login
+        async with self._auth_lock:
+            if time.time() < self._token_expiry:
+                return
+            with self.tracer.span("token_renew", "auth"):
+                await self._renew_token()
+
+    async def _renew_token(self) -> None:
+        """Obtain a new token by refresh, or by logging in again."""
         if self._refresh_token:
             try:
                 await self._refresh_auth()
@@ -138,51 +363,84 @@ class HeltyCloudAPI:
         )
 
         result = response["AuthenticationResult"]
+        self.stats.record_token("refresh")
         self._access_token = result.get("AccessToken")
         self._id_token = result["IdToken"]
         self._token_expiry = time.time() + result.get("ExpiresIn", 3600) - 300
 
     async def _request(
-        self, method: str, path: str, data: dict | None = None
+        self,
+        method: str,
+        path: str,
+        body: bytes | None = None,
+        *,
+        endpoint: str,
     ) -> dict | list | None:
-        """Make an authenticated API request."""
+        """Make an authenticated API request with a pre-encoded JSON body.
+
+        ``endpoint`` names the request in the client statistics.
+        """
         await self._ensure_token()
 
         url = f"{API_BASE_URL}{path}"
-        headers = {
-            "Authorization": f"Bearer {self._id_token}",
-            "Content-Type": "application/json",
-        }
+        headers = {**_JSON_HEADERS, "Authorization": f"Bearer {self._id_token}"}
 
+        retried = False
+        started = time.perf_counter()
         try:
             async with self._session.request(
-                method, url, headers=headers, json=data, timeout=aiohttp.ClientTimeout(total=15)
+                method, url, headers=headers, data=body, timeout=aiohttp.ClientTimeout(total=15)
             ) as resp:
                 if resp.status == 401:
                     # Token may have been invalidated; force refresh and retry once
+                    self.stats.record_error(endpoint, "http_401")
+                    retried = True
                     self._token_expiry = 0
                     await self._ensure_token()
                     headers["Authorization"] = f"Bearer {self._id_token}"
                     async with self._session.request(
-                        method, url, headers=headers, json=data,
+                        method, url, headers=headers, data=body,
                         timeout=aiohttp.ClientTimeout(total=15),
                     ) as retry_resp:
                         retry_resp.raise_for_status()
-                        return await retry_resp.json()
-                resp.raise_for_status()
-                text = await resp.text()
-                if not text:
-                    return {}
-                return await resp.json()
+                        raw = await retry_resp.read()
+                else:
+                    resp.raise_for_status()
+                    raw = await resp.read()
+        except aiohttp.ClientResponseError as err:
+            self.stats.record_error(endpoint, f"http_{err.status}")
+            raise HeltyConnectionError(f"API request failed: {err}") from err
         except aiohttp.ClientError as err:
+            self.stats.record_error(endpoint, "connection")
             raise HeltyConnectionError(f"API request failed: {err}") from err
+        except asyncio.TimeoutError as err:
+            self.stats.record_error(endpoint, "timeout")
+            raise HeltyConnectionError("API request timed out") from err
+        finally:
+            ended = time.perf_counter()
+            self.stats.observe(endpoint, ended - started)
+            if self.tracer.enabled:
+                self.tracer.record(
+                    endpoint, "api", started, ended, {"retried_401": retried}
+                )
+
+        # Read once as bytes; an empty body means an accepted async command
+        if not raw:
+            return {}
+        try:
+            return self._loads(raw)
+        except ValueError as err:
+            self.stats.record_error(endpoint, "invalid_response")
+            raise HeltyConnectionError(f"Invalid API response: {err}") from err
 
-    async def find_devices(self) -> list[dict]:
-        """Find VMC devices assigned to the authenticated user."""
+    async def find_devices(self, customers: bool = False) -> list[Device]:
+        """Find the VMC devices of the authenticated user.
+
+        With ``customers``, also return the devices of other owners the
+        account can see, e.g. those of an installer's customers.
+        """
         result = await self._request(
-            "POST",
-            "/board/product/search",
-            {"pageSize": 50, "pageNumber": 0, "status": "OK"},
+            "POST", "/board/product/search", _PRODUCT_SEARCH_BODY, endpoint="search"
         )
 
         products = result.get("data", []) if isinstance(result, dict) else []
@@ -192,72 +450,360 @@ class HeltyCloudAPI:
             if not ci or not ci.get("mail"):
                 continue
             # Only include devices belonging to the authenticated user
-            if self._email and ci["mail"].lower() != self._email.lower():
+            if (
+                not customers
+                and self._email
+                and ci["mail"].lower() != self._email.lower()
+            ):
+                continue
+            # Without both serials the device can be neither polled nor driven
+            if not p.get("serialNumber") or not p.get("boardSerialNumber"):
                 continue
             cb = p.get("cloudBoard", {})
             inst = p.get("currentInstallation", {})
+            product_type = p.get("productType", {})
             devices.append(
-                {
-                    "product_id": p["_id"],
-                    "serial": p.get("serialNumber"),
-                    "model": p.get("productType", {}).get("model", "Unknown"),
-                    "line": p.get("productType", {}).get("line", ""),
-                    "board_serial": p.get("boardSerialNumber"),
-                    "board_id": cb.get("_id") if cb else None,
-                    "installation": (
+                Device(
+                    product_id=p["_id"],
+                    serial=sys.intern(p["serialNumber"]),
+                    model=product_type.get("model", "Unknown"),
+                    line=product_type.get("line", ""),
+                    board_serial=sys.intern(p["boardSerialNumber"]),
+                    board_id=cb.get("_id") if cb else None,
+                    installation=(
                         f"{inst.get('name', '')} - {inst.get('place', '')}"
                         if inst
                         else "N/A"
                     ),
-                    "owner": f"{ci.get('name', '')} {ci.get('lastName', '')}",
-                    "email": ci.get("mail"),
-                }
+                    owner=f"{ci.get('name', '')} {ci.get('lastName', '')}",
+                    email=ci["mail"],
+                )
             )
         return devices
 
+    def _board_lock(self, board_serial: str) -> asyncio.Lock:
+        """Return the lock serializing exchanges with a board."""
+        if (lock := self._board_locks.get(board_serial)) is None:
+            lock = self._board_locks[board_serial] = asyncio.Lock()
+        return lock
+
+    def record_state(
+        self,
+        board_serial: str,
+        group: str,
+        value: Any,
+        timestamp: float | None = None,
+        *,
+        confirmed: bool = False,
+    ) -> None:
+        """Remember the state of a board, as commanded or as read back.
+
+        ``confirmed`` marks a state the device reported itself.
+        """
+        self._states[(board_serial, group)] = (
+            value,
+            time.time() if timestamp is None else timestamp,
+            confirmed,
+        )
+
+    def known_state(
+        self,
+        board_serial: str,
+        group: str,
+        max_age: float | None = None,
+        *,
+        confirmed: bool = False,
+    ) -> Any:
+        """Return the last known state of a board, None if unknown or stale.
+
+        With ``confirmed``, a state only commanded counts as unknown.
+        """
+        if (known := self._states.get((board_serial, group))) is None:
+            return None
+        value, timestamp, read_back = known
+        if max_age is not None and time.time() - timestamp >= max_age:
+            return None
+        if confirmed and not read_back:
+            return None
+        return value
+
     async def send_command(self, board_serial: str, command_id: int) -> dict:
-        """Send a command to a VMC device."""
+        """Send a command to a VMC device.
+
+        Commands whose target state the device recently reported are
+        skipped. A state we only commanded never suppresses a command: it
+        may have been changed since from the panel or the app.
+        """
+        target = COMMAND_TARGETS.get(command_id)
+        if target is not None:
+            group, value = target
+            if (
+                self.known_state(
+                    board_serial, group, COMMAND_STATE_TTL, confirmed=True
+                )
+                == value
+            ):
+                _LOGGER.debug(
+                    "Skipping command %s to %s: %s is already %s",
+                    command_id, board_serial, group, value,
+                )
+                return {}
+        async with self._board_lock(board_serial):
+            result = await self._send_command(board_serial, command_id)
+        if target is not None:
+            self.record_state(board_serial, *target)
+        return result
+
+    async def _send_command(
+        self, board_serial: str, command_id: int, values: list | None = None
+    ) -> dict:
+        """Send a command; the caller holds the board lock."""
+        body = (
+            _GET_STATUS_BODY
+            if command_id == 0 and not values
+            else self._dumps({"commandId": command_id, "values": values or []})
+        )
         result = await self._request(
-            "POST",
-            f"/board/board/sendcommand/{board_serial}",
-            {"commandId": command_id, "values": []},
+            "POST", f"/board/board/sendcommand/{board_serial}", body,
+            endpoint="sendcommand",
         )
         return result or {}
 
-    async def read_sensors(
-        self, board_serial: str, product_serial: str
-    ) -> dict:
-        """Send GetStatus and read sensor data. Returns parsed dict."""
-        # Send GetStatus command
-        await self.send_command(board_serial, 0)
+    async def _exchange(
+        self, board_serial: str, product_serial: str, command_id: int
+    ) -> dict | list | None:
+        """Send a read command and return its raw response.
+
+        The caller holds the board lock, so no other command can replace
+        the response in laststatus before it is read.
+        """
+        if self.push_connected:
+            # The response event usually arrives well within the read delay
+            waiter: asyncio.Future[list] = asyncio.get_running_loop().create_future()
+            entry = (command_id, waiter)
+            self._event_waiters.setdefault(board_serial, []).append(entry)
+            try:
+                await self._send_command(board_serial, command_id)
+                with self.tracer.span("status_wait", push=True) as args:
+                    with contextlib.suppress(TimeoutError):
+                        event = await asyncio.wait_for(waiter, STATUS_READ_DELAY)
+                        if args is not None:
+                            args["event"] = True
+                        return event
+            finally:
+                waiters = self._event_waiters[board_serial]
+                waiters.remove(entry)
+                if not waiters:
+                    del self._event_waiters[board_serial]
+            # No event: the delay has elapsed, read laststatus as usual
+            return await self._read_last_status(product_serial)
+
+        # Send the command
+        await self._send_command(board_serial, command_id)
 
         # Wait for the device to respond via MQTT
-        await asyncio.sleep(STATUS_READ_DELAY)
+        with self.tracer.span("status_wait", push=False):
+            await asyncio.sleep(STATUS_READ_DELAY)
 
         # Read last status
-        raw = await self._request(
-            "POST",
-            "/log/commandlogs/laststatus",
-            {"serialNumber": product_serial},
+        return await self._read_last_status(product_serial)
+
+    async def read_sensors(
+        self, board_serial: str, product_serial: str
+    ) -> Reading | None:
+        """Send GetStatus and read sensor data. Returns the parsed reading."""
+        with self.tracer.span("read_sensors", board=board_serial):
+            async with self._board_lock(board_serial):
+                raw = await self._exchange(board_serial, product_serial, 0)
+            return self._parse_sensor_data(raw)
+
+    async def read_sensors_many(
+        self, devices: list[tuple[str, str]]
+    ) -> dict[str, Reading | None]:
+        """Read several devices with a single status wait.
+
+        ``devices`` holds (board serial, product serial) pairs. Returns the
+        parsed reading per product serial, None for devices that failed.
+        """
+        async with contextlib.AsyncExitStack() as stack:
+            # Lock in a stable order so concurrent batches cannot deadlock
+            for board in sorted({board for board, _product in devices}):
+                await stack.enter_async_context(self._board_lock(board))
+
+            sent = await asyncio.gather(
+                *(self._send_command(board, 0) for board, _product in devices),
+                return_exceptions=True,
+            )
+            with self.tracer.span("status_wait", push=False, boards=len(devices)):
+                await asyncio.sleep(STATUS_READ_DELAY)
+
+            pending = []
+            for (board, product), result in zip(devices, sent):
+                if isinstance(result, Exception):
+                    _LOGGER.debug("GetStatus to %s failed: %s", board, result)
+                else:
+                    pending.append(product)
+            raws = await asyncio.gather(
+                *(self._read_last_status(product) for product in pending),
+                return_exceptions=True,
+            )
+
+        readings: dict[str, Reading | None] = dict.fromkeys(
+            product for _board, product in devices
+        )
+        for product, raw in zip(pending, raws):
+            if isinstance(raw, Exception):
+                _LOGGER.debug("Batched read of %s failed: %s", product, raw)
+                continue
+            readings[product] = self._parse_sensor_data(raw)
+        return readings
+
+    def cached_block(self, board_serial: str, command_id: int) -> CommandBlock | None:
+        """Return the last response block read for a command, if any."""
+        return self._blocks.get((board_serial, command_id))
+
+    async def read_block(
+        self,
+        board_serial: str,
+        product_serial: str,
+        command_id: int,
+        max_age: float = 0,
+    ) -> CommandBlock | None:
+        """Return the response block of a read command.
+
+        A cached block younger than ``max_age`` seconds is returned without
+        contacting the device. None when the device does not answer, or
+        answers with the response to another command, which is not cached.
+        """
+        cached = self._blocks.get((board_serial, command_id))
+        if cached is not None and time.time() - cached.fetched_at < max_age:
+            return cached
+        with self.tracer.span("read_block", board=board_serial, command=command_id):
+            async with self._board_lock(board_serial):
+                raw = await self._exchange(board_serial, product_serial, command_id)
+        if not raw or not isinstance(raw, list):
+            return None
+        if not _answers(command_id, raw):
+            _LOGGER.debug(
+                "Ignoring response of %s to command %s: it answers another command",
+                board_serial, command_id,
+            )
+            return None
+        block = CommandBlock.from_items(command_id, raw, time.time())
+        self._blocks[(board_serial, command_id)] = block
+        return block
+
+    async def set_parameter(
+        self,
+        board_serial: str,
+        product_serial: str,
+        get_command: int,
+        field: str,
+        value: int,
+    ) -> CommandBlock:
+        """Change one value of a parameter block and write the whole block."""
+        block = await self.prepare_parameter(
+            board_serial, product_serial, get_command, field, value
+        )
+        return await self.write_parameter(board_serial, block)
+
+    async def prepare_parameter(
+        self,
+        board_serial: str,
+        product_serial: str,
+        get_command: int,
+        field: str,
+        value: int,
+    ) -> CommandBlock:
+        """Return a parameter block with one value changed, without writing it.
+
+        The block is read through its Get command only when the cached copy
+        is older than PARAMETER_MAX_AGE. It must match the layout its Set
+        command takes, and the new value the min/max of its boardType unit.
+        """
+        if (set_command := PARAMETER_SET_COMMANDS.get(get_command)) is None:
+            raise HeltyParameterError(f"Command {get_command} has no writable block")
+
+        block = await self.read_block(
+            board_serial, product_serial, get_command, max_age=PARAMETER_MAX_AGE
         )
+        if block is None:
+            raise HeltyConnectionError(f"No response to command {get_command}")
+        _check_layout(set_command, block)
+        if field not in block.fields:
+            raise HeltyParameterError(
+                f"Unknown parameter {field}, expected one of: "
+                + ", ".join(block.fields)
+            )
+        index = block.fields.index(field)
+
+        units = await self._get_board_units(board_serial)
+        low, high = units.get(block.unit_ids[index], (None, None))
+        if (low is not None and value < low) or (high is not None and value > high):
+            raise HeltyParameterError(
+                f"{field} must be between {low} and {high}, got {value}"
+            )
 
-        return self._parse_sensor_data(raw)
+        values = list(block.values)
+        values[index] = value
+        return replace(block, values=tuple(values))
+
+    async def write_parameter(
+        self, board_serial: str, block: CommandBlock
+    ) -> CommandBlock:
+        """Write a block returned by ``prepare_parameter`` with its Set command."""
+        set_command = PARAMETER_SET_COMMANDS[block.command_id]
+        async with self._board_lock(board_serial):
+            await self._send_command(board_serial, set_command, list(block.values))
+
+        block = replace(block, fetched_at=time.time())
+        self._blocks[(board_serial, block.command_id)] = block
+        return block
+
+    async def _get_board_units(self, board_serial: str) -> dict[str, tuple[Any, Any]]:
+        """Return the (min, max) of each unit of the board type, read once."""
+        if (units := self._board_units.get(board_serial)) is not None:
+            return units
+        board = await self._request(
+            "GET", f"/board/board/{board_serial}", endpoint="board"
+        )
+        board_type = board.get("boardType", {}) if isinstance(board, dict) else {}
+        units = {
+            unit["_id"]: (unit.get("min"), unit.get("max"))
+            for unit in board_type.get("units", [])
+            if "_id" in unit
+        }
+        self._board_units[board_serial] = units
+        return units
+
+    async def _read_last_status(self, product_serial: str) -> dict | list | None:
+        """Fetch the cached response to the last command of a product."""
+        body = self._laststatus_bodies.get(product_serial)
+        if body is None:
+            body = self._dumps({"serialNumber": product_serial})
+            self._laststatus_bodies[product_serial] = body
+        return await self._request(
+            "POST", "/log/commandlogs/laststatus", body, endpoint="laststatus"
+        )
 
     @staticmethod
-    def _parse_sensor_data(raw: list | dict | None) -> dict:
-        """Parse raw sensor response into a clean dict."""
-        data: dict = {}
+    def _parse_sensor_data(raw: list | dict | None) -> Reading | None:
+        """Parse raw sensor response into a reading, None if it has no fields."""
         if not raw or not isinstance(raw, list):
-            return data
+            return None
 
+        values: list[float | int | None] = [None] * len(Reading.__slots__)
+        found = False
         for item in raw:
-            field = item.get("field", "")
+            slot = _READING_FIELDS.get(item.get("field", ""))
+            if slot is None:
+                continue
+            index, divisor = slot
             value = item.get("value", 0)
-            if field in SENSOR_FIELDS:
-                key, divisor, _unit = SENSOR_FIELDS[field]
-                if divisor is not None and divisor != 1.0:
-                    data[key] = round(value / divisor, 1)
-                else:
-                    data[key] = value
+            if divisor is not None and divisor != 1.0:
+                values[index] = round(value / divisor, 1)
+            else:
+                values[index] = value
+            found = True
 
-        return data
+        return Reading(*values) if found else None
@@ -0,0 +1,400 @@
+"""On-disk archive of VMC readings in daily binary segments.
+
+Readings are appended as fixed-size records to a raw segment per UTC day
+(``YYYY-MM-DD.seg``). Once a day is over, compaction rewrites its segment
+as a columnar one (``YYYY-MM-DD.col``): one block per device, each column
+zlib-compressed, timestamps delta-encoded. Values are stored as scaled
+integers, with a reserved value standing for a missing one. Product
+serials are numbered in ``serials.txt``, one per line.
+
+Exports read one device-day block at a time, so their memory does not
+depend on how much history is exported.
+"""
+
+from __future__ import annotations
+
+from array import array
+import calendar
+from collections.abc import Iterable, Iterator
+import csv
+from dataclasses import dataclass
+from itertools import accumulate, repeat
+import os
+from pathlib import Path
+import struct
+import sys
+import time
+from typing import IO
+import zlib
+
+from .models import Reading
+
+# Reading field, integer type (array and struct code), scale, missing value
+_FIELDS = (
+    ("temp_indoor", "h", 10, -0x8000),
+    ("temp_outdoor", "h", 10, -0x8000),
+    ("humidity", "H", 10, 0xFFFF),
+    ("co2", "H", 1, 0xFFFF),
+    ("voc", "H", 1, 0xFFFF),
+    ("vmc_status", "b", 1, -0x80),
+)
+FIELDS = tuple(field for field, _code, _scale, _missing in _FIELDS)
+
+# Range of the stored values, the missing value excluded
+_LIMITS = {"h": (-0x7FFF, 0x7FFF), "H": (0, 0xFFFE), "b": (-0x7F, 0x7F)}
+
+_RAW_MAGIC = b"HLR1"
+_COLUMNS_MAGIC = b"HLC1"
+# Raw record: epoch seconds, serial number, then the fields
+_RECORD = struct.Struct("<IH" + "".join(code for _f, code, _s, _m in _FIELDS))
+# Columnar block: serial number, rows; then each column's compressed size
+_BLOCK = struct.Struct("<HI")
+_SIZE = struct.Struct("<I")
+_SWAP = sys.byteorder == "big"
+
+SERIALS_FILE = "serials.txt"
+RAW_SUFFIX = ".seg"
+COLUMNS_SUFFIX = ".col"
+
+# Rows written per Parquet row group
+EXPORT_ROW_GROUP_ROWS = 256 * 1024
+
+
+def _day(ts: float) -> str:
+    """Return the UTC day of a timestamp, as YYYY-MM-DD."""
+    return time.strftime("%Y-%m-%d", time.gmtime(ts))
+
+
+def _day_start(day: str) -> int:
+    """Return the timestamp of midnight UTC of a day."""
+    return calendar.timegm(time.strptime(day, "%Y-%m-%d"))
+
+
+def _encode(value: float | None, code: str, scale: int, missing: int) -> int:
+    """Return the stored integer of a reading value."""
+    if value is None:
+        return missing
+    low, high = _LIMITS[code]
+    return max(low, min(high, round(value * scale)))
+
+
+def _decode(column: Iterable[int], scale: int, missing: int) -> list:
+    """Return the reading values of a stored column."""
+    if scale == 1:
+        return [None if value == missing else value for value in column]
+    return [None if value == missing else value / scale for value in column]
+
+
+@dataclass(frozen=True, slots=True)
+class Chunk:
+    """Readings of one device over (at most) one day, in time order."""
+
+    serial: str
+    times: list[int]
+    # Values of each field in FIELDS, aligned with the times
+    columns: tuple[list, ...]
+
+    def __len__(self) -> int:
+        """Return the number of readings."""
+        return len(self.times)
+
+
+class ReadingArchive:
+    """Append-only archive of readings, rotated by day and compacted.
+
+    A single process appends; compaction of past days may run in another
+    thread while it does, and exports may run in other processes.
+    """
+
+    def __init__(self, root: Path | str) -> None:
+        """Open the archive in ``root``, creating the directory if needed."""
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._serials = self._load_serials()
+        self._numbers = {serial: number for number, serial in enumerate(self._serials)}
+        self._serials_file: IO[str] | None = None
+        self._day: str | None = None
+        self._segment: IO[bytes] | None = None
+        # Days with a raw segment that is no longer appended to
+        self._closed = {path.stem for path in self.root.glob(f"*{RAW_SUFFIX}")}
+
+    def _load_serials(self) -> list[str]:
+        """Return the serials in number order."""
+        try:
+            text = (self.root / SERIALS_FILE).read_text(encoding="utf-8")
+        except FileNotFoundError:
+            return []
+        return text.splitlines()
+
+    def _number(self, serial: str) -> int:
+        """Return the number of a serial, recording new ones."""
+        if (number := self._numbers.get(serial)) is None:
+            if self._serials_file is None:
+                self._serials_file = open(
+                    self.root / SERIALS_FILE, "a", encoding="utf-8"
+                )
+            # Recorded before any record refers to it
+            self._serials_file.write(f"{serial}\n")
+            self._serials_file.flush()
+            number = self._numbers[serial] = len(self._serials)
+            self._serials.append(serial)
+        return number
+
+    def append(self, ts: float, serial: str, reading: Reading) -> None:
+        """Append a reading taken at ``ts`` (epoch seconds)."""
+        day = _day(ts)
+        # Only move forward: a reading stamped before the open day (clock
+        # set back) goes to the open segment rather than to one that may
+        # be under compaction
+        if self._day is None or day > self._day:
+            self._rotate(day)
+        self._segment.write(
+            _RECORD.pack(
+                int(ts),
+                self._number(serial),
+                *(
+                    _encode(getattr(reading, field), code, scale, missing)
+                    for field, code, scale, missing in _FIELDS
+                ),
+            )
+        )
+
+    def _rotate(self, day: str) -> None:
+        """Close the open segment and open the one of ``day``."""
+        if self._segment is not None:
+            self._segment.close()
+            self._closed.add(self._day)
+        self._day = day
+        self._closed.discard(day)
+        self._segment = open(self.root / f"{day}{RAW_SUFFIX}", "ab")
+        if self._segment.tell() == 0:
+            self._segment.write(_RAW_MAGIC)
+
+    def flush(self) -> None:
+        """Write the buffered records to the open segment."""
+        if self._segment is not None:
+            self._segment.flush()
+
+    def close(self) -> None:
+        """Close the open files."""
+        for file in (self._segment, self._serials_file):
+            if file is not None:
+                file.close()
+        self._segment = self._serials_file = None
+
+    def take_closed(self) -> list[str]:
+        """Return the past days to compact, forgetting them.
+
+        Neither the open day nor the current UTC day is returned: before the
+        first append, a raw segment of today is still going to be reopened.
+        """
+        today = _day(time.time())
+        limit = today if self._day is None else min(self._day, today)
+        days = sorted(d for d in self._closed if d < limit)
+        self._closed.difference_update(days)
+        return days
+
+    def compact(self, day: str) -> None:
+        """Rewrite the raw segment of a past day as a columnar one."""
+        raw = self.root / f"{day}{RAW_SUFFIX}"
+        if not raw.exists():
+            return
+        target = self.root / f"{day}{COLUMNS_SUFFIX}"
+        tmp = target.with_suffix(".tmp")
+        start = _day_start(day)
+        with open(tmp, "wb") as file:
+            file.write(_COLUMNS_MAGIC)
+            for number, rows in sorted(self._load_day(day).items()):
+                file.write(_encode_block(number, start, rows))
+            file.flush()
+            os.fsync(file.fileno())
+        tmp.replace(target)
+        raw.unlink()
+
+    def days(self) -> list[str]:
+        """Return the days holding readings, in order."""
+        return sorted(
+            {
+                path.stem
+                for suffix in (RAW_SUFFIX, COLUMNS_SUFFIX)
+                for path in self.root.glob(f"*{suffix}")
+            }
+        )
+
+    def chunks(
+        self,
+        first: str | None = None,
+        last: str | None = None,
+        serials: Iterable[str] | None = None,
+    ) -> Iterator[Chunk]:
+        """Yield the readings by day, then by device.
+
+        ``first`` and ``last`` are inclusive YYYY-MM-DD days; ``serials``
+        restricts the devices. Compacted days are read one block at a
+        time, raw ones (today's, usually) one day at a time.
+        """
+        names = self._load_serials()
+        wanted = None if serials is None else set(serials)
+        for day in self.days():
+            if (first and day < first) or (last and day > last):
+                continue
+            if (self.root / f"{day}{RAW_SUFFIX}").exists():
+                blocks = (
+                    (number, _columns(rows))
+                    for number, rows in sorted(self._load_day(day).items())
+                )
+            else:
+                blocks = _read_blocks(self.root / f"{day}{COLUMNS_SUFFIX}")
+            for number, (times, columns) in blocks:
+                serial = names[number] if number < len(names) else f"#{number}"
+                if wanted is None or serial in wanted:
+                    yield Chunk(
+                        serial,
+                        times,
+                        tuple(
+                            _decode(column, scale, missing)
+                            for column, (_f, _c, scale, missing) in zip(
+                                columns, _FIELDS
+                            )
+                        ),
+                    )
+
+    def _load_day(self, day: str) -> dict[int, list[tuple]]:
+        """Return the rows of a day by serial number, sorted by time.
+
+        Merges a columnar segment with a raw one written after it; rows
+        of a device repeated at the same second are kept once.
+        """
+        by_number: dict[int, dict[int, tuple]] = {}
+        columns_path = self.root / f"{day}{COLUMNS_SUFFIX}"
+        if columns_path.exists():
+            for number, (times, columns) in _read_blocks(columns_path):
+                rows = by_number.setdefault(number, {})
+                for ts, *values in zip(times, *columns):
+                    rows[ts] = (ts, number, *values)
+        raw_path = self.root / f"{day}{RAW_SUFFIX}"
+        if raw_path.exists():
+            data = raw_path.read_bytes()[len(_RAW_MAGIC) :]
+            # A record cut short by a crash is dropped
+            data = data[: len(data) - len(data) % _RECORD.size]
+            for row in _RECORD.iter_unpack(data):
+                by_number.setdefault(row[1], {})[row[0]] = row
+        return {
+            number: [rows[ts] for ts in sorted(rows)]
+            for number, rows in by_number.items()
+        }
+
+
+def _columns(rows: list[tuple]) -> tuple[list[int], list[tuple]]:
+    """Split raw rows into their times and field columns."""
+    times, _numbers, *columns = zip(*rows)
+    return list(times), columns
+
+
+def _encode_block(number: int, start: int, rows: list[tuple]) -> bytes:
+    """Return the columnar block of a device's rows of a day."""
+    times, columns = _columns(rows)
+    arrays = [array("i", (b - a for a, b in zip([start, *times], times)))]
+    arrays.extend(
+        array(code, values) for values, (_f, code, _s, _m) in zip(columns, _FIELDS)
+    )
+    parts = [_BLOCK.pack(number, len(rows))]
+    for column in arrays:
+        if _SWAP:
+            column.byteswap()
+        data = zlib.compress(column.tobytes())
+        parts += (_SIZE.pack(len(data)), data)
+    return b"".join(parts)
+
+
+def _read_blocks(path: Path) -> Iterator[tuple[int, tuple[list[int], list[array]]]]:
+    """Yield the serial number, times and columns of each block of a file."""
+    start = _day_start(path.stem)
+    codes = ("i", *(code for _f, code, _s, _m in _FIELDS))
+    with open(path, "rb") as file:
+        if file.read(len(_COLUMNS_MAGIC)) != _COLUMNS_MAGIC:
+            raise ValueError(f"{path} is not a columnar segment")
+        while header := file.read(_BLOCK.size):
+            number, _rows = _BLOCK.unpack(header)
+            arrays = []
+            for code in codes:
+                (size,) = _SIZE.unpack(file.read(_SIZE.size))
+                column = array(code, zlib.decompress(file.read(size)))
+                if _SWAP:
+                    column.byteswap()
+                arrays.append(column)
+            deltas, *columns = arrays
+            yield number, (list(accumulate(deltas, initial=start))[1:], columns)
+
+
+def _iso(ts: int) -> str:
+    """Return a timestamp as an ISO 8601 UTC time."""
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(ts))
+
+
+def export_csv(chunks: Iterable[Chunk], stream: IO[str]) -> int:
+    """Write chunks as CSV to a text stream; return the rows written."""
+    writer = csv.writer(stream)
+    writer.writerow(("time", "serial", *FIELDS))
+    rows = 0
+    for chunk in chunks:
+        writer.writerows(
+            zip(map(_iso, chunk.times), repeat(chunk.serial), *chunk.columns)
+        )
+        rows += len(chunk)
+    return rows
+
+
+def export_parquet(
+    chunks: Iterable[Chunk],
+    path: Path | str,
+    row_group_rows: int = EXPORT_ROW_GROUP_ROWS,
+) -> int:
+    """Write chunks to a Parquet file; return the rows written.
+
+    Chunks are gathered up to ``row_group_rows`` rows and written as one
+    row group. Needs pyarrow.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as err:
+        raise ImportError("Parquet export needs pyarrow: pip install pyarrow") from err
+
+    integer_types = {"h": pa.int16(), "H": pa.uint16(), "b": pa.int8()}
+    schema = pa.schema(
+        [
+            ("time", pa.timestamp("s", tz="UTC")),
+            ("serial", pa.string()),
+            *(
+                (field, pa.float32() if scale != 1 else integer_types[code])
+                for field, code, scale, _missing in _FIELDS
+            ),
+        ]
+    )
+    rows = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        batches: list = []
+        pending = 0
+        for chunk in chunks:
+            batches.append(
+                pa.RecordBatch.from_arrays(
+                    [
+                        pa.array(values, field.type)
+                        for values, field in zip(
+                            (chunk.times, [chunk.serial] * len(chunk), *chunk.columns),
+                            schema,
+                        )
+                    ],
+                    schema=schema,
+                )
+            )
+            pending += len(chunk)
+            if pending >= row_group_rows:
+                writer.write_table(pa.Table.from_batches(batches, schema))
+                rows += pending
+                batches, pending = [], 0
+        if batches:
+            writer.write_table(pa.Table.from_batches(batches, schema))
+            rows += pending
+    return rows
@@ -2,17 +2,37 @@
 
 from __future__ import annotations
 
+from collections.abc import Mapping
 import logging
 from typing import Any
 
 import aiohttp
 import voluptuous as vol
 
-from homeassistant.config_entries import ConfigFlow, ConfigFlowResult
+from homeassistant.config_entries import (
+    ConfigEntry,
+    ConfigFlow,
+    ConfigFlowResult,
+    OptionsFlow,
+)
 from homeassistant.const import CONF_EMAIL, CONF_PASSWORD
+from homeassistant.core import callback
+from homeassistant.helpers import config_validation as cv
 
-from .api import HeltyCloudAPI, HeltyAuthError, HeltyConnectionError
-from .const import DOMAIN
+from .api import HeltyAuthError, HeltyConnectionError
+from .const import (
+    CONF_CONTROL,
+    CONF_CUSTOMER_DEVICES,
+    CONF_CONTROL_DWELL,
+    CONF_EVENT_TOPIC_PREFIX,
+    CONF_TRACE,
+    CONTROL_CURVE_OPTIONS,
+    DEFAULT_CONTROL_CURVES,
+    DEFAULT_CONTROL_DWELL,
+    DOMAIN,
+)
+from .control import parse_curve
+from .registry import async_get_registry
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -23,12 +43,20 @@ STEP_USER_DATA_SCHEMA = vol.Schema(
     }
 )
 
+STEP_PASSWORD_DATA_SCHEMA = vol.Schema({vol.Required(CONF_PASSWORD): str})
+
 
 class HeltyConfigFlow(ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Helty VMC."""
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(config_entry: ConfigEntry) -> OptionsFlow:
+        """Return the options flow handler."""
+        return HeltyOptionsFlow(config_entry)
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> ConfigFlowResult:
@@ -43,32 +71,168 @@ class HeltyConfigFlow(ConfigFlow, domain=DOMAIN):
             await self.async_set_unique_id(email.lower())
             self._abort_if_unique_id_configured()
 
-            try:
-                async with aiohttp.ClientSession() as session:
-                    api = HeltyCloudAPI(session)
-                    await api.authenticate(email, password)
-                    devices = await api.find_devices()
-            except HeltyAuthError:
-                errors["base"] = "invalid_auth"
-            except (HeltyConnectionError, aiohttp.ClientError):
-                errors["base"] = "cannot_connect"
-            except Exception:
-                _LOGGER.exception("Unexpected error during config flow")
-                errors["base"] = "unknown"
-            else:
-                if not devices:
-                    errors["base"] = "no_devices"
-                else:
-                    return self.async_create_entry(
-                        title=f"Helty VMC ({email})",
-                        data={
-                            CONF_EMAIL: email,
-                            CONF_PASSWORD: password,
-                        },
-                    )
+            if await self._async_log_in(email, password, errors, discover=True):
+                return self.async_create_entry(
+                    title=f"Helty VMC ({email})",
+                    data={
+                        CONF_EMAIL: email,
+                        CONF_PASSWORD: password,
+                    },
+                )
 
         return self.async_show_form(
             step_id="user",
             data_schema=STEP_USER_DATA_SCHEMA,
             errors=errors,
         )
+
+    async def async_step_reauth(
+        self, entry_data: Mapping[str, Any]
+    ) -> ConfigFlowResult:
+        """Handle rejected credentials."""
+        return await self.async_step_reauth_confirm()
+
+    async def async_step_reauth_confirm(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Ask for the new password of the account."""
+        return await self._async_step_password("reauth_confirm", user_input)
+
+    async def async_step_reconfigure(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Change the password of a configured account."""
+        return await self._async_step_password("reconfigure", user_input)
+
+    async def _async_step_password(
+        self, step_id: str, user_input: dict[str, Any] | None
+    ) -> ConfigFlowResult:
+        """Validate a new password and reload the entry with it."""
+        entry = self.hass.config_entries.async_get_entry(self.context["entry_id"])
+        assert entry is not None
+        email = entry.data[CONF_EMAIL]
+        errors: dict[str, str] = {}
+
+        if user_input is not None:
+            password = user_input[CONF_PASSWORD]
+            # The entry keeps its inventory, so only the login is checked
+            if await self._async_log_in(email, password, errors, discover=False):
+                return self.async_update_reload_and_abort(
+                    entry,
+                    data={**entry.data, CONF_PASSWORD: password},
+                    reason=(
+                        "reauth_successful"
+                        if step_id == "reauth_confirm"
+                        else "reconfigure_successful"
+                    ),
+                )
+
+        return self.async_show_form(
+            step_id=step_id,
+            data_schema=STEP_PASSWORD_DATA_SCHEMA,
+            description_placeholders={"email": email},
+            errors=errors,
+        )
+
+    async def _async_log_in(
+        self,
+        email: str,
+        password: str,
+        errors: dict[str, str],
+        *,
+        discover: bool,
+    ) -> bool:
+        """Log in with the account's shared client, filling ``errors`` on failure.
+
+        On success the client, already holding valid tokens, and the
+        discovered devices are handed off to the entry setup that follows,
+        so it neither logs in nor searches the products again.
+        """
+        registry = async_get_registry(self.hass)
+        api = registry.async_acquire_client(email, password)
+        devices = None
+        try:
+            await api.authenticate(email, password)
+            if discover:
+                devices = await api.find_devices()
+        except HeltyAuthError:
+            errors["base"] = "invalid_auth"
+        except (HeltyConnectionError, aiohttp.ClientError):
+            errors["base"] = "cannot_connect"
+        except Exception:
+            _LOGGER.exception("Unexpected error during config flow")
+            errors["base"] = "unknown"
+        else:
+            if discover and not devices:
+                errors["base"] = "no_devices"
+            else:
+                await registry.async_hand_off(email, devices)
+                return True
+        await registry.async_release_client(email)
+        return False
+
+
+class HeltyOptionsFlow(OptionsFlow):
+    """Handle Helty VMC options."""
+
+    def __init__(self, config_entry: ConfigEntry) -> None:
+        """Initialize the options flow."""
+        self._entry = config_entry
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> ConfigFlowResult:
+        """Manage the push event, tracing, device and demand control options."""
+        errors: dict[str, str] = {}
+        if user_input is not None:
+            for option in CONTROL_CURVE_OPTIONS.values():
+                try:
+                    parse_curve(user_input.get(option, ""))
+                except ValueError:
+                    errors[option] = "invalid_curve"
+            if not errors:
+                return self.async_create_entry(title="", data=user_input)
+
+        options = self._entry.options if user_input is None else user_input
+        # A curve emptied in the submitted form stays empty
+        curves = DEFAULT_CONTROL_CURVES if user_input is None else {}
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(
+                        CONF_EVENT_TOPIC_PREFIX,
+                        description={
+                            "suggested_value": options.get(CONF_EVENT_TOPIC_PREFIX)
+                        },
+                    ): str,
+                    vol.Optional(
+                        CONF_TRACE, default=options.get(CONF_TRACE, False)
+                    ): bool,
+                    vol.Optional(
+                        CONF_CUSTOMER_DEVICES,
+                        default=options.get(CONF_CUSTOMER_DEVICES, False),
+                    ): bool,
+                    vol.Optional(
+                        CONF_CONTROL, default=options.get(CONF_CONTROL, False)
+                    ): bool,
+                    # Emptying a curve turns it off, so no default refills it
+                    **{
+                        vol.Optional(
+                            option,
+                            description={
+                                "suggested_value": options.get(
+                                    option, curves.get(field)
+                                )
+                            },
+                        ): str
+                        for field, option in CONTROL_CURVE_OPTIONS.items()
+                    },
+                    vol.Optional(
+                        CONF_CONTROL_DWELL,
+                        default=options.get(CONF_CONTROL_DWELL, DEFAULT_CONTROL_DWELL),
+                    ): cv.positive_int,
+                }
+            ),
+            errors=errors,
+        )
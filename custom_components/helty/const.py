@@ -2,6 +2,12 @@
 
 DOMAIN = "helty"
 
+# hass.data key of the clients and coordinators shared across config entries
+DATA_REGISTRY = f"{DOMAIN}_registry"
+
+# How long a client logged in by a config flow waits for the entry setup
+HANDOFF_TTL = 120  # seconds
+
 # API Configuration
 API_BASE_URL = "https://api.hcloud.heltyair.com"
 COGNITO_REGION = "eu-central-1"
@@ -10,12 +16,49 @@ COGNITO_CLIENT_ID = "7k0c21g92bk3413frij8rso6rk"
 # Polling interval
 UPDATE_INTERVAL = 60  # seconds
 
+# Background check of the account's device list
+REDISCOVERY_INTERVAL = 21600  # seconds
+
+# Dispatcher signal announcing coordinators added to an entry, by entry ID
+SIGNAL_NEW_COORDINATORS = f"{DOMAIN}_new_coordinators_{{}}"
+
 # Delay after sending GetStatus before reading laststatus
 STATUS_READ_DELAY = 4  # seconds
 
+# Persisted device inventory and last readings
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 30  # seconds
+
+# Settle window that coalesces refresh requests issued after commands
+REFRESH_SETTLE_DELAY = 2  # seconds
+
+# Options: prefix of the MQTT event topics ({prefix}/prod/evt/{boardSerial})
+CONF_EVENT_TOPIC_PREFIX = "event_topic_prefix"
+# Options: record request spans, exported through the diagnostics
+CONF_TRACE = "trace"
+# Options: also set up the devices of other owners the account can see
+CONF_CUSTOMER_DEVICES = "customer_devices"
+# Options: demand-controlled ventilation, its curves and minimum dwell time
+CONF_CONTROL = "control"
+CONF_CONTROL_CO2 = "control_co2"
+CONF_CONTROL_VOC = "control_voc"
+CONF_CONTROL_HUMIDITY = "control_humidity"
+CONF_CONTROL_DWELL = "control_dwell"
+
+# Services
+SERVICE_REFRESH = "refresh"
+SERVICE_SET_PARAMETER = "set_parameter"
+ATTR_BLOCK = "block"
+ATTR_PARAMETER = "parameter"
+ATTR_VALUE = "value"
+
 # VMC Command IDs
 CMD_GET_STATUS = 0
 CMD_GET_INFO = 1
+CMD_GET_PARAM_SPEED = 32
+CMD_GET_PARAM_TRIGGER = 33
+CMD_GET_PARAM_FILTER = 36
+CMD_GET_LIGHT_LED = 48
 CMD_POWER_OFF = 20
 CMD_COOLING = 21
 CMD_NIGHT = 22
@@ -33,6 +76,99 @@ CMD_ENABLE_STANDBY = 40
 CMD_DISABLE_STANDBY = 41
 CMD_ENABLE_LED = 42
 CMD_DISABLE_LED = 43
+CMD_LED_INTENSITY = 26
+CMD_SET_PARAM_SPEED = 27
+CMD_SET_PARAM_TRIGGER = 28
+CMD_SET_PARAM_FILTER = 31
+
+# Write command taking the full value array of each readable parameter block
+PARAMETER_SET_COMMANDS = {
+    CMD_GET_PARAM_SPEED: CMD_SET_PARAM_SPEED,
+    CMD_GET_PARAM_TRIGGER: CMD_SET_PARAM_TRIGGER,
+    CMD_GET_PARAM_FILTER: CMD_SET_PARAM_FILTER,
+    CMD_GET_LIGHT_LED: CMD_LED_INTENSITY,
+}
+
+# Number of values each Set command takes and the fields the block read
+# back must carry: the whole block, in order, where KNOWLEDGE.md documents
+# it, else the documented fields. CLIENTE accounts may see partial blocks,
+# which must not be written back
+PARAMETER_LAYOUTS = {
+    CMD_SET_PARAM_SPEED: (
+        20,
+        (
+            *(f"FanIntSpeed{n}" for n in range(1, 5)),
+            *(f"FanExtSpeed{n}" for n in range(1, 5)),
+            "RoundsK",
+            "SpeedServoClose",
+        ),
+    ),
+    CMD_SET_PARAM_TRIGGER: (
+        27,
+        (
+            "CO2Trigg",
+            "VocTrigg",
+            "DeltaTemp",
+            "IceAlarm",
+            "TempHumTrig",
+            "HumHighSpeed",
+            "NightLedIntensity",
+            "DeltaFreeHeating",
+            "DeltaFreeCooling",
+            "ConfortHeating",
+            "ConfortCooling",
+        ),
+    ),
+    CMD_SET_PARAM_FILTER: (
+        12,
+        (
+            *(f"Lt10SSpeed{n}" for n in range(1, 5)),
+            "Lt10SHyper",
+            "Lt10SNight",
+            "Lt10SRaff",
+            "Lt10SDeltaTemp",
+            "Lt10SCO2Trigg",
+            "Lt10SHighHumTrigg",
+            "Lt10SLowHumTrigg",
+            "FilterLife",
+        ),
+    ),
+    CMD_LED_INTENSITY: (1, ("Intensity",)),
+}
+
+# Parameter blocks selectable in the set_parameter service
+PARAMETER_BLOCKS = {
+    "speed": CMD_GET_PARAM_SPEED,
+    "trigger": CMD_GET_PARAM_TRIGGER,
+    "filter": CMD_GET_PARAM_FILTER,
+    "led": CMD_GET_LIGHT_LED,
+}
+
+# Field present in the response to each read command. laststatus and push
+# events hold whatever the board answered last, so a response lacking it,
+# or one of another command carrying status fields, answers something else
+READ_SIGNATURES = {
+    CMD_GET_STATUS: "VMCStatus",
+    CMD_GET_INFO: "IP",
+    CMD_GET_PARAM_SPEED: "RoundsK",
+    CMD_GET_PARAM_TRIGGER: "CO2Trigg",
+    34: "OffsetCo2",  # GetParamOffset
+    CMD_GET_PARAM_FILTER: "FilterLife",
+    CMD_GET_LIGHT_LED: "Intensity",
+    49: "NumTab",  # GetNumTab
+}
+
+# Maximum age of a cached block used as the base of a parameter write
+PARAMETER_MAX_AGE = 5 * 60  # seconds
+
+# Read commands polled besides GetStatus, with their refresh period
+READ_TIERS = {
+    CMD_GET_PARAM_SPEED: 60 * 60,  # seconds
+    CMD_GET_PARAM_TRIGGER: 60 * 60,
+    CMD_GET_PARAM_FILTER: 60 * 60,
+    CMD_GET_LIGHT_LED: 60 * 60,
+    CMD_GET_INFO: 24 * 60 * 60,
+}
 
 # Speed level to command ID mapping
 SPEED_COMMANDS = {
@@ -80,6 +216,50 @@ VMC_STATUS_TO_PRESET = {
     VMC_STATUS_COOLING: PRESET_COOLING,
 }
 
+# Fan percentage reported for statuses that do not follow the commanded speed
+VMC_STATUS_PERCENTAGE = {
+    VMC_STATUS_HYPER: 100,
+    VMC_STATUS_NIGHT: 25,
+    VMC_STATUS_COOLING: 25,
+}
+
+# Command state groups, used to skip commands that would change nothing
+STATE_MODE = "mode"
+STATE_LED = "led"
+STATE_SENSOR_MODE = "sensor_mode"
+STATE_STANDBY = "standby"
+
+# How long a state read back from the device may suppress a redundant
+# command: the last poll, or the one before if it is late
+COMMAND_STATE_TTL = 2 * UPDATE_INTERVAL  # seconds
+
+# Target state of each command
+COMMAND_TARGETS = {
+    CMD_POWER_OFF: (STATE_MODE, "off"),
+    CMD_COOLING: (STATE_MODE, "cooling"),
+    CMD_NIGHT: (STATE_MODE, "night"),
+    CMD_HYPER: (STATE_MODE, "hyper"),
+    CMD_SET_SPEED_1: (STATE_MODE, "speed_1"),
+    CMD_SET_SPEED_2: (STATE_MODE, "speed_2"),
+    CMD_SET_SPEED_3: (STATE_MODE, "speed_3"),
+    CMD_SET_SPEED_4: (STATE_MODE, "speed_4"),
+    CMD_ENABLE_LED: (STATE_LED, True),
+    CMD_DISABLE_LED: (STATE_LED, False),
+    CMD_ENABLE_SENSOR: (STATE_SENSOR_MODE, True),
+    CMD_DISABLE_SENSOR: (STATE_SENSOR_MODE, False),
+    CMD_ENABLE_STANDBY: (STATE_STANDBY, True),
+    CMD_DISABLE_STANDBY: (STATE_STANDBY, False),
+}
+
+# Mode reported by each VMC status; normal does not tell which speed is set
+VMC_STATUS_MODES = {
+    VMC_STATUS_OFF: "off",
+    VMC_STATUS_NORMAL: "normal",
+    VMC_STATUS_HYPER: "hyper",
+    VMC_STATUS_NIGHT: "night",
+    VMC_STATUS_COOLING: "cooling",
+}
+
 # Sensor field definitions: (field_name, label, divisor, unit)
 SENSOR_FIELDS = {
     "TemperaturaInterna": ("temp_indoor", 10.0, "°C"),
@@ -92,3 +272,37 @@ SENSOR_FIELDS = {
 
 # Number of speed levels
 SPEED_COUNT = 4
+
+# In-memory reading history: 24 h of 1-minute samples per device
+HISTORY_CAPACITY = 24 * 60
+HISTORY_FIELDS = ("temp_indoor", "temp_outdoor", "humidity", "co2", "voc", "vmc_status")
+
+# Rolling statistics windows exposed as sensor attributes (name: seconds)
+HISTORY_WINDOWS = {
+    "15m": 15 * 60,
+    "1h": 60 * 60,
+    "24h": 24 * 60 * 60,
+}
+
+# Per-installation aggregates: reading fields averaged and maximized
+AGGREGATE_MEAN_FIELDS = ("temp_indoor", "humidity")
+AGGREGATE_MAX_FIELDS = ("co2", "voc")
+
+# Demand control: option holding the curve of each reading field, as the
+# comma-separated thresholds at which speed 2, 3, 4 and hyper start
+CONTROL_CURVE_OPTIONS = {
+    "co2": CONF_CONTROL_CO2,
+    "voc": CONF_CONTROL_VOC,
+    "humidity": CONF_CONTROL_HUMIDITY,
+}
+DEFAULT_CONTROL_CURVES = {
+    "co2": "800, 1000, 1200, 1400",  # ppm
+    "voc": "300, 450, 600",  # ppb
+    "humidity": "65, 70, 75",  # %
+}
+# How far below a threshold a reading must fall to leave its level
+CONTROL_HYSTERESIS = {"co2": 50, "voc": 25, "humidity": 2}
+DEFAULT_CONTROL_DWELL = 5 * 60  # seconds
+
+# Command of each demand level: the speeds, then hyperventilation
+CONTROL_LEVEL_COMMANDS = {**SPEED_COMMANDS, SPEED_COUNT + 1: CMD_HYPER}
@@ -0,0 +1,95 @@
+"""Demand-controlled ventilation: fan level from air-quality readings."""
+
+from __future__ import annotations
+
+from collections.abc import Mapping, Sequence
+
+from .const import (
+    CONTROL_HYSTERESIS,
+    CONTROL_LEVEL_COMMANDS,
+    VMC_STATUS_HYPER,
+    VMC_STATUS_NORMAL,
+)
+from .models import Reading
+
+
+def parse_curve(text: str) -> tuple[float, ...]:
+    """Parse comma-separated ascending thresholds; empty disables the curve.
+
+    Raises ValueError when a value is not a number, the values do not
+    increase or there are more than the demand levels above speed 1.
+    """
+    if not text.strip():
+        return ()
+    thresholds = tuple(float(value) for value in text.split(","))
+    if len(thresholds) >= len(CONTROL_LEVEL_COMMANDS):
+        raise ValueError(f"At most {len(CONTROL_LEVEL_COMMANDS) - 1} thresholds")
+    if any(a >= b for a, b in zip(thresholds, thresholds[1:])):
+        raise ValueError("Thresholds must increase")
+    return thresholds
+
+
+class DemandController:
+    """Demand level of one VMC following its CO2, VOC and humidity readings.
+
+    Levels 1 to 4 are the fan speeds and 5 is hyperventilation. Each curve
+    raises the level by one per threshold reached and the highest level
+    asked by any field wins. Each field only leaves its own level downwards
+    once its reading falls the field's hysteresis below the threshold, and
+    the fan level changes at most once per dwell time, so a reading
+    hovering around a threshold does not make the fan flap.
+    """
+
+    __slots__ = ("_curves", "_dwell", "level", "_field_levels", "_changed_at")
+
+    def __init__(self, curves: Mapping[str, Sequence[float]], dwell: float) -> None:
+        """Initialize with the thresholds of each field and the dwell time."""
+        self._curves = {field: tuple(curve) for field, curve in curves.items() if curve}
+        self._dwell = dwell
+        self.level: int | None = None
+        # Level asked by each field at its last reading
+        self._field_levels: dict[str, int] = {}
+        self._changed_at: float | None = None
+
+    def reset(self) -> None:
+        """Forget the levels, so that the next reading sets one right away."""
+        self.level = None
+        self._field_levels.clear()
+        self._changed_at = None
+
+    def evaluate(self, now: float, reading: Reading) -> int | None:
+        """Return the level to command for a reading, None to keep the fan as is."""
+        if reading.vmc_status is None:
+            # Without the mode, hold the current level and its dwell time
+            return None
+        if reading.vmc_status not in (VMC_STATUS_NORMAL, VMC_STATUS_HYPER):
+            # Off, night and cooling are the user's choice: stay out of the way
+            self.reset()
+            return None
+        target = self._target(reading)
+        if target is None or target == self.level:
+            return None
+        if self._changed_at is not None and now - self._changed_at < self._dwell:
+            return None
+        self.level = target
+        self._changed_at = now
+        return target
+
+    def _target(self, reading: Reading) -> int | None:
+        """Return the level the reading asks for, None without any value."""
+        target = None
+        for field, thresholds in self._curves.items():
+            if (value := getattr(reading, field)) is None:
+                continue
+            level = 1 + sum(value >= threshold for threshold in thresholds)
+            previous = self._field_levels.get(field)
+            if previous is not None and level < previous:
+                # The dead band only holds the level this field asked itself
+                margin = CONTROL_HYSTERESIS[field]
+                level = min(
+                    previous,
+                    1 + sum(value >= threshold - margin for threshold in thresholds),
+                )
+            self._field_levels[field] = level
+            target = level if target is None else max(target, level)
+        return target
@@ -2,53 +2,258 @@
 
 from __future__ import annotations
 
+import asyncio
+from contextlib import AsyncExitStack
 from datetime import timedelta
 import logging
+import time
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.exceptions import ConfigEntryAuthFailed
+from homeassistant.helpers.debounce import Debouncer
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 
 from .api import HeltyCloudAPI, HeltyAuthError, HeltyConnectionError
-from .const import DOMAIN, UPDATE_INTERVAL
+from .const import (
+    CONTROL_LEVEL_COMMANDS,
+    DOMAIN,
+    READ_TIERS,
+    REFRESH_SETTLE_DELAY,
+    SPEED_COMMANDS,
+    SPEED_COUNT,
+    STATE_MODE,
+    UPDATE_INTERVAL,
+    VMC_STATUS_MODES,
+    VMC_STATUS_OFF,
+    VMC_STATUS_PERCENTAGE,
+    VMC_STATUS_TO_PRESET,
+)
+from .control import DemandController
+from .history import ReadingHistory
+from .models import CommandBlock, Device, FanState, Reading
 
 _LOGGER = logging.getLogger(__name__)
 
 
-class HeltyDataUpdateCoordinator(DataUpdateCoordinator[dict]):
+class HeltyDataUpdateCoordinator(DataUpdateCoordinator[Reading]):
     """Coordinator that polls sensor data from the Helty cloud API."""
 
     def __init__(
         self,
         hass: HomeAssistant,
         api: HeltyCloudAPI,
-        board_serial: str,
-        product_serial: str,
+        device: Device,
     ) -> None:
         """Initialize the coordinator."""
         super().__init__(
             hass,
             _LOGGER,
-            name=f"{DOMAIN}_{board_serial}",
+            name=f"{DOMAIN}_{device.board_serial}",
             update_interval=timedelta(seconds=UPDATE_INTERVAL),
+            # Let bursts of commands settle so they cost a single status read
+            request_refresh_debouncer=Debouncer(
+                hass, _LOGGER, cooldown=REFRESH_SETTLE_DELAY, immediate=False
+            ),
         )
         self.api = api
-        self.board_serial = board_serial
-        self.product_serial = product_serial
+        self.device = device
+        self.board_serial = device.board_serial
+        self.product_serial = device.serial
+        self.history = ReadingHistory()
+        # Speed level of the last speed command; the API only reports the mode
+        self.commanded_speed = 1
+        self.fan_state: FanState | None = None
+        # Held for the whole send/wait/read cycle: one status read per board
+        self.refresh_lock = asyncio.Lock()
+        # Last read attempt per tiered command, successful or not
+        self._block_attempts: dict[int, float] = {}
+        # Demand controller set by the entry owning the board, if enabled
+        self.controller: DemandController | None = None
 
-    async def _async_update_data(self) -> dict:
+    @callback
+    def async_start_push(self, api: HeltyCloudAPI) -> CALLBACK_TYPE:
+        """Publish readings pushed through a client as soon as they arrive.
+
+        The client is the one the entry's push transport feeds, which for a
+        shared board need not be the client polling it.
+        """
+        return api.subscribe_events(self.board_serial, self._handle_pushed_reading)
+
+    @callback
+    def _handle_pushed_reading(self, data: Reading) -> None:
+        """Handle a reading pushed outside of our own poll."""
+        # An in-flight poll returns the event it was waiting for itself
+        if self.refresh_lock.locked():
+            return
+        # Events may carry only some fields: keep the others as last known
+        if self.data is not None:
+            data = self.data.merge(data)
+        self.async_set_reading(data)
+
+    async def _async_update_data(self) -> Reading:
         """Fetch sensor data from the API."""
         try:
-            data = await self.api.read_sensors(
-                self.board_serial, self.product_serial
-            )
+            with self.api.tracer.span("poll", "coordinator", board=self.board_serial):
+                async with self.refresh_lock:
+                    data = await self.api.read_sensors(
+                        self.board_serial, self.product_serial
+                    )
+                    if data is not None:
+                        await self._async_read_due_block()
         except HeltyAuthError as err:
-            raise UpdateFailed(f"Authentication error: {err}") from err
+            raise ConfigEntryAuthFailed(f"Authentication error: {err}") from err
         except HeltyConnectionError as err:
             raise UpdateFailed(f"Connection error: {err}") from err
         except Exception as err:
             raise UpdateFailed(f"Error fetching data: {err}") from err
 
-        if not data:
+        if data is None:
             raise UpdateFailed("No sensor data received")
 
+        self._process_reading(data)
         return data
+
+    def block(self, command_id: int) -> CommandBlock | None:
+        """Return the cached response block of a tiered read command."""
+        return self.api.cached_block(self.board_serial, command_id)
+
+    async def _async_read_due_block(self) -> None:
+        """Read the most overdue tiered block, at most one per poll.
+
+        Each extra read costs another send/wait/read cycle, so spreading
+        them over polls keeps every cycle short.
+        """
+        now = time.time()
+        overdue = {
+            command_id: now - self._block_attempts.get(command_id, 0) - period
+            for command_id, period in READ_TIERS.items()
+        }
+        command_id = max(overdue, key=overdue.__getitem__)
+        if overdue[command_id] < 0:
+            return
+        self._block_attempts[command_id] = now
+        try:
+            await self.api.read_block(
+                self.board_serial,
+                self.product_serial,
+                command_id,
+                max_age=READ_TIERS[command_id],
+            )
+        except (HeltyAuthError, HeltyConnectionError) as err:
+            _LOGGER.debug(
+                "Reading block %s of %s failed: %s", command_id, self.board_serial, err
+            )
+
+    @callback
+    def async_restore(self, data: Reading, commanded_speed: int | None) -> None:
+        """Start from the last known reading until the first poll succeeds."""
+        if commanded_speed is not None:
+            self.commanded_speed = commanded_speed
+        self.data = data
+        self.fan_state = self._derive_fan_state(data.vmc_status)
+
+    @callback
+    def async_set_reading(self, data: Reading) -> None:
+        """Publish a reading obtained outside the polling cycle."""
+        self._process_reading(data)
+        self.async_set_updated_data(data)
+
+    def _process_reading(self, data: Reading) -> None:
+        """Record a new reading and derive the state that depends on it."""
+        now = time.time()
+        self.history.append(now, data)
+        self.fan_state = self._derive_fan_state(data.vmc_status)
+        self._record_mode(data.vmc_status)
+        # Act on the reading itself, without a round trip through the states
+        if self.controller is not None and (
+            level := self.controller.evaluate(now, data)
+        ) is not None:
+            self.hass.async_create_background_task(
+                self._async_apply_control(level),
+                f"{DOMAIN}_control_{self.board_serial}",
+            )
+
+    async def _async_apply_control(self, level: int) -> None:
+        """Send the command of a demand level chosen by the controller."""
+        _LOGGER.debug("Demand control sets %s to level %s", self.board_serial, level)
+        try:
+            await self.api.send_command(
+                self.board_serial, CONTROL_LEVEL_COMMANDS[level]
+            )
+        except (HeltyAuthError, HeltyConnectionError) as err:
+            _LOGGER.warning("Demand control of %s failed: %s", self.board_serial, err)
+            # Retry with the next reading
+            if self.controller is not None:
+                self.controller.reset()
+            return
+        if level in SPEED_COMMANDS:
+            self.async_set_commanded_speed(level)
+        await self.async_request_refresh()
+
+    def _record_mode(self, status: int | None) -> None:
+        """Feed the read-back mode to the API's redundant-command check."""
+        if (mode := VMC_STATUS_MODES.get(status)) is None:
+            return
+        # Normal mode does not report the speed, so it never matches the
+        # target of a speed command and speed commands are always sent
+        self.api.record_state(self.board_serial, STATE_MODE, mode, confirmed=True)
+
+    @callback
+    def async_set_commanded_speed(self, speed: int) -> None:
+        """Record a speed command and refresh the derived fan state."""
+        self.commanded_speed = speed
+        if self.data is not None:
+            self.fan_state = self._derive_fan_state(self.data.vmc_status)
+            self.async_update_listeners()
+
+    def _derive_fan_state(self, status: int | None) -> FanState:
+        """Compute on/off, preset and percentage from a VMC status."""
+        if status is None:
+            return FanState(is_on=None, preset_mode=None, percentage=0)
+        if status == VMC_STATUS_OFF:
+            return FanState(is_on=False, preset_mode=None, percentage=0)
+        return FanState(
+            is_on=True,
+            preset_mode=VMC_STATUS_TO_PRESET.get(status),
+            percentage=VMC_STATUS_PERCENTAGE.get(
+                status, self.commanded_speed * 100 // SPEED_COUNT
+            ),
+        )
+
+
+async def async_refresh_batch(
+    coordinators: list[HeltyDataUpdateCoordinator],
+) -> list[HeltyDataUpdateCoordinator]:
+    """Refresh several coordinators with one batched poll per API client.
+
+    Coordinators whose device gave no reading are marked as failed, and
+    returned.
+    """
+    by_api: dict[int, list[HeltyDataUpdateCoordinator]] = {}
+    for coordinator in coordinators:
+        by_api.setdefault(id(coordinator.api), []).append(coordinator)
+    failed: list[HeltyDataUpdateCoordinator] = []
+
+    async def _refresh(group: list[HeltyDataUpdateCoordinator]) -> None:
+        try:
+            async with AsyncExitStack() as stack:
+                # Lock in a stable order so concurrent batches cannot deadlock
+                for coordinator in sorted(group, key=lambda c: c.board_serial):
+                    await stack.enter_async_context(coordinator.refresh_lock)
+                readings = await group[0].api.read_sensors_many(
+                    [(c.board_serial, c.product_serial) for c in group]
+                )
+        except (HeltyAuthError, HeltyConnectionError) as err:
+            error = UpdateFailed(f"Batched read failed: {err}")
+            readings = {}
+        else:
+            error = UpdateFailed("No sensor data received")
+        for coordinator in group:
+            if (reading := readings.get(coordinator.product_serial)) is not None:
+                coordinator.async_set_reading(reading)
+            else:
+                coordinator.async_set_update_error(error)
+                failed.append(coordinator)
+
+    await asyncio.gather(*(_refresh(group) for group in by_api.values()))
+    return failed
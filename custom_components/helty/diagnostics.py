@@ -0,0 +1,47 @@
+"""Diagnostics support for Helty VMC."""
+
+from __future__ import annotations
+
+from dataclasses import asdict
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_EMAIL, CONF_PASSWORD
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+
+TO_REDACT = {CONF_EMAIL, CONF_PASSWORD, "owner", "installation"}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry.
+
+    ``trace`` holds the recorded request spans in the Chrome trace-event
+    format (empty unless tracing is enabled in the options): save it to a
+    file and open it in chrome://tracing or Perfetto.
+    """
+    data = hass.data[DOMAIN][entry.entry_id]
+    api = data["api"]
+    return {
+        "entry": {
+            "data": async_redact_data(entry.data, TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "devices": [
+            {
+                **async_redact_data(asdict(device), TO_REDACT),
+                "last_update_success": (
+                    coordinator.last_update_success
+                    if (coordinator := data["claimed"].get(device.serial))
+                    else None
+                ),
+            }
+            for device in data["devices"]
+        ],
+        "api_metrics": api.stats.render(),
+        "trace": api.tracer.export(),
+    }
@@ -5,11 +5,19 @@ from __future__ import annotations
 import math
 from typing import Any
 
-from homeassistant.components.fan import FanEntity, FanEntityFeature
+from homeassistant.components.fan import (
+    ATTR_PERCENTAGE,
+    ATTR_PRESET_MODE,
+    FanEntity,
+    FanEntityFeature,
+)
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.const import STATE_OFF, STATE_ON
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .const import (
@@ -17,16 +25,13 @@ from .const import (
     DOMAIN,
     PRESET_MODES,
     PRESET_MODE_COMMANDS,
+    PRESET_NORMAL,
+    SIGNAL_NEW_COORDINATORS,
     SPEED_COMMANDS,
     SPEED_COUNT,
-    VMC_STATUS_COOLING,
-    VMC_STATUS_HYPER,
-    VMC_STATUS_NIGHT,
-    VMC_STATUS_NORMAL,
-    VMC_STATUS_OFF,
-    VMC_STATUS_TO_PRESET,
 )
 from .coordinator import HeltyDataUpdateCoordinator
+from .models import FanState
 
 
 async def async_setup_entry(
@@ -36,13 +41,24 @@ async def async_setup_entry(
 ) -> None:
     """Set up Helty VMC fan entities."""
     data = hass.data[DOMAIN][entry.entry_id]
-    entities = []
-    for device, coordinator in zip(data["devices"], data["coordinators"]):
-        entities.append(HeltyVmcFan(coordinator, device, data["api"]))
-    async_add_entities(entities)
+
+    @callback
+    def _async_add(coordinators: list[HeltyDataUpdateCoordinator]) -> None:
+        async_add_entities(
+            HeltyVmcFan(coordinator, data["api"]) for coordinator in coordinators
+        )
+
+    _async_add(data["coordinators"])
+    entry.async_on_unload(
+        async_dispatcher_connect(
+            hass, SIGNAL_NEW_COORDINATORS.format(entry.entry_id), _async_add
+        )
+    )
 
 
-class HeltyVmcFan(CoordinatorEntity[HeltyDataUpdateCoordinator], FanEntity):
+class HeltyVmcFan(
+    CoordinatorEntity[HeltyDataUpdateCoordinator], FanEntity, RestoreEntity
+):
     """Representation of a Helty VMC as a fan entity."""
 
     _attr_has_entity_name = True
@@ -59,64 +75,66 @@ class HeltyVmcFan(CoordinatorEntity[HeltyDataUpdateCoordinator], FanEntity):
     def __init__(
         self,
         coordinator: HeltyDataUpdateCoordinator,
-        device: dict,
         api,
     ) -> None:
         """Initialize the fan entity."""
         super().__init__(coordinator)
         self._api = api
-        self._device = device
-        self._board_serial = device["board_serial"]
-        self._attr_unique_id = f"{device['serial']}_fan"
+        device = coordinator.device
+        self._board_serial = device.board_serial
+        self._attr_unique_id = f"{device.serial}_fan"
         self._attr_device_info = DeviceInfo(
-            identifiers={(DOMAIN, device["serial"])},
-            name=f"Helty {device['model']}",
+            identifiers={(DOMAIN, device.serial)},
+            name=f"Helty {device.model}",
             manufacturer="Helty",
-            model=device["model"],
-            serial_number=device["serial"],
+            model=device.model,
+            serial_number=device.serial,
             configuration_url="https://hcloud.heltyair.com",
         )
-        if device.get("installation") and device["installation"] != "N/A":
-            self._attr_device_info["suggested_area"] = device["installation"]
+        if device.installation and device.installation != "N/A":
+            self._attr_device_info["suggested_area"] = device.installation
+        self._restored_state: FanState | None = None
+
+    async def async_added_to_hass(self) -> None:
+        """Restore the last known state until the first poll."""
+        await super().async_added_to_hass()
+        last = await self.async_get_last_state()
+        if (
+            self.coordinator.fan_state is None
+            and last is not None
+            and last.state in (STATE_ON, STATE_OFF)
+        ):
+            self._restored_state = FanState(
+                is_on=last.state == STATE_ON,
+                preset_mode=last.attributes.get(ATTR_PRESET_MODE),
+                percentage=last.attributes.get(ATTR_PERCENTAGE),
+            )
+
+    @property
+    def _fan_state(self) -> FanState | None:
+        """Return the live fan state, or the restored one before the first poll."""
+        return self.coordinator.fan_state or self._restored_state
 
     @property
     def is_on(self) -> bool | None:
         """Return true if the VMC is on."""
-        if self.coordinator.data is None:
+        if (state := self._fan_state) is None:
             return None
-        status = self.coordinator.data.get("vmc_status")
-        if status is None:
-            return None
-        return status != VMC_STATUS_OFF
+        return state.is_on
 
     @property
     def percentage(self) -> int | None:
         """Return the current speed as a percentage."""
-        if self.coordinator.data is None:
+        if (state := self._fan_state) is None:
             return None
-        status = self.coordinator.data.get("vmc_status")
-        if status is None or status == VMC_STATUS_OFF:
-            return 0
-        # Map VMC statuses to speed percentages
-        # Normal = speed level from last command (assume speed 1 = 25%)
-        # We approximate: normal=25, night=25, hyper=100, cooling=25
-        status_to_pct = {
-            VMC_STATUS_NORMAL: 25,
-            VMC_STATUS_NIGHT: 25,
-            VMC_STATUS_HYPER: 100,
-            VMC_STATUS_COOLING: 25,
-        }
-        return status_to_pct.get(status, 25)
+        return state.percentage
 
     @property
     def preset_mode(self) -> str | None:
         """Return the current preset mode."""
-        if self.coordinator.data is None:
-            return None
-        status = self.coordinator.data.get("vmc_status")
-        if status is None or status == VMC_STATUS_OFF:
+        if (state := self._fan_state) is None:
             return None
-        return VMC_STATUS_TO_PRESET.get(status)
+        return state.preset_mode
 
     async def async_turn_on(
         self,
@@ -133,6 +151,7 @@ class HeltyVmcFan(CoordinatorEntity[HeltyDataUpdateCoordinator], FanEntity):
             return
         # Default: turn on at speed 1
         await self._api.send_command(self._board_serial, SPEED_COMMANDS[1])
+        self.coordinator.async_set_commanded_speed(1)
         await self.coordinator.async_request_refresh()
 
     async def async_turn_off(self, **kwargs: Any) -> None:
@@ -149,6 +168,7 @@ class HeltyVmcFan(CoordinatorEntity[HeltyDataUpdateCoordinator], FanEntity):
         speed = math.ceil(percentage / (100 / SPEED_COUNT))
         speed = max(1, min(SPEED_COUNT, speed))
         await self._api.send_command(self._board_serial, SPEED_COMMANDS[speed])
+        self.coordinator.async_set_commanded_speed(speed)
         await self.coordinator.async_request_refresh()
 
     async def async_set_preset_mode(self, preset_mode: str) -> None:
@@ -158,4 +178,6 @@ class HeltyVmcFan(CoordinatorEntity[HeltyDataUpdateCoordinator], FanEntity):
         await self._api.send_command(
             self._board_serial, PRESET_MODE_COMMANDS[preset_mode]
         )
+        if preset_mode == PRESET_NORMAL:
+            self.coordinator.async_set_commanded_speed(1)
         await self.coordinator.async_request_refresh()
@@ -0,0 +1,231 @@
+"""In-memory time series of VMC readings with rolling statistics."""
+
+from __future__ import annotations
+
+from array import array
+from collections import deque
+from collections.abc import Mapping
+import math
+
+from .const import HISTORY_CAPACITY, HISTORY_FIELDS, HISTORY_WINDOWS
+from .models import Reading
+
+_NAN = math.nan
+
+# State attributes of ReadingHistory.attributes with the default windows
+ATTRIBUTE_NAMES = frozenset(
+    f"{stat}_{name}"
+    for name in HISTORY_WINDOWS
+    for stat in ("min", "max", "mean", "slope")
+)
+
+
+class _RollingWindow:
+    """Running aggregates of one history column over a trailing time span.
+
+    Sums are maintained incrementally and min/max use monotonic deques of
+    sample indices, so evicting, pushing and reading the statistics are
+    O(1) (amortized for the deques). Times are taken relative to an origin
+    moved forward every two spans, when the sums are recomputed from the
+    samples, so rounding errors do not build up over long uptimes.
+    """
+
+    __slots__ = (
+        "_column",
+        "_times",
+        "_capacity",
+        "_span",
+        "_t0",
+        "_start",
+        "_n",
+        "_sum_t",
+        "_sum_tt",
+        "_sum_v",
+        "_sum_tv",
+        "_min_q",
+        "_max_q",
+    )
+
+    def __init__(
+        self, times: array, column: array, capacity: int, span: float
+    ) -> None:
+        """Initialize the window."""
+        self._times = times
+        self._column = column
+        self._capacity = capacity
+        self._span = span
+        self._t0: float | None = None
+        self._start = 0
+        self._n = 0
+        self._sum_t = 0.0
+        self._sum_tt = 0.0
+        self._sum_v = 0.0
+        self._sum_tv = 0.0
+        self._min_q: deque[int] = deque()
+        self._max_q: deque[int] = deque()
+
+    def evict(self, index: int, now: float) -> None:
+        """Drop samples that leave the window when ``index`` is written at ``now``.
+
+        Must run before the ring slot of ``index`` is overwritten, since that
+        slot may still hold the oldest sample of the window.
+        """
+        horizon = now - self._span
+        oldest = index - self._capacity + 1
+        while self._start < index and (
+            self._start < oldest
+            or self._times[self._start % self._capacity] < horizon
+        ):
+            self._remove(self._start)
+            self._start += 1
+
+    def push(self, index: int) -> None:
+        """Account for the sample just written at absolute ``index``."""
+        pos = index % self._capacity
+        now = self._times[pos]
+        value = self._column[pos]
+        if math.isnan(value):
+            return
+        if self._t0 is None:
+            self._t0 = now
+        elif now - self._t0 >= 2 * self._span:
+            self._rebase(now, index)
+        t = (now - self._t0) / 3600
+        self._n += 1
+        self._sum_t += t
+        self._sum_tt += t * t
+        self._sum_v += value
+        self._sum_tv += t * value
+
+        column = self._column
+        capacity = self._capacity
+        while self._min_q and column[self._min_q[-1] % capacity] >= value:
+            self._min_q.pop()
+        self._min_q.append(index)
+        while self._max_q and column[self._max_q[-1] % capacity] <= value:
+            self._max_q.pop()
+        self._max_q.append(index)
+
+    def _remove(self, index: int) -> None:
+        """Subtract the sample at absolute ``index`` from the aggregates."""
+        pos = index % self._capacity
+        value = self._column[pos]
+        if math.isnan(value):
+            return
+        t = (self._times[pos] - self._t0) / 3600
+        self._n -= 1
+        self._sum_t -= t
+        self._sum_tt -= t * t
+        self._sum_v -= value
+        self._sum_tv -= t * value
+        if self._min_q and self._min_q[0] == index:
+            self._min_q.popleft()
+        if self._max_q and self._max_q[0] == index:
+            self._max_q.popleft()
+        if self._n == 0:
+            # Empty window: the next sample starts from a fresh origin
+            self._t0 = None
+            self._sum_t = self._sum_tt = self._sum_v = self._sum_tv = 0.0
+
+    def _rebase(self, t0: float, end: int) -> None:
+        """Move the time origin to ``t0`` and recompute the sums up to ``end``."""
+        times = self._times
+        column = self._column
+        capacity = self._capacity
+        self._t0 = t0
+        self._n = 0
+        self._sum_t = self._sum_tt = self._sum_v = self._sum_tv = 0.0
+        for index in range(self._start, end):
+            pos = index % capacity
+            value = column[pos]
+            if math.isnan(value):
+                continue
+            t = (times[pos] - t0) / 3600
+            self._n += 1
+            self._sum_t += t
+            self._sum_tt += t * t
+            self._sum_v += value
+            self._sum_tv += t * value
+
+    def statistics(self) -> dict[str, float] | None:
+        """Return min, max, mean and slope (units per hour) of the window."""
+        n = self._n
+        if n == 0:
+            return None
+        column = self._column
+        capacity = self._capacity
+        stats = {
+            "min": round(column[self._min_q[0] % capacity], 2),
+            "max": round(column[self._max_q[0] % capacity], 2),
+            "mean": round(self._sum_v / n, 2),
+        }
+        denominator = n * self._sum_tt - self._sum_t * self._sum_t
+        if n > 1 and denominator > 1e-12:
+            slope = (n * self._sum_tv - self._sum_t * self._sum_v) / denominator
+            stats["slope"] = round(slope, 3)
+        return stats
+
+
+class ReadingHistory:
+    """Fixed-capacity ring buffer of timestamped readings.
+
+    Each field is stored as a packed float32 column next to a float64
+    timestamp column, so memory is fixed at creation: 32 bytes per
+    sample for the default fields, ~45 KiB for 24 h of 1-minute samples.
+    Missing values are stored as NaN and ignored by the statistics.
+    """
+
+    def __init__(
+        self,
+        capacity: int = HISTORY_CAPACITY,
+        windows: Mapping[str, float] = HISTORY_WINDOWS,
+        fields: tuple[str, ...] = HISTORY_FIELDS,
+    ) -> None:
+        """Initialize an empty history."""
+        self._capacity = capacity
+        self._count = 0
+        self._times = array("d", [0.0]) * capacity
+        self._columns = {field: array("f", [_NAN]) * capacity for field in fields}
+        self._windows = {
+            field: {
+                name: _RollingWindow(self._times, column, capacity, span)
+                for name, span in windows.items()
+            }
+            for field, column in self._columns.items()
+        }
+
+    def __len__(self) -> int:
+        """Return the number of samples currently held."""
+        return min(self._count, self._capacity)
+
+    def append(self, timestamp: float, reading: Reading) -> None:
+        """Store a reading taken at ``timestamp`` (seconds since the epoch)."""
+        index = self._count
+        for windows in self._windows.values():
+            for window in windows.values():
+                window.evict(index, timestamp)
+        pos = index % self._capacity
+        self._times[pos] = timestamp
+        for field, column in self._columns.items():
+            value = getattr(reading, field)
+            column[pos] = _NAN if value is None else value
+        self._count += 1
+        for windows in self._windows.values():
+            for window in windows.values():
+                window.push(index)
+
+    def statistics(self, field: str) -> dict[str, dict[str, float]]:
+        """Return rolling statistics of ``field`` keyed by window name."""
+        result = {}
+        for name, window in self._windows.get(field, {}).items():
+            if (stats := window.statistics()) is not None:
+                result[name] = stats
+        return result
+
+    def attributes(self, field: str) -> dict[str, float]:
+        """Return rolling statistics of ``field`` as flat state attributes."""
+        return {
+            f"{stat}_{name}": value
+            for name, stats in self.statistics(field).items()
+            for stat, value in stats.items()
+        }
@@ -0,0 +1,168 @@
+"""Client performance counters and Prometheus text rendering."""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections.abc import Mapping
+from typing import Any
+
+# Upper bounds of the request latency buckets, in seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0)
+
+# Reading field -> (metric name, help text)
+READING_METRICS = {
+    "temp_indoor": ("helty_temp_indoor_celsius", "Indoor temperature"),
+    "temp_outdoor": ("helty_temp_outdoor_celsius", "Outdoor temperature"),
+    "humidity": ("helty_humidity_percent", "Relative humidity"),
+    "co2": ("helty_co2_ppm", "CO2 concentration"),
+    "voc": ("helty_voc_ppb", "VOC concentration"),
+    "vmc_status": ("helty_vmc_status", "VMC status code (0 off, 1 normal, 2 hyper, 3 night, 4 cooling)"),
+}
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; observing is one bisect and two adds."""
+
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self) -> None:
+        """Initialize an empty histogram."""
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Record one value."""
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+class ApiStats:
+    """Counters kept by the API client for every request it makes."""
+
+    def __init__(self) -> None:
+        """Initialize empty counters."""
+        self.latency: dict[str, Histogram] = {}
+        self.errors: dict[tuple[str, str], int] = {}
+        self.token_renewals: dict[str, int] = {"login": 0, "refresh": 0}
+
+    def observe(self, endpoint: str, seconds: float) -> None:
+        """Record the duration of a request to ``endpoint``."""
+        if (histogram := self.latency.get(endpoint)) is None:
+            histogram = self.latency[endpoint] = Histogram()
+        histogram.observe(seconds)
+
+    def record_error(self, endpoint: str, kind: str) -> None:
+        """Count a failed request."""
+        key = (endpoint, kind)
+        self.errors[key] = self.errors.get(key, 0) + 1
+
+    def record_token(self, method: str) -> None:
+        """Count a token obtained by ``login`` or ``refresh``."""
+        self.token_renewals[method] += 1
+
+    def render(self) -> str:
+        """Return the counters in the Prometheus text format."""
+        lines = [
+            "# HELP helty_api_request_duration_seconds HCloud request latency",
+            "# TYPE helty_api_request_duration_seconds histogram",
+        ]
+        for endpoint, histogram in self.latency.items():
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, histogram.counts):
+                cumulative += count
+                lines.append(
+                    f'helty_api_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}'
+                )
+            lines.append(
+                f'helty_api_request_duration_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} {histogram.count}'
+            )
+            lines.append(
+                f'helty_api_request_duration_seconds_sum{{endpoint="{endpoint}"}} {histogram.sum:.6f}'
+            )
+            lines.append(
+                f'helty_api_request_duration_seconds_count{{endpoint="{endpoint}"}} {histogram.count}'
+            )
+        lines.append("# HELP helty_api_errors_total Failed HCloud requests")
+        lines.append("# TYPE helty_api_errors_total counter")
+        for (endpoint, kind), count in self.errors.items():
+            lines.append(
+                f'helty_api_errors_total{{endpoint="{endpoint}",kind="{kind}"}} {count}'
+            )
+        lines.append("# HELP helty_api_token_renewals_total Tokens obtained")
+        lines.append("# TYPE helty_api_token_renewals_total counter")
+        for method, count in self.token_renewals.items():
+            lines.append(f'helty_api_token_renewals_total{{method="{method}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    """Escape a Prometheus label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def device_labels(serial: str, board_serial: str, model: str, installation: str) -> str:
+    """Return the label set identifying a device."""
+    return (
+        f'serial="{_escape(serial)}",board_serial="{_escape(board_serial)}",'
+        f'model="{_escape(model)}",installation="{_escape(installation)}"'
+    )
+
+
+# Per-device gauges besides the reading fields: (record key, metric, help)
+_TIMESTAMP_METRICS = (
+    ("fetched_at", "helty_last_poll_timestamp_seconds", "Time of the last read attempt"),
+    ("success_at", "helty_last_success_timestamp_seconds", "Time of the last good reading"),
+)
+
+
+class ReadingMetrics:
+    """Per-device gauge lines kept up to date as readings arrive.
+
+    An update formats only the lines of its own device. A scrape joins the
+    cached lines once and reuses the text until the next update, so it
+    never reads a device or formats a number.
+    """
+
+    def __init__(self) -> None:
+        """Initialize without devices."""
+        self._families = {
+            metric: (help_text, {})
+            for metric, help_text in (
+                *READING_METRICS.values(),
+                *((metric, help_text) for _key, metric, help_text in _TIMESTAMP_METRICS),
+            )
+        }
+        self._text: str | None = None
+
+    def update(self, key: str, labels: str, record: Mapping[str, Any]) -> None:
+        """Replace the gauges of device ``key`` with those of ``record``.
+
+        ``record`` holds the reading fields plus ``fetched_at`` and, once a
+        read succeeded, ``success_at`` (seconds since the epoch).
+        """
+        values = [
+            (metric, record.get(field))
+            for field, (metric, _help) in READING_METRICS.items()
+        ]
+        values.extend(
+            (metric, record.get(field)) for field, metric, _help in _TIMESTAMP_METRICS
+        )
+        for metric, value in values:
+            lines = self._families[metric][1]
+            if value is None:
+                lines.pop(key, None)
+            else:
+                lines[key] = f"{metric}{{{labels}}} {value}"
+        self._text = None
+
+    def render(self) -> str:
+        """Return the gauges of all devices in the Prometheus text format."""
+        if self._text is None:
+            parts = []
+            for metric, (help_text, lines) in self._families.items():
+                parts.append(f"# HELP {metric} {help_text}\n# TYPE {metric} gauge")
+                parts.extend(lines.values())
+            self._text = "\n".join(parts) + "\n"
+        return self._text
@@ -0,0 +1,81 @@
+"""Data models shared by the Helty API client, coordinator and platforms."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass(frozen=True, slots=True)
+class Device:
+    """A VMC product as returned by the product search."""
+
+    product_id: str
+    serial: str
+    model: str
+    line: str
+    board_serial: str
+    board_id: str | None
+    installation: str
+    owner: str
+    email: str
+
+
+@dataclass(frozen=True, slots=True)
+class Reading:
+    """Parsed sensor values from a GetStatus response."""
+
+    temp_indoor: float | None = None
+    temp_outdoor: float | None = None
+    humidity: float | None = None
+    co2: int | None = None
+    voc: int | None = None
+    vmc_status: int | None = None
+
+    def merge(self, update: Reading) -> Reading:
+        """Return this reading updated with the values ``update`` carries."""
+        values = []
+        for field in self.__slots__:
+            value = getattr(update, field)
+            values.append(getattr(self, field) if value is None else value)
+        return Reading(*values)
+
+
+@dataclass(frozen=True, slots=True)
+class FanState:
+    """Fan state derived once per update from the VMC status."""
+
+    is_on: bool | None
+    preset_mode: str | None
+    percentage: int | None
+
+
+@dataclass(frozen=True, slots=True)
+class CommandBlock:
+    """Response of one read command, in the order the device reports it."""
+
+    command_id: int
+    fields: tuple[str, ...]
+    values: tuple[Any, ...]
+    unit_ids: tuple[str | None, ...]
+    fetched_at: float
+
+    @classmethod
+    def from_items(
+        cls, command_id: int, items: list[dict], fetched_at: float
+    ) -> CommandBlock:
+        """Build a block from laststatus ``{field, value, unitId}`` items."""
+        return cls(
+            command_id=command_id,
+            fields=tuple(item.get("field", "") for item in items),
+            values=tuple(item.get("value") for item in items),
+            unit_ids=tuple(item.get("unitId") for item in items),
+            fetched_at=fetched_at,
+        )
+
+    def get(self, field: str, default: Any = None) -> Any:
+        """Return the value of a field."""
+        try:
+            return self.values[self.fields.index(field)]
+        except ValueError:
+            return default
@@ -0,0 +1,215 @@
+"""API clients and board coordinators shared across config entries."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+import logging
+
+import aiohttp
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+from .api import HeltyCloudAPI
+from .const import DATA_REGISTRY, HANDOFF_TTL
+from .coordinator import HeltyDataUpdateCoordinator
+from .models import Device
+from .tracing import Tracer
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class _SharedClient:
+    """An API client and the number of holders keeping it open."""
+
+    api: HeltyCloudAPI
+    session: aiohttp.ClientSession
+    refs: int = 0
+
+
+@dataclass(slots=True)
+class _Handoff:
+    """A client reference kept by a config flow for the following setup."""
+
+    devices: list[Device] | None
+    cancel: CALLBACK_TYPE
+
+
+@dataclass(slots=True)
+class _SharedBoard:
+    """A board coordinator, its owner and the entries claiming it."""
+
+    coordinator: HeltyDataUpdateCoordinator
+    identity: str
+    owner: str
+    entry_ids: list[str] = field(default_factory=list)
+
+
+class HeltyRegistry:
+    """Hand out one API client per account and one coordinator per board.
+
+    Clients are keyed by the lowercased email, the Cognito identity used as
+    config entry unique ID, and closed when the last holder releases them.
+    A board visible from several accounts is polled by a single coordinator,
+    which keeps a reference on the client of the entry that created it.
+    Entities of a board are provided by its owner, the first entry claiming
+    it, since their unique IDs only depend on the product serial. The owner
+    keeps the board while it reloads; it passes to the next claimant only
+    when the owner is removed or no longer sees the board.
+
+    Config flows log in through the same clients and hand them off, with
+    the devices they discovered, to the entry setup that follows.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the registry."""
+        self._hass = hass
+        self._clients: dict[str, _SharedClient] = {}
+        self._boards: dict[str, _SharedBoard] = {}
+        self._handoffs: dict[str, _Handoff] = {}
+
+    @callback
+    def async_acquire_client(self, email: str, password: str) -> HeltyCloudAPI:
+        """Return the client of an account, creating it on first use."""
+        identity = email.lower()
+        if (shared := self._clients.get(identity)) is None:
+            tracer = Tracer()
+            session = aiohttp.ClientSession(trace_configs=[tracer.trace_config()])
+            shared = self._clients[identity] = _SharedClient(
+                HeltyCloudAPI(session, tracer=tracer), session
+            )
+            shared.api.set_credentials(email, password)
+        # A running client keeps its credentials until a login replaces them
+        shared.refs += 1
+        return shared.api
+
+    async def async_release_client(self, email: str) -> None:
+        """Drop a reference on a client, closing it when unused.
+
+        The push transport stops with the client only, since boards polled
+        through it may outlive the entry that attached it.
+        """
+        identity = email.lower()
+        shared = self._clients[identity]
+        shared.refs -= 1
+        if shared.refs:
+            return
+        del self._clients[identity]
+        await shared.api.async_detach_transport()
+        await shared.session.close()
+
+    async def async_hand_off(self, email: str, devices: list[Device] | None) -> None:
+        """Keep the reference of a config flow for the entry setup.
+
+        The reference is dropped after ``HANDOFF_TTL`` if no setup takes it.
+        """
+        identity = email.lower()
+        await self._async_drop_handoff(identity)
+
+        @callback
+        def _expire(_now: object) -> None:
+            if self._handoffs.get(identity) is handoff:
+                self._hass.async_create_task(self._async_drop_handoff(identity))
+
+        handoff = self._handoffs[identity] = _Handoff(
+            devices, async_call_later(self._hass, HANDOFF_TTL, _expire)
+        )
+
+    @callback
+    def async_take_handoff(self, email: str) -> list[Device] | None:
+        """Take the devices handed off for an account by a config flow.
+
+        Must be called while holding a client reference, which then replaces
+        the one of the flow.
+        """
+        identity = email.lower()
+        if (handoff := self._handoffs.pop(identity, None)) is None:
+            return None
+        handoff.cancel()
+        # The caller's own reference keeps the client open
+        self._clients[identity].refs -= 1
+        return handoff.devices
+
+    async def _async_drop_handoff(self, identity: str) -> None:
+        """Release the reference of an unclaimed handoff."""
+        if (handoff := self._handoffs.pop(identity, None)) is not None:
+            handoff.cancel()
+            await self.async_release_client(identity)
+
+    @callback
+    def async_claim_board(
+        self, entry_id: str, email: str, device: Device
+    ) -> tuple[HeltyDataUpdateCoordinator, bool]:
+        """Return the coordinator of a board and whether the entry owns it."""
+        if (shared := self._boards.get(device.board_serial)) is None:
+            identity = email.lower()
+            shared_client = self._clients[identity]
+            shared_client.refs += 1
+            shared = self._boards[device.board_serial] = _SharedBoard(
+                HeltyDataUpdateCoordinator(self._hass, shared_client.api, device),
+                identity,
+                entry_id,
+            )
+        elif entry_id not in shared.entry_ids:
+            _LOGGER.debug(
+                "Board %s already polled for another entry, sharing its readings",
+                device.board_serial,
+            )
+        if entry_id not in shared.entry_ids:
+            shared.entry_ids.append(entry_id)
+        return shared.coordinator, shared.owner == entry_id
+
+    async def async_release_boards(self, entry_id: str) -> None:
+        """Drop all claims of an unloading entry, keeping its ownerships."""
+        for board_serial, shared in list(self._boards.items()):
+            if entry_id in shared.entry_ids:
+                await self.async_release_board(entry_id, board_serial, False)
+
+    @callback
+    def async_forget_owner(self, entry_id: str) -> set[str]:
+        """Hand the boards of a removed entry to their next claimants.
+
+        Returns the entries that inherit the ownership of a board and need a
+        reload to provide its entities.
+        """
+        heirs: set[str] = set()
+        for shared in self._boards.values():
+            if shared.owner == entry_id:
+                heirs |= self._async_hand_on(shared)
+        return heirs
+
+    async def async_release_board(
+        self, entry_id: str, board_serial: str, hand_on: bool = True
+    ) -> set[str]:
+        """Drop the claim of an entry on one board, returning its heir if any.
+
+        Without ``hand_on``, an owner keeps the board for when it claims it
+        again, as a reloading entry does.
+        """
+        shared = self._boards[board_serial]
+        shared.entry_ids.remove(entry_id)
+        if not shared.entry_ids:
+            del self._boards[board_serial]
+            await shared.coordinator.async_shutdown()
+            await self.async_release_client(shared.identity)
+            return set()
+        if hand_on and shared.owner == entry_id:
+            return self._async_hand_on(shared)
+        return set()
+
+    @callback
+    def _async_hand_on(self, shared: _SharedBoard) -> set[str]:
+        """Make the first remaining claimant of a board its owner."""
+        if not shared.entry_ids:
+            return set()
+        shared.owner = shared.entry_ids[0]
+        return {shared.owner}
+
+
+@callback
+def async_get_registry(hass: HomeAssistant) -> HeltyRegistry:
+    """Return the registry of this Home Assistant instance."""
+    if (registry := hass.data.get(DATA_REGISTRY)) is None:
+        registry = hass.data[DATA_REGISTRY] = HeltyRegistry(hass)
+    return registry
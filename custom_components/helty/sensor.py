@@ -2,9 +2,14 @@
 
 from __future__ import annotations
 
+from collections.abc import Callable
+from dataclasses import dataclass
+
 from homeassistant.components.sensor import (
+    RestoreSensor,
     SensorDeviceClass,
     SensorEntity,
+    SensorEntityDescription,
     SensorStateClass,
 )
 from homeassistant.config_entries import ConfigEntry
@@ -12,58 +17,179 @@ from homeassistant.const import (
     CONCENTRATION_PARTS_PER_BILLION,
     CONCENTRATION_PARTS_PER_MILLION,
     PERCENTAGE,
+    EntityCategory,
     UnitOfTemperature,
+    UnitOfTime,
 )
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import dt as dt_util
 
-from .const import DOMAIN
+from .aggregate import InstallationAggregate
+from .const import (
+    CMD_GET_INFO,
+    CMD_GET_LIGHT_LED,
+    CMD_GET_PARAM_FILTER,
+    CMD_GET_PARAM_TRIGGER,
+    DOMAIN,
+    SIGNAL_NEW_COORDINATORS,
+    VMC_STATUS_HYPER,
+    VMC_STATUS_OFF,
+)
 from .coordinator import HeltyDataUpdateCoordinator
+from .history import ATTRIBUTE_NAMES as HISTORY_ATTRIBUTES
+
+SENSOR_DESCRIPTIONS: tuple[SensorEntityDescription, ...] = (
+    SensorEntityDescription(
+        key="temp_indoor",
+        name="Indoor Temperature",
+        device_class=SensorDeviceClass.TEMPERATURE,
+        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
+        state_class=SensorStateClass.MEASUREMENT,
+    ),
+    SensorEntityDescription(
+        key="temp_outdoor",
+        name="Outdoor Temperature",
+        device_class=SensorDeviceClass.TEMPERATURE,
+        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
+        state_class=SensorStateClass.MEASUREMENT,
+    ),
+    SensorEntityDescription(
+        key="humidity",
+        name="Humidity",
+        device_class=SensorDeviceClass.HUMIDITY,
+        native_unit_of_measurement=PERCENTAGE,
+        state_class=SensorStateClass.MEASUREMENT,
+    ),
+    SensorEntityDescription(
+        key="co2",
+        name="CO2",
+        device_class=SensorDeviceClass.CO2,
+        native_unit_of_measurement=CONCENTRATION_PARTS_PER_MILLION,
+        state_class=SensorStateClass.MEASUREMENT,
+    ),
+    SensorEntityDescription(
+        key="voc",
+        name="VOC",
+        device_class=SensorDeviceClass.VOLATILE_ORGANIC_COMPOUNDS_PARTS,
+        native_unit_of_measurement=CONCENTRATION_PARTS_PER_BILLION,
+        state_class=SensorStateClass.MEASUREMENT,
+    ),
+)
+
+
+@dataclass(frozen=True, kw_only=True)
+class HeltyBlockSensorEntityDescription(SensorEntityDescription):
+    """Describes a sensor reading one field of a read command response."""
+
+    command_id: int
+    field: str
+    entity_category: EntityCategory | None = EntityCategory.DIAGNOSTIC
+
 
-SENSOR_DEFINITIONS = [
-    {
-        "key": "temp_indoor",
-        "name": "Indoor Temperature",
-        "device_class": SensorDeviceClass.TEMPERATURE,
-        "native_unit": UnitOfTemperature.CELSIUS,
-        "state_class": SensorStateClass.MEASUREMENT,
-        "icon": None,
-    },
-    {
-        "key": "temp_outdoor",
-        "name": "Outdoor Temperature",
-        "device_class": SensorDeviceClass.TEMPERATURE,
-        "native_unit": UnitOfTemperature.CELSIUS,
-        "state_class": SensorStateClass.MEASUREMENT,
-        "icon": None,
-    },
-    {
-        "key": "humidity",
-        "name": "Humidity",
-        "device_class": SensorDeviceClass.HUMIDITY,
-        "native_unit": PERCENTAGE,
-        "state_class": SensorStateClass.MEASUREMENT,
-        "icon": None,
-    },
-    {
-        "key": "co2",
-        "name": "CO2",
-        "device_class": SensorDeviceClass.CO2,
-        "native_unit": CONCENTRATION_PARTS_PER_MILLION,
-        "state_class": SensorStateClass.MEASUREMENT,
-        "icon": None,
-    },
-    {
-        "key": "voc",
-        "name": "VOC",
-        "device_class": SensorDeviceClass.VOLATILE_ORGANIC_COMPOUNDS_PARTS,
-        "native_unit": CONCENTRATION_PARTS_PER_BILLION,
-        "state_class": SensorStateClass.MEASUREMENT,
-        "icon": None,
-    },
-]
+BLOCK_SENSOR_DESCRIPTIONS: tuple[HeltyBlockSensorEntityDescription, ...] = (
+    HeltyBlockSensorEntityDescription(
+        key="filter_life",
+        name="Filter Life",
+        icon="mdi:air-filter",
+        native_unit_of_measurement=UnitOfTime.HOURS,
+        command_id=CMD_GET_PARAM_FILTER,
+        field="FilterLife",
+    ),
+    HeltyBlockSensorEntityDescription(
+        key="led_intensity",
+        name="LED Intensity",
+        icon="mdi:brightness-percent",
+        native_unit_of_measurement=PERCENTAGE,
+        command_id=CMD_GET_LIGHT_LED,
+        field="Intensity",
+    ),
+    HeltyBlockSensorEntityDescription(
+        key="co2_trigger",
+        name="CO2 Trigger",
+        icon="mdi:molecule-co2",
+        native_unit_of_measurement=CONCENTRATION_PARTS_PER_MILLION,
+        command_id=CMD_GET_PARAM_TRIGGER,
+        field="CO2Trigg",
+    ),
+    HeltyBlockSensorEntityDescription(
+        key="voc_trigger",
+        name="VOC Trigger",
+        icon="mdi:chemical-weapon",
+        native_unit_of_measurement=CONCENTRATION_PARTS_PER_BILLION,
+        command_id=CMD_GET_PARAM_TRIGGER,
+        field="VocTrigg",
+    ),
+    HeltyBlockSensorEntityDescription(
+        key="firmware_package",
+        name="Firmware Package",
+        icon="mdi:chip",
+        command_id=CMD_GET_INFO,
+        field="V.Pacchetto Aggiornamento",
+    ),
+    HeltyBlockSensorEntityDescription(
+        key="ip_address",
+        name="IP Address",
+        icon="mdi:ip-network",
+        command_id=CMD_GET_INFO,
+        field="IP",
+    ),
+)
+
+
+@dataclass(frozen=True, kw_only=True)
+class HeltyAggregateSensorEntityDescription(SensorEntityDescription):
+    """Describes a figure of the devices of one installation."""
+
+    value_fn: Callable[[InstallationAggregate], float | int | None]
+    state_class: SensorStateClass | None = SensorStateClass.MEASUREMENT
+
+
+AGGREGATE_SENSOR_DESCRIPTIONS: tuple[HeltyAggregateSensorEntityDescription, ...] = (
+    HeltyAggregateSensorEntityDescription(
+        key="max_co2",
+        name="Max CO2",
+        device_class=SensorDeviceClass.CO2,
+        native_unit_of_measurement=CONCENTRATION_PARTS_PER_MILLION,
+        value_fn=lambda aggregate: aggregate.max("co2"),
+    ),
+    HeltyAggregateSensorEntityDescription(
+        key="max_voc",
+        name="Max VOC",
+        device_class=SensorDeviceClass.VOLATILE_ORGANIC_COMPOUNDS_PARTS,
+        native_unit_of_measurement=CONCENTRATION_PARTS_PER_BILLION,
+        value_fn=lambda aggregate: aggregate.max("voc"),
+    ),
+    HeltyAggregateSensorEntityDescription(
+        key="mean_temp_indoor",
+        name="Mean Indoor Temperature",
+        device_class=SensorDeviceClass.TEMPERATURE,
+        native_unit_of_measurement=UnitOfTemperature.CELSIUS,
+        value_fn=lambda aggregate: aggregate.mean("temp_indoor"),
+    ),
+    HeltyAggregateSensorEntityDescription(
+        key="mean_humidity",
+        name="Mean Humidity",
+        device_class=SensorDeviceClass.HUMIDITY,
+        native_unit_of_measurement=PERCENTAGE,
+        value_fn=lambda aggregate: aggregate.mean("humidity"),
+    ),
+    HeltyAggregateSensorEntityDescription(
+        key="units_hyper",
+        name="Units in Hyperventilation",
+        icon="mdi:fan-chevron-up",
+        value_fn=lambda aggregate: aggregate.count_status(VMC_STATUS_HYPER),
+    ),
+    HeltyAggregateSensorEntityDescription(
+        key="units_off",
+        name="Units Off",
+        icon="mdi:fan-off",
+        value_fn=lambda aggregate: aggregate.count_status(VMC_STATUS_OFF),
+    ),
+)
 
 
 async def async_setup_entry(
@@ -72,46 +198,167 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up Helty VMC sensor entities."""
-    data = hass.data[DOMAIN][entry.entry_id]
-    entities = []
-    for device, coordinator in zip(data["devices"], data["coordinators"]):
-        for sensor_def in SENSOR_DEFINITIONS:
-            entities.append(
-                HeltyVmcSensor(coordinator, device, sensor_def)
-            )
-    async_add_entities(entities)
+    aggregates: dict[str, InstallationAggregate] = hass.data[DOMAIN][
+        entry.entry_id
+    ]["aggregates"]
+    aggregated: set[str] = set()
+
+    @callback
+    def _async_add(coordinators: list[HeltyDataUpdateCoordinator]) -> None:
+        entities: list[SensorEntity] = [
+            HeltyVmcSensor(coordinator, description)
+            for coordinator in coordinators
+            for description in SENSOR_DESCRIPTIONS
+        ]
+        entities.extend(
+            HeltyVmcBlockSensor(coordinator, description)
+            for coordinator in coordinators
+            for description in BLOCK_SENSOR_DESCRIPTIONS
+        )
+        # Installations seen for the first time get their aggregate sensors
+        for installation in {c.device.installation for c in coordinators}:
+            if installation in aggregates and installation not in aggregated:
+                aggregated.add(installation)
+                entities.extend(
+                    HeltyAggregateSensor(
+                        entry, installation, aggregates[installation], description
+                    )
+                    for description in AGGREGATE_SENSOR_DESCRIPTIONS
+                )
+        async_add_entities(entities)
+
+    _async_add(hass.data[DOMAIN][entry.entry_id]["coordinators"])
+    entry.async_on_unload(
+        async_dispatcher_connect(
+            hass, SIGNAL_NEW_COORDINATORS.format(entry.entry_id), _async_add
+        )
+    )
 
 
 class HeltyVmcSensor(
-    CoordinatorEntity[HeltyDataUpdateCoordinator], SensorEntity
+    CoordinatorEntity[HeltyDataUpdateCoordinator], RestoreSensor
 ):
     """Representation of a Helty VMC sensor."""
 
     _attr_has_entity_name = True
+    # Rolling statistics change with every poll: keep them out of the recorder
+    _unrecorded_attributes = HISTORY_ATTRIBUTES
 
     def __init__(
         self,
         coordinator: HeltyDataUpdateCoordinator,
-        device: dict,
-        sensor_def: dict,
+        description: SensorEntityDescription,
     ) -> None:
         """Initialize the sensor entity."""
         super().__init__(coordinator)
-        self._key = sensor_def["key"]
-        self._attr_name = sensor_def["name"]
-        self._attr_unique_id = f"{device['serial']}_{self._key}"
-        self._attr_device_class = sensor_def["device_class"]
-        self._attr_native_unit_of_measurement = sensor_def["native_unit"]
-        self._attr_state_class = sensor_def["state_class"]
-        if sensor_def.get("icon"):
-            self._attr_icon = sensor_def["icon"]
+        self.entity_description = description
+        self._attr_unique_id = f"{coordinator.device.serial}_{description.key}"
         self._attr_device_info = DeviceInfo(
-            identifiers={(DOMAIN, device["serial"])},
+            identifiers={(DOMAIN, coordinator.device.serial)},
         )
+        self._restored_value: float | int | None = None
+
+    async def async_added_to_hass(self) -> None:
+        """Restore the last known value until the first poll."""
+        await super().async_added_to_hass()
+        if self.coordinator.data is None and (
+            last := await self.async_get_last_sensor_data()
+        ):
+            self._restored_value = last.native_value
 
     @property
     def native_value(self) -> float | int | None:
         """Return the sensor value."""
         if self.coordinator.data is None:
+            return self._restored_value
+        return getattr(self.coordinator.data, self.entity_description.key)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, float]:
+        """Return rolling min/max/mean/slope over the history windows."""
+        return self.coordinator.history.attributes(self.entity_description.key)
+
+
+class HeltyVmcBlockSensor(
+    CoordinatorEntity[HeltyDataUpdateCoordinator], SensorEntity
+):
+    """Diagnostic sensor backed by a tiered read command block."""
+
+    _attr_has_entity_name = True
+
+    entity_description: HeltyBlockSensorEntityDescription
+
+    def __init__(
+        self,
+        coordinator: HeltyDataUpdateCoordinator,
+        description: HeltyBlockSensorEntityDescription,
+    ) -> None:
+        """Initialize the sensor entity."""
+        super().__init__(coordinator)
+        self.entity_description = description
+        self._attr_unique_id = f"{coordinator.device.serial}_{description.key}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, coordinator.device.serial)},
+        )
+
+    @property
+    def native_value(self) -> str | int | None:
+        """Return the field value from the cached block."""
+        block = self.coordinator.block(self.entity_description.command_id)
+        if block is None:
+            return None
+        return block.get(self.entity_description.field)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, str] | None:
+        """Return when the block was read."""
+        block = self.coordinator.block(self.entity_description.command_id)
+        if block is None:
             return None
-        return self.coordinator.data.get(self._key)
+        return {"fetched_at": dt_util.utc_from_timestamp(block.fetched_at).isoformat()}
+
+
+class HeltyAggregateSensor(SensorEntity):
+    """Figure of the devices of one installation, updated with each reading."""
+
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+
+    entity_description: HeltyAggregateSensorEntityDescription
+
+    def __init__(
+        self,
+        entry: ConfigEntry,
+        installation: str,
+        aggregate: InstallationAggregate,
+        description: HeltyAggregateSensorEntityDescription,
+    ) -> None:
+        """Initialize the sensor entity."""
+        self.entity_description = description
+        self._aggregate = aggregate
+        self._attr_unique_id = f"{entry.entry_id}_{installation}_{description.key}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, f"{entry.entry_id}_{installation}")},
+            name=f"Helty {installation}",
+            manufacturer="Helty",
+            model="Installation",
+        )
+
+    async def async_added_to_hass(self) -> None:
+        """Follow the changes of the aggregate."""
+        self.async_on_remove(self._aggregate.add_listener(self.async_write_ha_state))
+
+    @property
+    def available(self) -> bool:
+        """Return whether the installation still has devices."""
+        return self._aggregate.devices > 0
+
+    @property
+    def native_value(self) -> float | int | None:
+        """Return the figure."""
+        return self.entity_description.value_fn(self._aggregate)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, int]:
+        """Return the number of devices aggregated."""
+        return {"devices": self._aggregate.devices}
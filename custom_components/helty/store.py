@@ -0,0 +1,76 @@
+"""Persistence of device metadata and last readings across restarts."""
+
+from __future__ import annotations
+
+from dataclasses import asdict
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, STORAGE_SAVE_DELAY, STORAGE_VERSION
+from .models import Device, Reading
+
+if TYPE_CHECKING:
+    from .coordinator import HeltyDataUpdateCoordinator
+
+
+class HeltyEntryStore:
+    """Device inventory and last known readings of one config entry."""
+
+    def __init__(self, hass: HomeAssistant, entry_id: str) -> None:
+        """Initialize the store."""
+        self._store: Store[dict[str, Any]] = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.{entry_id}"
+        )
+        self._devices: list[Device] = []
+        self._coordinators: list[HeltyDataUpdateCoordinator] = []
+
+    async def async_load(
+        self,
+    ) -> tuple[list[Device], dict[str, Reading], dict[str, int]]:
+        """Return the stored devices, readings and commanded speeds by serial."""
+        if not (data := await self._store.async_load()):
+            return [], {}, {}
+        devices = [Device(**device) for device in data.get("devices", [])]
+        readings = {
+            serial: Reading(**reading)
+            for serial, reading in data.get("readings", {}).items()
+        }
+        return devices, readings, data.get("commanded_speeds", {})
+
+    @callback
+    def async_track(
+        self,
+        devices: list[Device],
+        coordinators: list[HeltyDataUpdateCoordinator],
+    ) -> None:
+        """Save the inventory now and readings whenever they change."""
+        self._devices = devices
+        self._coordinators = coordinators
+        self.async_schedule_save()
+
+    @callback
+    def async_schedule_save(self) -> None:
+        """Save the current state after a short delay, coalescing writes."""
+        self._store.async_delay_save(self._data_to_save, STORAGE_SAVE_DELAY)
+
+    async def async_remove(self) -> None:
+        """Delete the stored data."""
+        await self._store.async_remove()
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the data to persist."""
+        return {
+            "devices": [asdict(device) for device in self._devices],
+            "readings": {
+                coordinator.product_serial: asdict(coordinator.data)
+                for coordinator in self._coordinators
+                if coordinator.data is not None
+            },
+            "commanded_speeds": {
+                coordinator.product_serial: coordinator.commanded_speed
+                for coordinator in self._coordinators
+            },
+        }
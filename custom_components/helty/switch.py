@@ -2,13 +2,17 @@
 
 from __future__ import annotations
 
+from dataclasses import dataclass
 from typing import Any
 
-from homeassistant.components.switch import SwitchEntity
+from homeassistant.components.switch import SwitchEntity, SwitchEntityDescription
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.const import STATE_OFF, STATE_ON
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.restore_state import RestoreEntity
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
 from .const import (
@@ -19,32 +23,45 @@ from .const import (
     CMD_ENABLE_SENSOR,
     CMD_ENABLE_STANDBY,
     DOMAIN,
+    SIGNAL_NEW_COORDINATORS,
+    STATE_LED,
+    STATE_SENSOR_MODE,
+    STATE_STANDBY,
 )
 from .coordinator import HeltyDataUpdateCoordinator
 
-SWITCH_DEFINITIONS = [
-    {
-        "key": "led",
-        "name": "LED",
-        "icon": "mdi:led-on",
-        "cmd_on": CMD_ENABLE_LED,
-        "cmd_off": CMD_DISABLE_LED,
-    },
-    {
-        "key": "sensor_mode",
-        "name": "Sensor Mode",
-        "icon": "mdi:auto-fix",
-        "cmd_on": CMD_ENABLE_SENSOR,
-        "cmd_off": CMD_DISABLE_SENSOR,
-    },
-    {
-        "key": "standby",
-        "name": "Standby",
-        "icon": "mdi:power-standby",
-        "cmd_on": CMD_ENABLE_STANDBY,
-        "cmd_off": CMD_DISABLE_STANDBY,
-    },
-]
+
+@dataclass(frozen=True, kw_only=True)
+class HeltySwitchEntityDescription(SwitchEntityDescription):
+    """Describes a Helty VMC toggle and the commands that drive it."""
+
+    cmd_on: int
+    cmd_off: int
+
+
+SWITCH_DESCRIPTIONS: tuple[HeltySwitchEntityDescription, ...] = (
+    HeltySwitchEntityDescription(
+        key=STATE_LED,
+        name="LED",
+        icon="mdi:led-on",
+        cmd_on=CMD_ENABLE_LED,
+        cmd_off=CMD_DISABLE_LED,
+    ),
+    HeltySwitchEntityDescription(
+        key=STATE_SENSOR_MODE,
+        name="Sensor Mode",
+        icon="mdi:auto-fix",
+        cmd_on=CMD_ENABLE_SENSOR,
+        cmd_off=CMD_DISABLE_SENSOR,
+    ),
+    HeltySwitchEntityDescription(
+        key=STATE_STANDBY,
+        name="Standby",
+        icon="mdi:power-standby",
+        cmd_on=CMD_ENABLE_STANDBY,
+        cmd_off=CMD_DISABLE_STANDBY,
+    ),
+)
 
 
 async def async_setup_entry(
@@ -54,58 +71,76 @@ async def async_setup_entry(
 ) -> None:
     """Set up Helty VMC switch entities."""
     data = hass.data[DOMAIN][entry.entry_id]
-    entities = []
-    for device, coordinator in zip(data["devices"], data["coordinators"]):
-        for switch_def in SWITCH_DEFINITIONS:
-            entities.append(
-                HeltyVmcSwitch(coordinator, device, data["api"], switch_def)
-            )
-    async_add_entities(entities)
+
+    @callback
+    def _async_add(coordinators: list[HeltyDataUpdateCoordinator]) -> None:
+        async_add_entities(
+            HeltyVmcSwitch(coordinator, data["api"], description)
+            for coordinator in coordinators
+            for description in SWITCH_DESCRIPTIONS
+        )
+
+    _async_add(data["coordinators"])
+    entry.async_on_unload(
+        async_dispatcher_connect(
+            hass, SIGNAL_NEW_COORDINATORS.format(entry.entry_id), _async_add
+        )
+    )
 
 
 class HeltyVmcSwitch(
-    CoordinatorEntity[HeltyDataUpdateCoordinator], SwitchEntity
+    CoordinatorEntity[HeltyDataUpdateCoordinator], SwitchEntity, RestoreEntity
 ):
     """Representation of a Helty VMC toggle switch."""
 
     _attr_has_entity_name = True
 
+    entity_description: HeltySwitchEntityDescription
+
     def __init__(
         self,
         coordinator: HeltyDataUpdateCoordinator,
-        device: dict,
         api,
-        switch_def: dict,
+        description: HeltySwitchEntityDescription,
     ) -> None:
         """Initialize the switch entity."""
         super().__init__(coordinator)
         self._api = api
-        self._board_serial = device["board_serial"]
-        self._key = switch_def["key"]
-        self._cmd_on = switch_def["cmd_on"]
-        self._cmd_off = switch_def["cmd_off"]
-        self._attr_name = switch_def["name"]
-        self._attr_unique_id = f"{device['serial']}_{self._key}"
-        self._attr_icon = switch_def.get("icon")
+        self.entity_description = description
+        self._attr_unique_id = f"{coordinator.device.serial}_{description.key}"
         self._attr_device_info = DeviceInfo(
-            identifiers={(DOMAIN, device["serial"])},
+            identifiers={(DOMAIN, coordinator.device.serial)},
         )
-        # Track assumed state since the API doesn't report toggle states
+        # Assumed state: the devices do not report it, only commands set it
         self._assumed_on: bool | None = None
 
+    async def async_added_to_hass(self) -> None:
+        """Restore the assumed state across restarts."""
+        await super().async_added_to_hass()
+        last = await self.async_get_last_state()
+        if last is not None and last.state in (STATE_ON, STATE_OFF):
+            self._assumed_on = last.state == STATE_ON
+
     @property
     def is_on(self) -> bool | None:
         """Return true if the switch is on."""
-        return self._assumed_on
+        known = self._api.known_state(
+            self.coordinator.board_serial, self.entity_description.key
+        )
+        return self._assumed_on if known is None else known
 
     async def async_turn_on(self, **kwargs: Any) -> None:
         """Turn the switch on."""
-        await self._api.send_command(self._board_serial, self._cmd_on)
+        await self._api.send_command(
+            self.coordinator.board_serial, self.entity_description.cmd_on
+        )
         self._assumed_on = True
         self.async_write_ha_state()
 
     async def async_turn_off(self, **kwargs: Any) -> None:
         """Turn the switch off."""
-        await self._api.send_command(self._board_serial, self._cmd_off)
+        await self._api.send_command(
+            self.coordinator.board_serial, self.entity_description.cmd_off
+        )
         self._assumed_on = False
         self.async_write_ha_state()
@@ -0,0 +1,170 @@
+"""Opt-in span tracing of the client, exported as Chrome trace events."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+import contextlib
+import time
+from types import SimpleNamespace
+from typing import Any
+
+import aiohttp
+
+# Spans kept in memory; the oldest are dropped first
+TRACE_BUFFER_SIZE = 10000
+
+_NOOP = contextlib.nullcontext()
+
+
+def _task_id() -> int:
+    """Return a track id for the running task: its spans nest on one row."""
+    try:
+        return id(asyncio.current_task())
+    except RuntimeError:
+        return 0
+
+
+class _Span:
+    """Context manager timing one span."""
+
+    __slots__ = ("_tracer", "_name", "_category", "_args", "_start")
+
+    def __init__(
+        self, tracer: Tracer, name: str, category: str, args: dict[str, Any]
+    ) -> None:
+        """Initialize the span."""
+        self._tracer = tracer
+        self._name = name
+        self._category = category
+        self._args = args
+
+    def __enter__(self) -> dict[str, Any]:
+        """Start timing; the returned args can be completed in the block."""
+        self._start = time.perf_counter()
+        return self._args
+
+    def __exit__(self, exc_type: type[BaseException] | None, *_exc: object) -> None:
+        """Record the span, with the exception type if one was raised."""
+        if exc_type is not None:
+            self._args["error"] = exc_type.__name__
+        self._tracer.record(
+            self._name, self._category, self._start, time.perf_counter(), self._args
+        )
+
+
+class Tracer:
+    """Bounded buffer of timed spans.
+
+    Disabled by default: ``span`` then returns a shared no-op context
+    manager, so instrumented code pays one attribute check per span.
+    """
+
+    def __init__(self, max_spans: int = TRACE_BUFFER_SIZE) -> None:
+        """Initialize a disabled tracer."""
+        self.enabled = False
+        # (name, category, start, end, track, args), perf_counter seconds
+        self._spans: deque[tuple[str, str, float, float, int, dict[str, Any]]] = (
+            deque(maxlen=max_spans)
+        )
+        # perf_counter() + offset = seconds since the epoch
+        self._offset = time.time() - time.perf_counter()
+
+    def span(self, name: str, category: str = "api", **args: Any) -> Any:
+        """Return a context manager recording a span when enabled."""
+        if not self.enabled:
+            return _NOOP
+        return _Span(self, name, category, args)
+
+    def record(
+        self,
+        name: str,
+        category: str,
+        start: float,
+        end: float,
+        args: dict[str, Any] | None = None,
+    ) -> None:
+        """Record a finished span timed with ``time.perf_counter``."""
+        self._spans.append((name, category, start, end, _task_id(), args or {}))
+
+    def clear(self) -> None:
+        """Drop all recorded spans."""
+        self._spans.clear()
+
+    def export(self) -> dict[str, Any]:
+        """Return the spans in the Chrome trace-event format.
+
+        The result loads in chrome://tracing and Perfetto. Each asyncio task
+        gets its own row, so concurrent polls do not overlap.
+        """
+        return {
+            "traceEvents": [
+                {
+                    "name": name,
+                    "cat": category,
+                    "ph": "X",
+                    "ts": round((start + self._offset) * 1e6),
+                    "dur": round((end - start) * 1e6),
+                    "pid": 1,
+                    "tid": track,
+                    "args": args,
+                }
+                for name, category, start, end, track, args in self._spans
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """Return an aiohttp trace config recording the connection phases.
+
+        Pass it to the session of the client: DNS resolution, waiting for a
+        pooled connection, connecting (TCP and TLS) and the time to the
+        response headers become spans nested in the request.
+        """
+        config = aiohttp.TraceConfig()
+
+        def _phase(name: str, start_attr: str) -> Any:
+            async def _start(
+                _session: aiohttp.ClientSession, ctx: SimpleNamespace, _params: Any
+            ) -> None:
+                if self.enabled:
+                    setattr(ctx, start_attr, time.perf_counter())
+
+            async def _end(
+                _session: aiohttp.ClientSession, ctx: SimpleNamespace, params: Any
+            ) -> None:
+                if (start := getattr(ctx, start_attr, None)) is not None:
+                    response = getattr(params, "response", None)
+                    self.record(
+                        name,
+                        "http",
+                        start,
+                        time.perf_counter(),
+                        {"status": response.status} if response is not None else None,
+                    )
+
+            return _start, _end
+
+        for name, start_signal, end_signals in (
+            ("dns", config.on_dns_resolvehost_start, (config.on_dns_resolvehost_end,)),
+            (
+                "pool_wait",
+                config.on_connection_queued_start,
+                (config.on_connection_queued_end,),
+            ),
+            (
+                "connect",
+                config.on_connection_create_start,
+                (config.on_connection_create_end,),
+            ),
+            (
+                "response_headers",
+                config.on_request_start,
+                (config.on_request_end, config.on_request_exception),
+            ),
+        ):
+            start, end = _phase(name, f"{name}_start")
+            start_signal.append(start)
+            for end_signal in end_signals:
+                end_signal.append(end)
+        return config
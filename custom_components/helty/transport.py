@@ -0,0 +1,114 @@
+"""Push transports delivering VMC event payloads to the API client."""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from collections.abc import Callable
+import logging
+from typing import TYPE_CHECKING
+
+from homeassistant.core import HomeAssistant, callback
+
+if TYPE_CHECKING:
+    from homeassistant.components.mqtt import ReceiveMessage
+
+_LOGGER = logging.getLogger(__name__)
+
+EventCallback = Callable[[str, bytes], None]
+ConnectionCallback = Callable[[bool], None]
+
+
+class HeltyTransport(ABC):
+    """Base class for push transports.
+
+    REST polling of ``laststatus`` always remains available; the API client
+    only uses a transport while it reports itself connected.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the transport."""
+        self.connected = False
+        self._on_event: EventCallback | None = None
+        self._on_connection: ConnectionCallback | None = None
+
+    def bind(
+        self, on_event: EventCallback, on_connection: ConnectionCallback
+    ) -> None:
+        """Register the callbacks receiving events and connection changes."""
+        self._on_event = on_event
+        self._on_connection = on_connection
+
+    @abstractmethod
+    async def async_start(self) -> None:
+        """Start receiving events."""
+
+    @abstractmethod
+    async def async_stop(self) -> None:
+        """Stop receiving events."""
+
+    def _set_connected(self, connected: bool) -> None:
+        """Update the connection state and notify the client on changes."""
+        if connected == self.connected:
+            return
+        self.connected = connected
+        _LOGGER.debug("Push transport %s", "connected" if connected else "lost")
+        if self._on_connection is not None:
+            self._on_connection(connected)
+
+    def _dispatch(self, board_serial: str, payload: bytes) -> None:
+        """Hand a raw event payload to the client."""
+        if self._on_event is not None:
+            self._on_event(board_serial, payload)
+
+
+class HeltyMqttTransport(HeltyTransport):
+    """Subscribe to the ``{prefix}/prod/evt/{boardSerial}`` event topics.
+
+    Messages are received through Home Assistant's MQTT integration, so the
+    broker is whichever one it is connected to: typically a local broker
+    bridged to the HCloud IoT topics, or a stand-in replaying fixtures.
+    """
+
+    def __init__(self, hass: HomeAssistant, topic_prefix: str) -> None:
+        """Initialize the transport."""
+        super().__init__()
+        self._hass = hass
+        self._topic = f"{topic_prefix.strip('/')}/prod/evt/+"
+        self._unsubscribe: list[Callable[[], None]] = []
+
+    async def async_start(self) -> None:
+        """Subscribe to the event topics once the MQTT client is ready."""
+        from homeassistant.components import mqtt
+
+        if not await mqtt.async_wait_for_mqtt_client(self._hass):
+            _LOGGER.warning(
+                "MQTT integration is not available, using REST polling only"
+            )
+            return
+        self._unsubscribe.append(
+            await mqtt.async_subscribe(
+                self._hass, self._topic, self._handle_message, encoding=None
+            )
+        )
+        self._unsubscribe.append(
+            mqtt.async_subscribe_connection_status(
+                self._hass, self._handle_connection
+            )
+        )
+        self._set_connected(mqtt.is_connected(self._hass))
+
+    async def async_stop(self) -> None:
+        """Drop the subscriptions."""
+        while self._unsubscribe:
+            self._unsubscribe.pop()()
+        self._set_connected(False)
+
+    @callback
+    def _handle_connection(self, connected: bool) -> None:
+        """Track the MQTT client connection."""
+        self._set_connected(connected)
+
+    @callback
+    def _handle_message(self, msg: ReceiveMessage) -> None:
+        """Forward an event message keyed by the board serial in its topic."""
+        self._dispatch(msg.topic.rsplit("/", 1)[-1], msg.payload)
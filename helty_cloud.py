@@ -3,22 +3,42 @@
 Helty HCloud API Client
 Controls Helty VMC devices via the HCloud cloud API.
 Reverse-engineered from the HCloud web application (hcloud.heltyair.com).
+
+Runs on the Home Assistant integration's async client
+(custom_components/helty/api.py) without needing Home Assistant itself.
 """
 
+import argparse
+import contextlib
+import importlib
+import importlib.util
 import json
 import os
+from pathlib import Path
 import sys
 import time
-import boto3
-import requests
-from dotenv import load_dotenv
+import types
+
+
+def lazy_import(name):
+    """Return a module whose code only runs on first attribute access.
+
+    --help and thin-client runs never start an event loop, so they skip
+    importing asyncio (most of the CLI's startup time).
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
 
-# AWS Cognito Configuration
-COGNITO_REGION = "eu-central-1"
-CLIENT_ID = "7k0c21g92bk3413frij8rso6rk"
 
-# API Configuration
-API_BASE_URL = "https://api.hcloud.heltyair.com"
+asyncio = lazy_import("asyncio")
+dataclasses = lazy_import("dataclasses")
 
 # VMC Commands (from boardType config)
 COMMANDS = {
@@ -45,9 +65,12 @@ COMMANDS = {
     "get-triggers":     {"id": 33, "name": "GetParamTrigger",    "desc": "Get sensor trigger parameters"},
     "get-filter":       {"id": 36, "name": "GetParamFilter",     "desc": "Get filter parameters"},
     "get-led":          {"id": 48, "name": "GetLightLed",        "desc": "Get LED intensity"},
-    "sensors":          {"id": -1, "name": "ReadSensors",        "desc": "Read temperature, CO2, humidity, VOC (special)"},
+    "sensors":          {"id": -1, "name": "ReadSensors",        "desc": "Read temperature, CO2, humidity, VOC (--fresh: read now)"},
 }
 
+# Commands answering with a block of fields, read back through laststatus
+READ_COMMANDS = {0, 1, 32, 33, 36, 48}
+
 # VMC Status codes
 VMC_STATUSES = {
     0: "Off",
@@ -57,140 +80,190 @@ VMC_STATUSES = {
     4: "Cooling",
 }
 
-# Unit conversions: boardUnit -> (divisor, suffix)
-UNIT_CONVERT = {
-    "dC": (10.0, "C"),
-    "dPerc": (10.0, "%"),
+# Reading attribute -> (label, unit)
+SENSOR_LABELS = {
+    "temp_indoor":  ("Temp. Interna", "°C"),
+    "temp_outdoor": ("Temp. Esterna", "°C"),
+    "humidity":     ("Umidità",       "%"),
+    "co2":          ("CO2",           "ppm"),
+    "voc":          ("VOC",           "ppb"),
+    "vmc_status":   ("Stato VMC",     ""),
 }
 
+# Tokens and device list cached between runs, per account
+TOKEN_CACHE = Path(
+    os.environ.get("HELTY_TOKEN_CACHE", "~/.cache/helty/tokens.json")
+).expanduser()
+DEVICE_CACHE_TTL = 86400  # seconds
+
+# Interactive mode: period of the background reads
+PREFETCH_INTERVAL = 60  # seconds
+
+# Local endpoint of the daemon and the thin clients talking to it
+DAEMON_SOCKET = os.environ.get(
+    "HELTY_DAEMON_SOCKET", f"/tmp/helty-{os.getuid()}.sock"
+)
+DAEMON_JOB_HISTORY = 1000
+
+# Reading archive the daemon appends to with --archive
+ARCHIVE_DIR = Path(
+    os.environ.get("HELTY_ARCHIVE", "~/.local/share/helty/archive")
+).expanduser()
+
+
+def load_module(name):
+    """Import a module of the integration without Home Assistant.
+
+    The package __init__ sets up the Home Assistant integration, so the
+    packages are registered as bare modules pointing at their directories
+    and only the Home Assistant-free modules get imported.
+    """
+    base = Path(__file__).resolve().parent / "custom_components"
+    for package, path in (
+        ("custom_components", base),
+        ("custom_components.helty", base / "helty"),
+    ):
+        if package not in sys.modules:
+            module = types.ModuleType(package)
+            module.__path__ = [str(path)]
+            sys.modules[package] = module
+    return importlib.import_module(f"custom_components.helty.{name}")
+
+
+def load_api():
+    """Import the integration's API client."""
+    return load_module("api")
 
-def authenticate(username, password):
-    """Authenticate with AWS Cognito and return tokens."""
-    client = boto3.client("cognito-idp", region_name=COGNITO_REGION)
+
+def load_cache(email):
+    """Return the cached tokens and devices of an account."""
     try:
-        response = client.initiate_auth(
-            ClientId=CLIENT_ID,
-            AuthFlow="USER_PASSWORD_AUTH",
-            AuthParameters={"USERNAME": username, "PASSWORD": password},
-        )
-        if "AuthenticationResult" in response:
-            return response["AuthenticationResult"]
-        elif "ChallengeName" in response:
-            print(f"Challenge required: {response['ChallengeName']}")
-    except Exception as e:
-        print(f"Auth error: {e}")
-    return None
+        return json.loads(TOKEN_CACHE.read_text()).get(email.lower(), {})
+    except (OSError, ValueError):
+        return {}
 
 
-def api(method, path, token, data=None):
-    """Make an authenticated API request."""
-    headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
-    url = f"{API_BASE_URL}{path}"
-    if method == "GET":
-        return requests.get(url, headers=headers, timeout=15)
-    elif method == "POST":
-        return requests.post(url, headers=headers, json=data, timeout=15)
-    elif method == "PUT":
-        return requests.put(url, headers=headers, json=data, timeout=15)
-
-
-def find_my_devices(token):
-    """Find VMC devices assigned to the authenticated user."""
-    resp = api("POST", "/board/product/search", token, {"pageSize": 50, "pageNumber": 0, "status": "OK"})
-    if resp.status_code != 200:
-        return []
-
-    products = resp.json().get("data", [])
-    my_devices = []
-    for p in products:
-        ci = p.get("clientInfo")
-        if ci and ci.get("mail"):
-            cb = p.get("cloudBoard", {})
-            inst = p.get("currentInstallation", {})
-            my_devices.append({
-                "product_id": p["_id"],
-                "serial": p.get("serialNumber"),
-                "model": p.get("productType", {}).get("model", "Unknown"),
-                "line": p.get("productType", {}).get("line", ""),
-                "board_serial": p.get("boardSerialNumber"),
-                "board_id": cb.get("_id") if cb else None,
-                "installation": f"{inst.get('name', '')} - {inst.get('place', '')}" if inst else "N/A",
-                "owner": f"{ci.get('name', '')} {ci.get('lastName', '')}",
-                "email": ci.get("mail"),
-            })
-    return my_devices
-
-
-def read_sensors(token, board_serial, product_serial):
-    """Send GetStatus and read sensor data from the device."""
-    # Send GetStatus command
-    api("POST", f"/board/board/sendcommand/{board_serial}", token,
-        {"commandId": 0, "values": []})
-    # Wait for the device to respond via MQTT
-    time.sleep(4)
-    # Read last status from log endpoint
-    resp = api("POST", "/log/commandlogs/laststatus", token,
-               {"serialNumber": product_serial})
-    if not resp or resp.status_code != 200:
-        return None
-    return resp.json()
+def save_cache(email, entry):
+    """Store the tokens and devices of an account, readable only by the user."""
+    try:
+        cache = json.loads(TOKEN_CACHE.read_text())
+    except (OSError, ValueError):
+        cache = {}
+    cache[email.lower()] = entry
+    TOKEN_CACHE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = TOKEN_CACHE.with_suffix(".tmp")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        json.dump(cache, f)
+    tmp.replace(TOKEN_CACHE)
+
+
+async def connect(
+    session, email, password, use_cache=True, tracer=None, customers=False
+):
+    """Return a logged-in client and the account's devices.
+
+    Cached tokens are reused (renewed by refresh token when expired) and a
+    cached device list skips the product search, so a warm start goes
+    straight to the device. With ``customers`` the list also holds the
+    devices of other owners the account can see.
+    """
+    api_module = load_api()
+    client = api_module.HeltyCloudAPI(session, tracer=tracer)
+    client.set_credentials(email, password)
+
+    cached = load_cache(email) if use_cache else {}
+    if cached.get("tokens"):
+        client.restore_tokens(cached["tokens"])
+    else:
+        print("Authenticating with HCloud...", file=sys.stderr)
+        await client.authenticate(email, password)
+        print("Authenticated!", file=sys.stderr)
+
+    if (
+        cached.get("devices")
+        and cached.get("customers", False) == customers
+        and time.time() - cached.get("devices_at", 0) < DEVICE_CACHE_TTL
+    ):
+        models = load_module("models")
+        devices = [models.Device(**d) for d in cached["devices"]]
+        devices_at = cached["devices_at"]
+    else:
+        print("Finding your VMC devices...", file=sys.stderr)
+        devices = await client.find_devices(customers)
+        devices_at = time.time()
 
+    if use_cache:
+        save_cache(email, {
+            "tokens": client.tokens,
+            "devices": [dataclasses.asdict(d) for d in devices],
+            "devices_at": devices_at,
+            "customers": customers,
+        })
+    return client, devices
 
-def format_sensors(data):
+
+def format_sensors(reading):
     """Format sensor data for display."""
-    if not data:
+    if reading is None:
         print("  No sensor data available.")
         return
 
-    # Known field mappings
-    fields = {
-        "TemperaturaInterna": ("Temp. Interna", 10.0, "\u00b0C"),
-        "TemperaturaEsterna": ("Temp. Esterna", 10.0, "\u00b0C"),
-        "Humidity":           ("Umidit\u00e0",       10.0, "%"),
-        "Anidride":           ("CO2",          1.0,  "ppm"),
-        "Isobutilene":        ("VOC",          1.0,  "ppb"),
-        "VMCStatus":          ("Stato VMC",    None,  ""),
-    }
-
     print("\n  +---------------------+------------+")
     print("  | Sensore             | Valore     |")
     print("  +---------------------+------------+")
-    for item in data:
-        name = item.get("field", "")
-        value = item.get("value", 0)
-        if name in fields:
-            label, divisor, unit = fields[name]
-            if name == "VMCStatus":
-                display = VMC_STATUSES.get(value, f"Unknown ({value})")
-            elif divisor and divisor != 1.0:
-                display = f"{value / divisor:.1f} {unit}"
-            else:
-                display = f"{value} {unit}"
-            print(f"  | {label:19s} | {display:>10s} |")
+    for attr, (label, unit) in SENSOR_LABELS.items():
+        value = getattr(reading, attr)
+        if value is None:
+            continue
+        if attr == "vmc_status":
+            display = VMC_STATUSES.get(value, f"Unknown ({value})")
+        elif isinstance(value, float):
+            display = f"{value:.1f} {unit}"
+        else:
+            display = f"{value} {unit}"
+        print(f"  | {label:19s} | {display:>10s} |")
     print("  +---------------------+------------+")
 
 
-def send_command(token, board_serial, command_name):
-    """Send a command to a VMC device."""
-    if command_name not in COMMANDS:
-        print(f"Unknown command: {command_name}")
-        print(f"Available: {', '.join(sorted(COMMANDS.keys()))}")
-        return None
+def format_block(block):
+    """Print the fields of a read command response."""
+    if block is None:
+        print("  No response available.")
+        return
+    for field, value, unit in zip(block.fields, block.values, block.unit_ids):
+        print(f"  {field:24s} {value!s:>10s} {unit or ''}")
+
+
+async def run_command(client, device, command_name):
+    """Run one CLI command against a device and print its result."""
+    board = device.board_serial
+    if command_name == "sensors":
+        print("  Reading sensors (wait ~4s)...", flush=True)
+        format_sensors(await client.read_sensors(board, device.serial))
+        return
 
     cmd = COMMANDS[command_name]
-    resp = api("POST", f"/board/board/sendcommand/{board_serial}", token,
-               {"commandId": cmd["id"], "values": []})
-    return resp
+    if cmd["id"] in READ_COMMANDS:
+        print(f"  Reading {cmd['name']} (wait ~4s)...", flush=True)
+        format_block(await client.read_block(board, device.serial, cmd["id"]))
+        return
+
+    print(f"  Sending {cmd['name']}...", end=" ", flush=True)
+    body = await client.send_command(board, cmd["id"])
+    print("OK")
+    if body:
+        print(f"  Response: {json.dumps(body, indent=2)}")
 
 
 def print_devices(devices):
     """Print device list."""
     for i, d in enumerate(devices):
-        print(f"\n  [{i+1}] {d['model']}")
-        print(f"      Serial: {d['serial']}")
-        print(f"      Board:  {d['board_serial']}")
-        print(f"      Location: {d['installation']}")
-        print(f"      Owner: {d['owner']}")
+        print(f"\n  [{i+1}] {d.model}")
+        print(f"      Serial: {d.serial}")
+        print(f"      Board:  {d.board_serial}")
+        print(f"      Location: {d.installation}")
+        print(f"      Owner: {d.owner}")
 
 
 def print_commands():
@@ -212,8 +285,123 @@ def print_commands():
             print(f"    {c:20s} {cmd['desc']}")
 
 
-def interactive(token, devices):
-    """Interactive control mode."""
+def select_device(devices, selector):
+    """Return the device matching a serial, board serial or 1-based index."""
+    if selector is None:
+        return devices[0]
+    for d in devices:
+        if selector in (d.serial, d.board_serial):
+            return d
+    if selector.isdigit() and 0 < int(selector) <= len(devices):
+        return devices[int(selector) - 1]
+    return None
+
+
+async def ainput(prompt):
+    """Read a line from stdin without blocking the event loop."""
+    return await asyncio.get_running_loop().run_in_executor(None, input, prompt)
+
+
+class Prefetcher:
+    """Background reads keeping the latest reading of devices at hand.
+
+    Each watched device is re-read every ``PREFETCH_INTERVAL`` seconds.
+    Concurrent requests for the same device share one read.
+    """
+
+    def __init__(self, client, api_errors):
+        self.client = client
+        self.api_errors = api_errors
+        self.readings = {}
+        self._loops = {}
+        self._inflight = {}
+
+    def watch(self, device):
+        """Keep a device's reading fresh in the background."""
+        if device.serial not in self._loops:
+            self._loops[device.serial] = asyncio.create_task(self._loop(device))
+
+    async def _loop(self, device):
+        while True:
+            with contextlib.suppress(*self.api_errors):
+                await self.refresh(device)
+            await asyncio.sleep(PREFETCH_INTERVAL)
+
+    def refresh(self, device):
+        """Return a future of a new reading, joining a read in progress."""
+        if (future := self._inflight.get(device.serial)) is None:
+            future = self._inflight[device.serial] = asyncio.ensure_future(
+                self._read(device)
+            )
+            # Failures reach the awaiting caller; background refreshes
+            # that nobody awaits must not log them as unretrieved
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        return future
+
+    async def _read(self, device):
+        try:
+            reading = await self.client.read_sensors(
+                device.board_serial, device.serial
+            )
+            if reading is not None:
+                self.readings[device.serial] = (reading, time.time())
+            return reading
+        finally:
+            del self._inflight[device.serial]
+
+    def close(self):
+        """Stop all background reads."""
+        for task in (*self._loops.values(), *self._inflight.values()):
+            task.cancel()
+
+
+async def show_sensors(prefetcher, device, fresh):
+    """Print the cached reading, or wait for a read if asked or if none yet."""
+    cached = prefetcher.readings.get(device.serial)
+    if fresh or cached is None:
+        print("  Reading sensors (wait ~4s)...", flush=True)
+        try:
+            await prefetcher.refresh(device)
+        except prefetcher.api_errors as err:
+            print(f"FAILED ({err})")
+            return
+        cached = prefetcher.readings.get(device.serial)
+    if cached is None:
+        format_sensors(None)
+        return
+    reading, fetched_at = cached
+    format_sensors(reading)
+    print(f"  Read {time.time() - fetched_at:.0f}s ago")
+
+
+async def background_command(client, device, command_name, api_errors, prefetcher):
+    """Run a command without holding the prompt; report when it completes."""
+    cmd = COMMANDS[command_name]
+    try:
+        if cmd["id"] in READ_COMMANDS:
+            block = await client.read_block(
+                device.board_serial, device.serial, cmd["id"]
+            )
+            print(f"\n  [{command_name}] {cmd['name']}:")
+            format_block(block)
+        else:
+            body = await client.send_command(device.board_serial, cmd["id"])
+            print(f"\n  [{command_name}] {cmd['name']} OK")
+            if body:
+                print(f"  Response: {json.dumps(body, indent=2)}")
+            # The cached reading would otherwise show the old mode
+            prefetcher.refresh(device)
+    except api_errors as err:
+        print(f"\n  [{command_name}] FAILED ({err})")
+
+
+async def interactive(client, devices, api_errors):
+    """Interactive control mode.
+
+    The selected device is read in the background, so ``sensors`` answers
+    from the latest reading at once; ``sensors --fresh`` waits for a new
+    one. Commands run in the background and report when they complete.
+    """
     if not devices:
         print("No devices found.")
         return
@@ -223,108 +411,962 @@ def interactive(token, devices):
     else:
         print_devices(devices)
         try:
-            idx = int(input("\nSelect device number: ")) - 1
+            idx = int(await ainput("\nSelect device number: ")) - 1
             device = devices[idx]
         except (ValueError, IndexError):
             print("Invalid selection.")
             return
 
-    board = device["board_serial"]
-    print(f"\nConnected to: {device['model']} at {device['installation']}")
-    print(f"Board: {board}")
+    prefetcher = Prefetcher(client, api_errors)
+    prefetcher.watch(device)
+    pending = set()
+
+    print(f"\nConnected to: {device.model} at {device.installation}")
+    print(f"Board: {device.board_serial}")
     print_commands()
 
-    while True:
-        try:
-            cmd = input(f"\nhelty [{device['installation']}]> ").strip().lower()
-        except (EOFError, KeyboardInterrupt):
-            print("\nBye!")
-            break
+    try:
+        while True:
+            try:
+                line = (await ainput(f"\nhelty [{device.installation}]> ")).strip().lower()
+            except (EOFError, KeyboardInterrupt):
+                print("\nBye!")
+                break
+            cmd, *options = line.split() or [""]
+
+            if cmd in ("quit", "exit", "q"):
+                break
+            elif cmd in ("help", "h", "?"):
+                print_commands()
+            elif cmd == "devices":
+                print_devices(devices)
+                # Listing devices is usually followed by looking at them
+                for d in devices:
+                    prefetcher.watch(d)
+            elif cmd == "sensors":
+                await show_sensors(prefetcher, device, "--fresh" in options)
+            elif cmd in COMMANDS:
+                print(f"  {COMMANDS[cmd]['name']} queued")
+                task = asyncio.create_task(
+                    background_command(client, device, cmd, api_errors, prefetcher)
+                )
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+            elif cmd:
+                print(f"  Unknown command: {cmd}")
+                print(f"  Type 'help' for available commands")
+    finally:
+        prefetcher.close()
+        if pending:
+            print(f"  Waiting for {len(pending)} command(s)...")
+            await asyncio.gather(*pending)
 
-        if cmd in ("quit", "exit", "q"):
+
+def select_devices(devices, selectors):
+    """Return the devices matching all selectors, or all without selectors."""
+    if not selectors:
+        return devices
+    selected = []
+    for selector in selectors:
+        device = select_device(devices, selector)
+        if device is None:
+            print(f"No device matches {selector!r}", file=sys.stderr)
+            return None
+        if device not in selected:
+            selected.append(device)
+    return selected
+
+
+def open_stream(path, max_bytes, backup_count):
+    """Return a logger writing one record per line to stdout or a file."""
+    import logging
+
+    stream = logging.getLogger("helty_cloud.watch")
+    stream.propagate = False
+    stream.setLevel(logging.INFO)
+    if path:
+        from logging.handlers import RotatingFileHandler
+
+        handler = RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+        )
+    else:
+        handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    stream.handlers[:] = [handler]
+    return stream
+
+
+async def watch(client, devices, args, api_errors):
+    """Poll devices every interval and stream one JSON object per reading.
+
+    Each cycle reads all devices concurrently, at most ``--concurrency`` at
+    a time, and writes every result as soon as it arrives. Nothing is kept
+    between cycles, so memory stays flat however long it runs. A cycle
+    overrunning the interval skips the ticks it missed instead of bursting.
+    """
+    dumps = load_api().JSON_DUMPS
+    stream = open_stream(args.output, args.max_bytes, args.backup_count)
+    semaphore = asyncio.Semaphore(max(1, args.concurrency))
+    loop = asyncio.get_running_loop()
+
+    async def read(device):
+        async with semaphore:
+            start = time.monotonic()
+            record = {"ts": round(time.time(), 3), "serial": device.serial}
+            try:
+                reading = await client.read_sensors(
+                    device.board_serial, device.serial
+                )
+            except api_errors as err:
+                record["error"] = str(err)
+            else:
+                if reading is None:
+                    record["error"] = "no sensor data"
+                else:
+                    record.update(dataclasses.asdict(reading))
+            record["latency_ms"] = round((time.monotonic() - start) * 1000)
+            stream.info(dumps(record).decode())
+
+    print(
+        f"Watching {len(devices)} device(s) every {args.interval:g}s",
+        file=sys.stderr,
+    )
+    cycle = 0
+    next_run = loop.time()
+    while args.count is None or cycle < args.count:
+        await asyncio.gather(*(read(device) for device in devices))
+        cycle += 1
+        if args.count is not None and cycle >= args.count:
             break
-        elif cmd in ("help", "h", "?"):
-            print_commands()
-        elif cmd == "devices":
-            print_devices(devices)
-        elif cmd == "sensors":
-            print("  Reading sensors (wait ~4s)...", flush=True)
-            data = read_sensors(token, board, device["serial"])
-            format_sensors(data)
-        elif cmd in COMMANDS:
-            print(f"  Sending {COMMANDS[cmd]['name']}...", end=" ", flush=True)
-            resp = send_command(token, board, cmd)
-            if resp and resp.status_code == 200:
-                print("OK")
-                body = resp.json() if resp.text else {}
-                if body:
-                    print(f"  Response: {json.dumps(body, indent=2)}")
+        now = loop.time()
+        next_run += args.interval
+        if next_run < now:
+            next_run += (now - next_run) // args.interval * args.interval + args.interval
+        await asyncio.sleep(next_run - now)
+
+
+def select_fleet(devices, args):
+    """Return the devices matched by any fleet selector."""
+    serials = set(args.serial or ())
+    if args.from_file:
+        with open(args.from_file, encoding="utf-8") as f:
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    serials.add(line)
+    installations = [i.lower() for i in args.installation or ()]
+    models = {m.lower() for m in args.model or ()}
+    return [
+        d for d in devices
+        if args.all
+        or d.serial in serials
+        or d.board_serial in serials
+        or d.model.lower() in models
+        or any(i in d.installation.lower() for i in installations)
+    ]
+
+
+async def verify_command(client, device, command_id):
+    """Read back the mode a command sets; None when it cannot be read back.
+
+    The mode is the VMCStatus field of a GetStatus response. The LED,
+    sensor and standby toggles are not part of any read command response,
+    and a response without VMCStatus leaves the command unverified too.
+    """
+    const = load_module("const")
+    target = const.COMMAND_TARGETS.get(command_id)
+    if target is None or target[0] != const.STATE_MODE:
+        return None
+    value = target[1]
+    reading = await client.read_sensors(device.board_serial, device.serial)
+    if reading is None or reading.vmc_status not in const.VMC_STATUS_MODES:
+        # No VMCStatus in the response: nothing to compare with
+        return None
+    mode = const.VMC_STATUS_MODES[reading.vmc_status]
+    # Normal mode does not report which speed is set
+    return mode == ("normal" if value.startswith("speed_") else value)
+
+
+async def fleet(client, devices, args, api_errors):
+    """Send one command to many devices and report the outcome of each.
+
+    Sends run concurrently up to ``--parallel`` and start at most ``--rate``
+    per second; with ``--verify`` each device's state is read back.
+    """
+    command_id = COMMANDS[args.fleet_command]["id"]
+    semaphore = asyncio.Semaphore(max(1, args.parallel))
+    loop = asyncio.get_running_loop()
+    spacing = 1 / args.rate if args.rate else 0
+    next_start = loop.time()
+
+    async def run(device):
+        nonlocal next_start
+        async with semaphore:
+            # Reserve the next start slot, then wait for it
+            start_at = max(next_start, loop.time())
+            next_start = start_at + spacing
+            await asyncio.sleep(start_at - loop.time())
+
+            result = {
+                "serial": device.serial,
+                "board_serial": device.board_serial,
+                "installation": device.installation,
+                "ok": False,
+                "verified": None,
+                "error": None,
+            }
+            start = time.monotonic()
+            try:
+                await client.send_command(device.board_serial, command_id)
+                result["ok"] = True
+                result["latency_ms"] = round((time.monotonic() - start) * 1000)
+                if args.verify:
+                    result["verified"] = await verify_command(
+                        client, device, command_id
+                    )
+            except api_errors as err:
+                result["error"] = str(err)
+                result.setdefault(
+                    "latency_ms", round((time.monotonic() - start) * 1000)
+                )
+            return result
+
+    print(
+        f"Sending {COMMANDS[args.fleet_command]['name']} to {len(devices)} device(s)...",
+        file=sys.stderr,
+    )
+    start = time.monotonic()
+    results = await asyncio.gather(*(run(device) for device in devices))
+    elapsed = time.monotonic() - start
+    summary = {
+        "command": args.fleet_command,
+        "devices": len(results),
+        "ok": sum(r["ok"] for r in results),
+        "failed": sum(not r["ok"] for r in results),
+        "not_verified": sum(r["verified"] is False for r in results),
+        "elapsed_s": round(elapsed, 3),
+    }
+    if args.json:
+        print(json.dumps({"summary": summary, "results": results}, indent=2))
+    else:
+        print_fleet_report(results, summary)
+    return 0 if summary["failed"] == 0 and summary["not_verified"] == 0 else 2
+
+
+def print_fleet_report(results, summary):
+    """Print a fleet run as a table with a summary line."""
+    print(f"\n  {'Serial':16s} {'Installation':28s} {'Result':8s} {'Latency':>9s}  Verified")
+    for r in results:
+        verified = {None: "-", True: "yes", False: "NO"}[r["verified"]]
+        print(
+            f"  {r['serial']:16s} {r['installation'][:28]:28s} "
+            f"{'OK' if r['ok'] else 'FAILED':8s} {r['latency_ms']:>7d}ms  {verified}"
+        )
+        if r["error"]:
+            print(f"    {r['error']}")
+    print(
+        f"\n  {summary['ok']}/{summary['devices']} sent, {summary['failed']} failed, "
+        f"{summary['not_verified']} not verified in {summary['elapsed_s']:.1f}s"
+    )
+
+
+class Daemon:
+    """Poll loop, reading cache and command queue behind a local HTTP API.
+
+    Readings are kept per device together with their pre-encoded JSON, so
+    serving a read is a dictionary lookup: no cloud call, no encoding.
+    Commands are queued and run by a few workers; their results are kept
+    for the last ``DAEMON_JOB_HISTORY`` jobs. With ``--archive`` every
+    reading is also appended to the on-disk archive, whose past days are
+    compacted in a worker thread.
+    """
+
+    def __init__(self, client, devices, args, api_errors):
+        self.client = client
+        self.devices = devices
+        self.args = args
+        self.api_errors = api_errors
+        self.dumps = load_api().JSON_DUMPS
+        metrics = load_module("metrics")
+        self.metrics = metrics.ReadingMetrics()
+        self.labels = {
+            d.serial: metrics.device_labels(
+                d.serial, d.board_serial, d.model, d.installation
+            )
+            for d in devices
+        }
+        self.records = {}
+        self.encoded = {}
+        self._all_encoded = None
+        self.devices_encoded = self.dumps([dataclasses.asdict(d) for d in devices])
+        self.queue = asyncio.Queue(maxsize=DAEMON_JOB_HISTORY)
+        self.jobs = {}
+        self._job_ids = iter(range(1, sys.maxsize))
+        self._semaphore = asyncio.Semaphore(max(1, args.concurrency))
+        self.archive = (
+            load_module("archive").ReadingArchive(args.archive)
+            if args.archive else None
+        )
+        self._compactions = set()
+        # Reads started after commands, kept until done
+        self._refreshes = set()
+
+    def find(self, selector):
+        """Return the device matching a selector."""
+        return select_device(self.devices, selector)
+
+    def store(self, device, record):
+        """Cache the latest record of a device."""
+        self.records[device.serial] = record
+        self.encoded[device.serial] = self.dumps(record)
+        self._all_encoded = None
+        self.metrics.update(device.serial, self.labels[device.serial], record)
+
+    def all_encoded(self):
+        """Return the JSON of every cached record, built once per change."""
+        if self._all_encoded is None:
+            self._all_encoded = self.dumps(list(self.records.values()))
+        return self._all_encoded
+
+    async def read(self, device):
+        """Read one device into the cache."""
+        async with self._semaphore:
+            start = time.monotonic()
+            record = {"serial": device.serial, "fetched_at": time.time()}
+            try:
+                reading = await self.client.read_sensors(
+                    device.board_serial, device.serial
+                )
+            except self.api_errors as err:
+                record["error"] = str(err)
             else:
-                print(f"FAILED ({resp.status_code if resp else 'no response'})")
-                if resp:
-                    print(f"  {resp.text[:300]}")
+                if reading is None:
+                    record["error"] = "no sensor data"
+                else:
+                    record.update(dataclasses.asdict(reading))
+                    record["success_at"] = record["fetched_at"]
+                    if self.archive is not None:
+                        self.archive.append(
+                            record["fetched_at"], device.serial, reading
+                        )
+            record["latency_ms"] = round((time.monotonic() - start) * 1000)
+        previous = self.records.get(device.serial)
+        if "error" in record and previous is not None and "success_at" in previous:
+            # Keep serving the last good reading, flagged with the failure
+            record = {**previous, **record}
+        self.store(device, record)
+
+    async def poll_forever(self):
+        """Refresh every device each interval."""
+        loop = asyncio.get_running_loop()
+        next_run = loop.time()
+        while True:
+            await asyncio.gather(*(self.read(device) for device in self.devices))
+            if self.archive is not None:
+                self.archive.flush()
+                if days := self.archive.take_closed():
+                    task = asyncio.create_task(self.compact(days))
+                    self._compactions.add(task)
+                    task.add_done_callback(self._compactions.discard)
+            next_run = max(next_run + self.args.interval, loop.time())
+            await asyncio.sleep(next_run - loop.time())
+
+    async def compact(self, days):
+        """Compact past days of the archive without blocking the loop."""
+        for day in days:
+            try:
+                await asyncio.to_thread(self.archive.compact, day)
+            except OSError as err:
+                print(f"Compacting {day} failed: {err}", file=sys.stderr)
+
+    def submit(self, device, command_name):
+        """Queue a command and return its job and a future set when done."""
+        job = {
+            "id": next(self._job_ids),
+            "serial": device.serial,
+            "command": command_name,
+            "status": "queued",
+            "queued_at": time.time(),
+        }
+        done = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((job, device, done))
+        self.jobs[job["id"]] = job
+        while len(self.jobs) > DAEMON_JOB_HISTORY:
+            del self.jobs[next(iter(self.jobs))]
+        return job, done
+
+    async def worker(self):
+        """Run queued commands."""
+        while True:
+            job, device, done = await self.queue.get()
+            job["status"] = "running"
+            cmd = COMMANDS[job["command"]]
+            start = time.monotonic()
+            try:
+                if job["command"] == "sensors":
+                    await self.read(device)
+                    job["result"] = self.records[device.serial]
+                elif cmd["id"] in READ_COMMANDS:
+                    block = await self.client.read_block(
+                        device.board_serial, device.serial, cmd["id"]
+                    )
+                    job["result"] = dict(zip(block.fields, block.values)) if block else None
+                else:
+                    job["result"] = await self.client.send_command(
+                        device.board_serial, cmd["id"]
+                    )
+                    # Let the cache catch up with the change right away
+                    task = asyncio.create_task(self.read(device))
+                    self._refreshes.add(task)
+                    task.add_done_callback(self._refreshes.discard)
+                job["status"] = "done"
+            except self.api_errors as err:
+                job["status"] = "failed"
+                job["error"] = str(err)
+            finally:
+                # Answer whoever waits for the job, even if it raised
+                job["latency_ms"] = round((time.monotonic() - start) * 1000)
+                if not done.done():
+                    done.set_result(job)
+                self.queue.task_done()
+
+    def make_app(self):
+        """Return the HTTP application serving the cache and the queue."""
+        from aiohttp import web
+
+        def json_response(body, status=200):
+            return web.Response(
+                body=body, status=status, content_type="application/json"
+            )
+
+        def error(status, message):
+            return json_response(self.dumps({"error": message}), status)
+
+        async def get_devices(request):
+            return json_response(self.devices_encoded)
+
+        async def get_readings(request):
+            return json_response(self.all_encoded())
+
+        async def get_reading(request):
+            device = self.find(request.match_info["device"])
+            if device is None:
+                return error(404, "unknown device")
+            if (body := self.encoded.get(device.serial)) is None:
+                return error(503, "no reading yet")
+            return json_response(body)
+
+        async def post_command(request):
+            try:
+                payload = await request.json()
+                command_name = payload["command"]
+            except (ValueError, KeyError, TypeError):
+                return error(400, "expected {\"command\": ..., \"device\": ...}")
+            if command_name not in COMMANDS:
+                return error(400, f"unknown command {command_name!r}")
+            device = self.find(payload.get("device"))
+            if device is None:
+                return error(404, "unknown device")
+            try:
+                job, done = self.submit(device, command_name)
+            except asyncio.QueueFull:
+                return error(503, "command queue full")
+            if payload.get("wait"):
+                # A client hanging up must not cancel the queued command
+                await asyncio.shield(done)
+                return json_response(self.dumps(job))
+            return json_response(self.dumps(job), 202)
+
+        async def get_metrics(request):
+            # Everything comes from caches: a scrape never calls the cloud
+            text = "".join((
+                self.metrics.render(),
+                self.client.stats.render(),
+                "# HELP helty_command_queue_depth Commands waiting to run\n"
+                "# TYPE helty_command_queue_depth gauge\n"
+                f"helty_command_queue_depth {self.queue.qsize()}\n",
+            ))
+            return web.Response(
+                text=text, content_type="text/plain", charset="utf-8",
+                headers={"X-Content-Type-Options": "nosniff"},
+            )
+
+        async def get_command(request):
+            try:
+                job = self.jobs[int(request.match_info["job"])]
+            except (KeyError, ValueError):
+                return error(404, "unknown job")
+            return json_response(self.dumps(job))
+
+        app = web.Application()
+        app.router.add_get("/devices", get_devices)
+        app.router.add_get("/readings", get_readings)
+        app.router.add_get("/readings/{device}", get_reading)
+        app.router.add_post("/commands", post_command)
+        app.router.add_get("/commands/{job}", get_command)
+        app.router.add_get("/metrics", get_metrics)
+        return app
+
+
+async def daemon(client, devices, args, api_errors):
+    """Serve cached readings and queued commands until interrupted."""
+    from aiohttp import web
+
+    service = Daemon(client, devices, args, api_errors)
+    runner = web.AppRunner(service.make_app(), access_log=None)
+    await runner.setup()
+    if args.listen:
+        host, _, port = args.listen.rpartition(":")
+        site = web.TCPSite(runner, host or "127.0.0.1", int(port))
+        where = f"http://{host or '127.0.0.1'}:{port}"
+    else:
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(args.socket)
+        site = web.UnixSite(runner, args.socket)
+        where = args.socket
+    await site.start()
+    if not args.listen:
+        os.chmod(args.socket, 0o600)
+    print(f"Serving {len(devices)} device(s) on {where}", file=sys.stderr)
+
+    tasks = [asyncio.create_task(service.poll_forever())]
+    tasks.extend(
+        asyncio.create_task(service.worker()) for _ in range(max(1, args.concurrency))
+    )
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await runner.cleanup()
+        if service.archive is not None:
+            service.archive.close()
+
+
+def daemon_request(target, method, path, payload=None):
+    """Call the daemon with the standard library only, for a fast start."""
+    import http.client
+    import socket
+    from urllib.parse import urlsplit
+
+    if target.startswith(("http://", "https://")):
+        url = urlsplit(target)
+        conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=60)
+    else:
+        class UnixHTTPConnection(http.client.HTTPConnection):
+            def connect(self):
+                self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self.sock.settimeout(self.timeout)
+                self.sock.connect(target)
+
+        conn = UnixHTTPConnection("localhost", timeout=60)
+    body = json.dumps(payload).encode() if payload is not None else None
+    try:
+        conn.request(
+            method, path, body, {"Content-Type": "application/json"} if body else {}
+        )
+        resp = conn.getresponse()
+        return resp.status, json.loads(resp.read() or b"null")
+    finally:
+        conn.close()
+
+
+def run_thin(args):
+    """Run a command through the daemon instead of the cloud."""
+    from urllib.parse import quote
+
+    selector = args.device or "1"
+    try:
+        if args.command == "sensors":
+            status, data = daemon_request(
+                args.via, "GET", f"/readings/{quote(selector, safe='')}"
+            )
         else:
-            print(f"  Unknown command: {cmd}")
-            print(f"  Type 'help' for available commands")
+            status, data = daemon_request(
+                args.via, "POST", "/commands",
+                {"device": selector, "command": args.command, "wait": True},
+            )
+    except OSError as err:
+        print(f"Daemon not reachable at {args.via}: {err}", file=sys.stderr)
+        return 1
 
+    if status >= 400:
+        print(f"Failed: {data.get('error') if data else status}", file=sys.stderr)
+        return 1
+    if args.command == "sensors":
+        fields = {k: data.get(k) for k in SENSOR_LABELS}
+        format_sensors(load_module("models").Reading(**fields))
+        print(f"  {time.time() - data['fetched_at']:.0f}s old"
+              + (f", last read failed: {data['error']}" if "error" in data else ""))
+        return 0
+    if data.get("status") == "failed":
+        print(f"Failed: {data.get('error')}", file=sys.stderr)
+        return 1
+    result = data.get("result")
+    print(f"  {COMMANDS[args.command]['name']} {data.get('status', 'queued')}")
+    if result:
+        print(f"  Response: {json.dumps(result, indent=2)}")
+    return 0
 
-def main():
+
+def parse_interval(text):
+    """Return a polling interval argument, a positive number of seconds."""
+    try:
+        value = float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected seconds, got {text!r}") from None
+    if not 0 < value < float("inf"):
+        raise argparse.ArgumentTypeError(f"must be a positive number, got {text!r}")
+    return value
+
+
+def parse_day(text):
+    """Return a YYYY-MM-DD day argument in canonical form."""
+    try:
+        return time.strftime("%Y-%m-%d", time.strptime(text, "%Y-%m-%d"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD, got {text!r}") from None
+
+
+def run_export(args):
+    """Export the reading archive; works offline, without logging in."""
+    if not Path(args.archive).is_dir():
+        print(f"No archive at {args.archive}", file=sys.stderr)
+        return 1
+    archive_module = load_module("archive")
+    output_format = args.format or (
+        "parquet" if args.output and args.output.endswith(".parquet") else "csv"
+    )
+    chunks = archive_module.ReadingArchive(args.archive).chunks(
+        args.first, args.last, args.serial
+    )
+    if output_format == "parquet":
+        if not args.output:
+            print("Parquet export needs --output", file=sys.stderr)
+            return 1
+        try:
+            rows = archive_module.export_parquet(chunks, args.output)
+        except ImportError as err:
+            print(err, file=sys.stderr)
+            return 1
+    elif args.output:
+        with open(args.output, "w", newline="", encoding="utf-8") as f:
+            rows = archive_module.export_csv(chunks, f)
+    else:
+        rows = archive_module.export_csv(chunks, sys.stdout)
+    print(f"Exported {rows} readings", file=sys.stderr)
+    return 0
+
+
+def build_parser():
+    """Return the command line parser."""
+    parser = argparse.ArgumentParser(
+        description="Helty VMC Cloud Controller. Credentials come from "
+        "HELTY_EMAIL and HELTY_PASSWORD in .env or the environment.",
+        epilog="If no command is given, enters interactive mode.",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help=f"log in and search devices again instead of using {TOKEN_CACHE}",
+    )
+    parser.add_argument(
+        "--customers", action="store_true",
+        help="also list the devices of other owners the account can see, "
+        "e.g. an installer's customers",
+    )
+    parser.add_argument(
+        "--trace", metavar="FILE",
+        help="record the timing of every request phase and write it to FILE "
+        "as Chrome trace-event JSON on exit (open in Perfetto)",
+    )
+    parser.add_argument(
+        "--via",
+        help="run single commands through a daemon at this socket path or "
+        "http:// URL instead of the cloud (default: $HELTY_DAEMON)",
+    )
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+
+    device_parent = argparse.ArgumentParser(add_help=False)
+    device_parent.add_argument(
+        "-d", "--device",
+        help="device serial, board serial or list number (default: the first)",
+    )
+    for name in sorted(COMMANDS):
+        subparsers.add_parser(
+            name, parents=[device_parent], help=COMMANDS[name]["desc"]
+        )
+
+    fleet_parser = subparsers.add_parser(
+        "fleet", help="send a command to many devices at once"
+    )
+    fleet_parser.add_argument(
+        "fleet_command", metavar="command",
+        choices=sorted(
+            name for name, cmd in COMMANDS.items()
+            if cmd["id"] >= 0 and cmd["id"] not in READ_COMMANDS
+        ),
+        help="command to send, e.g. night or speed2",
+    )
+    selectors = fleet_parser.add_argument_group(
+        "device selection", "devices matching any selector are targeted"
+    )
+    selectors.add_argument(
+        "-s", "--serial", action="append",
+        help="product or board serial; repeatable",
+    )
+    selectors.add_argument(
+        "--installation", action="append",
+        help="installation name or place containing this text; repeatable",
+    )
+    selectors.add_argument(
+        "--model", action="append", help="model name; repeatable"
+    )
+    selectors.add_argument(
+        "-f", "--from-file", help="file with one serial per line"
+    )
+    selectors.add_argument(
+        "--all", action="store_true", help="every device of the account"
+    )
+    fleet_parser.add_argument(
+        "-p", "--parallel", type=int, default=8,
+        help="devices handled at the same time (default: 8)",
+    )
+    fleet_parser.add_argument(
+        "-r", "--rate", type=float, default=5,
+        help="commands started per second, 0 for no limit (default: 5)",
+    )
+    fleet_parser.add_argument(
+        "--verify", action="store_true",
+        help="read each device's state back after the command",
+    )
+    fleet_parser.add_argument(
+        "--dry-run", action="store_true",
+        help="list the selected devices without sending anything",
+    )
+    fleet_parser.add_argument(
+        "--json", action="store_true", help="print the report as JSON"
+    )
+
+    daemon_parser = subparsers.add_parser(
+        "daemon", help="keep one login and poll loop, serve them locally"
+    )
+    daemon_parser.add_argument(
+        "--socket", default=DAEMON_SOCKET,
+        help=f"Unix socket to serve on (default: {DAEMON_SOCKET})",
+    )
+    daemon_parser.add_argument(
+        "--listen", metavar="[HOST:]PORT",
+        help="serve HTTP on this address instead of the socket",
+    )
+    daemon_parser.add_argument(
+        "-i", "--interval", type=parse_interval, default=60,
+        help="seconds between polling cycles (default: 60)",
+    )
+    daemon_parser.add_argument(
+        "-c", "--concurrency", type=int, default=8,
+        help="devices read, and commands run, at the same time (default: 8)",
+    )
+    daemon_parser.add_argument(
+        "--archive", nargs="?", const=str(ARCHIVE_DIR), metavar="DIR",
+        help=f"append every reading to an archive in DIR (default DIR: {ARCHIVE_DIR})",
+    )
+
+    export = subparsers.add_parser(
+        "export", help="export the daemon's reading archive as CSV or Parquet"
+    )
+    export.add_argument(
+        "--archive", default=str(ARCHIVE_DIR),
+        help=f"archive directory (default: {ARCHIVE_DIR})",
+    )
+    export.add_argument(
+        "--from", dest="first", type=parse_day, metavar="DAY",
+        help="first day to export, YYYY-MM-DD (UTC)",
+    )
+    export.add_argument(
+        "--to", dest="last", type=parse_day, metavar="DAY",
+        help="last day to export, YYYY-MM-DD (UTC), included",
+    )
+    export.add_argument(
+        "-s", "--serial", action="append",
+        help="only this product serial; repeatable",
+    )
+    export.add_argument(
+        "--format", choices=("csv", "parquet"),
+        help="output format (default: parquet for a .parquet output, else csv)",
+    )
+    export.add_argument(
+        "-o", "--output",
+        help="write to this file instead of stdout (required for Parquet)",
+    )
+
+    watch = subparsers.add_parser(
+        "watch", help="poll all devices and stream readings as JSON Lines"
+    )
+    watch.add_argument(
+        "-i", "--interval", type=parse_interval, default=60,
+        help="seconds between polling cycles (default: 60)",
+    )
+    watch.add_argument(
+        "-d", "--device", action="append", dest="devices",
+        help="only poll this device (serial, board serial or list number); "
+        "repeatable",
+    )
+    watch.add_argument(
+        "-c", "--concurrency", type=int, default=8,
+        help="devices read at the same time (default: 8)",
+    )
+    watch.add_argument(
+        "-o", "--output",
+        help="append to this file instead of stdout, rotating it by size",
+    )
+    watch.add_argument(
+        "--max-bytes", type=int, default=10_000_000,
+        help="rotate the output file at this size (default: 10 MB)",
+    )
+    watch.add_argument(
+        "--backup-count", type=int, default=5,
+        help="rotated output files to keep (default: 5)",
+    )
+    watch.add_argument(
+        "-n", "--count", type=int,
+        help="stop after this many cycles (default: run until interrupted)",
+    )
+    return parser
+
+
+def load_env():
+    """Load .env into the environment when python-dotenv is installed."""
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
     load_dotenv()
 
-    command = sys.argv[1] if len(sys.argv) > 1 else None
-    username = os.environ.get("HELTY_EMAIL")
-    password = os.environ.get("HELTY_PASSWORD")
 
-    if not username or not password:
-        print("Helty VMC Cloud Controller")
-        print("Set HELTY_EMAIL and HELTY_PASSWORD in .env or environment.")
-        print(f"\nUsage: python {sys.argv[0]} [command]")
-        print(f"\nCommands: {', '.join(sorted(COMMANDS.keys()))}")
-        print("\nIf no command is given, enters interactive mode.")
-        sys.exit(1)
+def write_trace(path, tracer):
+    """Write the recorded spans as Chrome trace-event JSON."""
+    trace = tracer.export()
+    with open(path, "w") as f:
+        json.dump(trace, f)
+    print(f"Wrote {len(trace['traceEvents'])} spans to {path}", file=sys.stderr)
 
-    print("Authenticating with HCloud...")
-    tokens = authenticate(username, password)
-    if not tokens:
-        print("Authentication failed.")
-        sys.exit(1)
-    print("Authenticated!")
 
-    token = tokens["IdToken"]
+async def async_main(args, username, password):
+    """Connect and run the selected mode."""
+    import aiohttp
+
+    api_module = load_api()
+    api_errors = (api_module.HeltyAuthError, api_module.HeltyConnectionError)
+
+    tracer = load_module("tracing").Tracer()
+    # Without --trace the session carries no trace hooks at all
+    tracer.enabled = bool(args.trace)
+    trace_configs = [tracer.trace_config()] if args.trace else None
+
+    try:
+        async with aiohttp.ClientSession(trace_configs=trace_configs) as session:
+            try:
+                client, devices = await connect(
+                    session, username, password, use_cache=not args.no_cache,
+                    tracer=tracer, customers=args.customers,
+                )
+            except api_module.HeltyAuthError as err:
+                print(f"Authentication failed: {err}", file=sys.stderr)
+                return 1
+            except api_module.HeltyConnectionError as err:
+                print(f"Connection failed: {err}", file=sys.stderr)
+                return 1
+
+            try:
+                return await run_mode(args, client, devices, api_errors)
+            finally:
+                if not args.no_cache:
+                    # Tokens renewed during the run serve the next one
+                    entry = load_cache(username)
+                    entry["tokens"] = client.tokens
+                    save_cache(username, entry)
+    finally:
+        # Failed logins are traced too
+        if args.trace:
+            write_trace(args.trace, tracer)
 
-    print("Finding your VMC devices...")
-    devices = find_my_devices(token)
 
+async def run_mode(args, client, devices, api_errors):
+    """Run interactive mode, watch mode or a single command."""
     if not devices:
-        print("No VMC devices found assigned to your account.")
-        sys.exit(1)
+        print("No VMC devices found assigned to your account.", file=sys.stderr)
+        return 1
+
+    if args.command == "fleet":
+        selected = select_fleet(devices, args)
+        if not selected:
+            print("No device matches the selection.", file=sys.stderr)
+            return 1
+        if args.dry_run:
+            print_devices(selected)
+            return 0
+        return await fleet(client, selected, args, api_errors)
+
+    if args.command == "daemon":
+        await daemon(client, devices, args, api_errors)
+        return 0
+
+    if args.command == "watch":
+        selected = select_devices(devices, args.devices)
+        if selected is None:
+            return 1
+        await watch(client, selected, args, api_errors)
+        return 0
 
     print(f"Found {len(devices)} device(s):")
     print_devices(devices)
 
-    if command:
-        # Single command mode
-        device = devices[0]
-        board = device["board_serial"]
-        if command == "sensors":
-            print("\nReading sensors (wait ~4s)...")
-            data = read_sensors(token, board, device["serial"])
-            format_sensors(data)
-        else:
-            print(f"\nSending '{command}' to {board}...")
-            resp = send_command(token, board, command)
-            if resp and resp.status_code == 200:
-                print("Command sent successfully!")
-                body = resp.json() if resp.text else {}
-                if body:
-                    print(json.dumps(body, indent=2))
-            else:
-                print(f"Failed: {resp.status_code if resp else 'no response'}")
-                if resp:
-                    print(resp.text[:300])
-    else:
-        # Interactive mode
-        interactive(token, devices)
+    if not args.command:
+        await interactive(client, devices, api_errors)
+        return 0
+
+    # Single command mode
+    device = select_device(devices, args.device)
+    if device is None:
+        print(f"No device matches {args.device!r}")
+        return 1
+    print(f"\n{device.model} ({device.board_serial}):")
+    try:
+        await run_command(client, device, args.command)
+    except api_errors as err:
+        print(f"Failed: {err}")
+        return 1
+    return 0
+
+
+def main():
+    parser = build_parser()
+    args = parser.parse_args()
+    # After parsing, so --help does not import dotenv
+    load_env()
+    args.via = args.via or os.environ.get("HELTY_DAEMON")
+
+    if args.command == "export":
+        # Reads local files only: no credentials needed
+        sys.exit(run_export(args))
+
+    if args.via and args.command in COMMANDS:
+        # Thin client: no login, no aiohttp, just a local request
+        sys.exit(run_thin(args))
+
+    username = os.environ.get("HELTY_EMAIL")
+    password = os.environ.get("HELTY_PASSWORD")
+
+    if not username or not password:
+        parser.print_usage()
+        print("Set HELTY_EMAIL and HELTY_PASSWORD in .env or environment.")
+        sys.exit(1)
+
+    try:
+        sys.exit(asyncio.run(async_main(args, username, password)))
+    except KeyboardInterrupt:
+        sys.exit(130)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,147 @@
+"""Local stand-in for the HCloud REST API and Cognito, for benchmarks.
+
+Serves any number of devices for one account:
+
+    python scripts/fake_hcloud.py --devices 1000 --port 8765
+
+Point the API client at it by setting ``api.API_BASE_URL`` to
+``http://127.0.0.1:8765`` and ``api.COGNITO_URL`` to the same URL with a
+trailing slash. Any email and password log in. ``GET /_stats`` returns the
+number of requests served per endpoint.
+"""
+
+import argparse
+import json
+import random
+
+from aiohttp import web
+
+# commandId -> VMCStatus reported afterwards
+MODE_COMMANDS = {20: 0, 21: 4, 22: 3, 23: 2, 44: 1, 45: 1, 46: 1, 47: 1}
+
+# Read commandId -> response fields, as many as the matching Set command
+# takes; fields not documented in KNOWLEDGE.md are numbered
+BLOCKS = {
+    1: ["ELPTIME", "IP"],
+    32: [
+        *(f"Fan{side}Speed{n}" for side in ("Int", "Ext") for n in range(1, 5)),
+        *(
+            f"Fan{side}{name}"
+            for name in ("NightSpeed", "HyperSpeed", "RaffSpeed", "HighHumTrigg", "LowHumTrigg")
+            for side in ("Int", "Ext")
+        ),
+        "RoundsK", "SpeedServoClose",
+    ],
+    33: [
+        "CO2Trigg", "VocTrigg", "DeltaTemp", "IceAlarm", "TempHumTrig", "HumHighSpeed",
+        "NightLedIntensity", "DeltaFreeHeating", "DeltaFreeCooling", "ConfortHeating",
+        "ConfortCooling", *(f"Trigger{n}" for n in range(12, 28)),
+    ],
+    36: [
+        *(f"Lt10SSpeed{n}" for n in range(1, 5)),
+        *(
+            f"Lt10S{name}"
+            for name in ("Hyper", "Night", "Raff", "DeltaTemp", "CO2Trigg", "HighHumTrigg", "LowHumTrigg")
+        ),
+        "FilterLife",
+    ],
+    48: ["Intensity"],
+}
+# Values reported for some fields, 10 for the others
+VALUES = {"IP": "192.168.1.40", "CO2Trigg": 900, "VocTrigg": 300, "Intensity": 50}
+UNITS = {"CO2Trigg": "ppm", "VocTrigg": "ppb"}
+
+
+def product(index, email):
+    """Return a product search record."""
+    return {
+        "_id": f"p{index}",
+        "serialNumber": f"PS{index:05d}",
+        "boardSerialNumber": f"BS{index:05d}",
+        "clientInfo": {"mail": email, "name": "Bench", "lastName": "User"},
+        "cloudBoard": {"_id": f"cb{index}"},
+        "productType": {"model": "Flow40", "line": "Pure"},
+        # Ten devices per installation
+        "currentInstallation": {"name": f"Building{index // 50}", "place": f"Floor{index // 10 % 5}"},
+    }
+
+
+def make_app(devices, email):
+    """Return the fake API application."""
+    stats = dict.fromkeys(("cognito", "search", "sendcommand", "laststatus", "board"), 0)
+    # Last command per product serial, and VMC status per board
+    last_command = {}
+    status = {}
+
+    async def cognito(request):
+        stats["cognito"] += 1
+        return web.json_response({
+            "AuthenticationResult": {
+                "IdToken": "id", "AccessToken": "access", "RefreshToken": "refresh",
+                "ExpiresIn": 3600,
+            }
+        })
+
+    async def search(request):
+        stats["search"] += 1
+        return web.json_response({"data": [product(i, email) for i in range(devices)]})
+
+    async def send_command(request):
+        stats["sendcommand"] += 1
+        board = request.match_info["board"]
+        command_id = json.loads(await request.read())["commandId"]
+        last_command["PS" + board[2:]] = command_id
+        if command_id in MODE_COMMANDS:
+            status[board] = MODE_COMMANDS[command_id]
+        return web.Response()
+
+    async def last_status(request):
+        stats["laststatus"] += 1
+        serial = json.loads(await request.read())["serialNumber"]
+        command_id = last_command.get(serial, 0)
+        if command_id == 0:
+            return web.json_response([
+                {"field": "TemperaturaInterna", "value": 210 + random.randint(-5, 5), "unitId": "dC"},
+                {"field": "TemperaturaEsterna", "value": 120, "unitId": "dC"},
+                {"field": "Humidity", "value": 455, "unitId": "dPerc"},
+                {"field": "Anidride", "value": random.randint(500, 1200), "unitId": "ppm"},
+                {"field": "Isobutilene", "value": 80, "unitId": "ppb"},
+                {"field": "VMCStatus", "value": status.get("BS" + serial[2:], 1)},
+            ])
+        return web.json_response([
+            {"field": field, "value": VALUES.get(field, 10), "unitId": UNITS.get(field)}
+            for field in BLOCKS.get(command_id, ["Firmware"])
+        ])
+
+    async def board(request):
+        stats["board"] += 1
+        return web.json_response(
+            {"boardType": {"units": [{"_id": "ppm", "min": 400, "max": 2000}]}}
+        )
+
+    async def get_stats(request):
+        return web.json_response(stats)
+
+    app = web.Application()
+    app.router.add_post("/", cognito)
+    app.router.add_post("/board/product/search", search)
+    app.router.add_post("/board/board/sendcommand/{board}", send_command)
+    app.router.add_post("/log/commandlogs/laststatus", last_status)
+    app.router.add_get("/board/board/{board}", board)
+    app.router.add_get("/_stats", get_stats)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=3, help="number of devices")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--email", default="bench@example.com", help="account email")
+    args = parser.parse_args()
+    web.run_app(
+        make_app(args.devices, args.email), host="127.0.0.1", port=args.port, print=None
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Import-time budgets of the integration and the command line client.
+
+Runs each entry point under ``python -X importtime`` a few times and
+compares the fastest run with its budget:
+
+    python scripts/import_budget.py
+    python scripts/import_budget.py --runs 10 --verbose
+
+- ``integration``: importing ``custom_components.helty`` once the Home
+  Assistant modules every integration uses are loaded, i.e. what the
+  integration adds to the boot. Skipped without ``homeassistant``.
+- ``cli_help``: ``helty_cloud.py --help``.
+- ``cli_thin``: a single command sent through ``--via`` to a daemon.
+- ``cli_client``: the CLI with the integration's API client loaded, as
+  any command talking to the cloud.
+
+The CLI figures exclude the interpreter's own startup imports. Bytecode
+is compiled first, so the numbers do not include compiling the sources.
+The exit status is 1 when a budget is exceeded or a command fails.
+"""
+
+import argparse
+import compileall
+import importlib.util
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Measurement -> budget in milliseconds. Eagerly importing asyncio again
+# costs about 100 ms, boto3 several hundred.
+BUDGETS = {
+    "integration": 40,
+    "cli_help": 80,
+    "cli_thin": 130,
+    "cli_client": 600,
+}
+
+# Already imported by Home Assistant before it loads any integration
+HA_PRELOADED = (
+    "aiohttp",
+    "voluptuous",
+    "homeassistant.config_entries",
+    "homeassistant.core",
+    "homeassistant.helpers.config_validation",
+    "homeassistant.helpers.device_registry",
+    "homeassistant.helpers.dispatcher",
+    "homeassistant.helpers.entity_platform",
+    "homeassistant.helpers.event",
+    "homeassistant.helpers.restore_state",
+    "homeassistant.helpers.storage",
+    "homeassistant.helpers.update_coordinator",
+)
+
+_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+class CommandFailed(Exception):
+    """A measured command exited with an unexpected status."""
+
+
+def top_level_imports(command, status=0):
+    """Run a command under -X importtime; return {module: cumulative us}.
+
+    Only modules imported directly by the running code are returned, so
+    the values add up to the total import time. Raises CommandFailed with
+    the command's own stderr when it does not exit with ``status``.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *command],
+        cwd=ROOT, capture_output=True, text=True, check=False,
+    )
+    if result.returncode != status:
+        output = "\n".join(
+            line for line in result.stderr.splitlines()
+            if not line.startswith("import time:")
+        )
+        raise CommandFailed(
+            f"{' '.join(command)} exited with status {result.returncode}:\n{output}"
+        )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if (match := _LINE.match(line)) and not match.group(3):
+            modules[match.group(4)] = int(match.group(2))
+    return modules
+
+
+def measure_integration():
+    """Return the import time of the integration on top of Home Assistant."""
+    preload = "; ".join(f"import {name}" for name in HA_PRELOADED)
+    modules = top_level_imports(["-c", f"{preload}; import custom_components.helty"])
+    return modules.get("custom_components", 0) + modules.get("custom_components.helty", 0)
+
+
+def measure_cli(*command, status=0):
+    """Return the import time of a CLI run beyond the interpreter startup."""
+    startup = top_level_imports(["-c", "pass"])
+    modules = top_level_imports(command, status)
+    return sum(us for name, us in modules.items() if name not in startup)
+
+
+MEASUREMENTS = {
+    "integration": measure_integration,
+    "cli_help": lambda: measure_cli("helty_cloud.py", "--help"),
+    # No daemon listens on the socket: the command fails once it connects
+    "cli_thin": lambda: measure_cli(
+        "helty_cloud.py", "--via", str(ROOT / "no-daemon.sock"), "status", status=1
+    ),
+    "cli_client": lambda: measure_cli(
+        "-c", "import helty_cloud; helty_cloud.load_api()"
+    ),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check import-time budgets of the integration and the CLI."
+    )
+    parser.add_argument("--runs", type=int, default=5, help="runs per measurement")
+    parser.add_argument(
+        "--verbose", action="store_true",
+        help="also list the slowest imports of the CLI",
+    )
+    args = parser.parse_args()
+
+    compileall.compile_dir(ROOT / "custom_components", quiet=1)
+    compileall.compile_file(ROOT / "helty_cloud.py", quiet=1)
+
+    names = list(MEASUREMENTS)
+    if importlib.util.find_spec("homeassistant") is None:
+        print("homeassistant is not installed: skipping 'integration'")
+        names.remove("integration")
+
+    failures = []
+    for name in names:
+        try:
+            best = min(MEASUREMENTS[name]() for _ in range(args.runs)) / 1000
+        except CommandFailed as err:
+            print(f"{name:12s} FAILED: {err}")
+            failures.append(name)
+            continue
+        budget = BUDGETS[name]
+        status = "ok" if best <= budget else "OVER BUDGET"
+        print(f"{name:12s} {best:7.1f} ms  (budget {budget} ms)  {status}")
+        if best > budget:
+            failures.append(name)
+
+    if args.verbose:
+        for command in (["helty_cloud.py", "--help"],
+                        ["-c", "import helty_cloud; helty_cloud.load_api()"]):
+            modules = top_level_imports(command)
+            print(f"\nSlowest imports of {' '.join(command)}:")
+            for module, us in sorted(modules.items(), key=lambda i: -i[1])[:10]:
+                print(f"  {us / 1000:7.1f} ms  {module}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Replay recorded push event payloads through the API client.
+
+Feeds each payload of ``fixtures/events.jsonl`` (or the given files) to
+``HeltyCloudAPI._handle_event``, as a push transport would, and checks
+the reading delivered to the board's listeners and the pending reads it
+answers:
+
+    python scripts/replay_events.py
+    python scripts/replay_events.py captured.jsonl --verbose
+
+Each line holds the board serial, the payload as JSON (``payload``) or as
+raw text (``raw``), the expected reading fields (null when no reading may
+be delivered) and ``answers``, the read commands whose waiting reads get
+the items. Partial events may also hold a ``base`` reading and the reading
+``merged`` expected once the event is merged into it, as the coordinator
+does. The exit status is 1 when a payload is not handled as expected.
+Needs the integration's dependencies (``aiohttp``), not Home Assistant.
+"""
+
+import argparse
+import asyncio
+import json
+from pathlib import Path
+import sys
+
+ROOT = Path(__file__).resolve().parent.parent
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "events.jsonl"
+
+sys.path.insert(0, str(ROOT))
+
+from helty_cloud import load_module  # noqa: E402
+
+READ_SIGNATURES = load_module("const").READ_SIGNATURES
+Reading = load_module("models").Reading
+
+
+def load_fixtures(paths):
+    """Return the fixtures of the given JSON lines files."""
+    fixtures = []
+    for path in paths:
+        with open(path, encoding="utf-8") as file:
+            fixtures.extend(json.loads(line) for line in file if line.strip())
+    return fixtures
+
+
+def compare(reading, expected):
+    """Return the fields of a reading differing from the expected values."""
+    return [
+        f"{field}: {getattr(reading, field)!r} instead of {expected.get(field)!r}"
+        for field in reading.__slots__
+        if getattr(reading, field) != expected.get(field)
+    ]
+
+
+async def replay(api, fixture):
+    """Feed one payload and return the list of mismatches."""
+    board = fixture["board"]
+    if "raw" in fixture:
+        payload = fixture["raw"].encode()
+    else:
+        payload = json.dumps(fixture["payload"]).encode()
+
+    readings = []
+    unsubscribe = api.subscribe_events(board, readings.append)
+    # One read waiting for each command with a known response
+    loop = asyncio.get_running_loop()
+    waiters = [(command_id, loop.create_future()) for command_id in READ_SIGNATURES]
+    api._event_waiters[board] = list(waiters)
+    try:
+        api._handle_event(board, payload)
+    finally:
+        unsubscribe()
+        api._event_waiters.pop(board, None)
+
+    errors = []
+    if (expected := fixture["reading"]) is None:
+        if readings:
+            errors.append(f"unexpected reading {readings[0]}")
+    elif len(readings) != 1:
+        errors.append(f"{len(readings)} readings instead of 1")
+    else:
+        errors.extend(compare(readings[0], expected))
+    if "merged" in fixture and len(readings) == 1:
+        merged = Reading(**fixture["base"]).merge(readings[0])
+        errors.extend(
+            f"merged {error}" for error in compare(merged, fixture["merged"])
+        )
+    answered = sorted(command_id for command_id, waiter in waiters if waiter.done())
+    if answered != sorted(fixture["answers"]):
+        errors.append(f"answers reads {answered} instead of {fixture['answers']}")
+    return errors
+
+
+async def run(fixtures, verbose):
+    """Replay every fixture and return the number of failures."""
+    api = load_module("api").HeltyCloudAPI(None)
+    failures = 0
+    for fixture in fixtures:
+        errors = await replay(api, fixture)
+        failures += bool(errors)
+        if errors or verbose:
+            status = "FAIL" if errors else "ok"
+            print(f"{status:4}  {fixture['name']}")
+        for error in errors:
+            print(f"      {error}")
+    print(f"{len(fixtures) - failures}/{len(fixtures)} payloads handled as expected")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "files", nargs="*", type=Path, default=[FIXTURES], help="JSON lines fixtures"
+    )
+    parser.add_argument("--verbose", action="store_true", help="list every payload")
+    args = parser.parse_args()
+    failures = asyncio.run(run(load_fixtures(args.files), args.verbose))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
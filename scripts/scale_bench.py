@@ -0,0 +1,234 @@
+"""Scale benchmark of the integration against a fake HCloud.
+
+Sets the integration up in a bare Home Assistant core with 10, 100 and
+1000 devices served by ``fake_hcloud.py``, and checks each measurement
+against a budget of a fixed part plus a part per device:
+
+    python scripts/scale_bench.py
+    python scripts/scale_bench.py --sizes 10 100 --cycles 5 --json
+
+Each size runs twice in a fresh process: once for timings (setup time,
+event-loop lag and CPU per poll cycle) and once under tracemalloc for the
+steady-state memory, since tracing allocations slows everything down. The
+exit status is 1 when a budget is exceeded. Needs ``homeassistant``
+installed; the status wait is shortened with ``--delay``.
+"""
+
+import argparse
+import asyncio
+import json
+from pathlib import Path
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = Path(__file__).resolve().parent.parent
+EMAIL = "bench@example.com"
+
+# Measurement -> (fixed, per device, description)
+BUDGETS = {
+    "setup_ms": (1000, 40, "entry setup until every device polled once"),
+    "memory_kib": (2048, 400, "traced memory after setup and polls"),
+    "poll_lag_ms": (100, 1.5, "worst event-loop delay during poll cycles"),
+    "cpu_ms_per_cycle": (20, 6, "CPU of one poll of every device"),
+}
+
+
+class LagProbe:
+    """Measure how late the event loop runs a periodic timer."""
+
+    def __init__(self, period=0.005):
+        self.period = period
+        self.worst = 0.0
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.period
+            await asyncio.sleep(self.period)
+            self.worst = max(self.worst, loop.time() - expected)
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        self._task.cancel()
+
+
+async def start_hass(config_dir):
+    """Return a running Home Assistant core with the base registries."""
+    from homeassistant import bootstrap, config_entries, core, loader
+    from homeassistant.setup import async_setup_component
+
+    hass = core.HomeAssistant(str(config_dir))
+    hass.config.skip_pip = True
+    loader.async_setup(hass)
+    hass.config_entries = config_entries.ConfigEntries(hass, {})
+    await bootstrap.async_load_base_functionality(hass)
+    await async_setup_component(hass, "homeassistant", {})
+    await hass.async_start()
+    return hass
+
+
+async def run(size, url, delay, cycles, memory):
+    """Set the integration up for ``size`` devices and return measurements."""
+    with tempfile.TemporaryDirectory() as config_dir:
+        config_dir = Path(config_dir)
+        (config_dir / "custom_components").symlink_to(ROOT / "custom_components")
+        sys.path.insert(0, str(config_dir))
+        hass = await start_hass(config_dir)
+
+        from custom_components.helty import api
+        from custom_components.helty.const import DOMAIN
+
+        api.API_BASE_URL = url
+        api.COGNITO_URL = f"{url}/"
+        api.STATUS_READ_DELAY = delay
+
+        probe = LagProbe()
+        probe.start()
+        if memory:
+            tracemalloc.start()
+            baseline = tracemalloc.get_traced_memory()[0]
+
+        started = time.perf_counter()
+        flow = await hass.config_entries.flow.async_init(
+            DOMAIN, context={"source": "user"}
+        )
+        result = await hass.config_entries.flow.async_configure(
+            flow["flow_id"], {"email": EMAIL, "password": "bench"}
+        )
+        entry = result["result"]
+        coordinators = hass.data[DOMAIN][entry.entry_id]["coordinators"]
+        # The first poll runs in the background after the entry setup
+        while not all(c.data is not None for c in coordinators):
+            await asyncio.sleep(0.01)
+        setup = time.perf_counter() - started
+        setup_lag, probe.worst = probe.worst, 0.0
+
+        cpu = []
+        for _ in range(cycles):
+            cpu_started = time.process_time()
+            await asyncio.gather(*(c.async_refresh() for c in coordinators))
+            cpu.append(time.process_time() - cpu_started)
+        await hass.async_block_till_done()
+
+        measured = {
+            "devices": len(coordinators),
+            "entities": len(hass.states.async_entity_ids()),
+        }
+        if memory:
+            measured["memory_kib"] = (tracemalloc.get_traced_memory()[0] - baseline) / 1024
+            tracemalloc.stop()
+        else:
+            measured["setup_ms"] = setup * 1000
+            measured["setup_lag_ms"] = setup_lag * 1000
+            measured["poll_lag_ms"] = probe.worst * 1000
+            measured["cpu_ms_per_cycle"] = min(cpu) * 1000
+        probe.stop()
+        await hass.async_stop(force=True)
+        return measured
+
+
+def free_port():
+    """Return a free local TCP port."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def measure(size, args):
+    """Run both passes for one size against a fresh fake HCloud."""
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, str(ROOT / "scripts" / "fake_hcloud.py"),
+         "--devices", str(size), "--port", str(port), "--email", EMAIL],
+    )
+    try:
+        for _ in range(100):
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+                break
+            except OSError:
+                time.sleep(0.05)
+        result = {}
+        for memory in (False, True):
+            child = subprocess.run(
+                [sys.executable, __file__, "--child", str(size),
+                 "--url", f"http://127.0.0.1:{port}", "--delay", str(args.delay),
+                 "--cycles", str(args.cycles), *(["--memory"] if memory else [])],
+                capture_output=True, text=True, check=False,
+            )
+            if child.returncode:
+                sys.stderr.write(child.stderr)
+                raise SystemExit(f"Benchmark of {size} devices failed")
+            result.update(json.loads(child.stdout.splitlines()[-1]))
+        return result
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def check(result):
+    """Return the budgets a result exceeds, as (name, value, limit)."""
+    failures = []
+    for name, (fixed, per_device, _description) in BUDGETS.items():
+        limit = fixed + per_device * result["devices"]
+        if result[name] > limit:
+            failures.append((name, result[name], limit))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Scale benchmark of the integration against a fake HCloud."
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--cycles", type=int, default=3, help="poll cycles to time")
+    parser.add_argument(
+        "--delay", type=float, default=0.2,
+        help="seconds between GetStatus and laststatus (default: %(default)s)",
+    )
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    parser.add_argument("--memory", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(
+            run(args.child, args.url, args.delay, args.cycles, args.memory)
+        )))
+        return
+
+    results, failures = [], []
+    for size in args.sizes:
+        result = measure(size, args)
+        failures.extend((size, *failure) for failure in check(result))
+        results.append(result)
+        if not args.json:
+            print(
+                f"{result['devices']:5d} devices  {result['entities']:5d} entities  "
+                f"setup {result['setup_ms'] / 1000:6.2f} s  "
+                f"memory {result['memory_kib'] / 1024:6.1f} MiB  "
+                f"lag setup {result['setup_lag_ms']:7.1f} ms, polls {result['poll_lag_ms']:6.1f} ms  "
+                f"cpu/cycle {result['cpu_ms_per_cycle']:7.1f} ms",
+                flush=True,
+            )
+    if args.json:
+        print(json.dumps({"results": results, "budgets": BUDGETS}, indent=2))
+    for size, name, value, limit in failures:
+        print(
+            f"Over budget with {size} devices: {name} = {value:.1f} > {limit:.0f} "
+            f"({BUDGETS[name][2]})",
+            file=sys.stderr,
+        )
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()